@@ -1,14 +1,33 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask
 from flask_cors import CORS
 from supabase import create_client, Client
 
 from .config import Config
+from .auth import TokenCache
+from .cache import PredictionCache
+from .jobs import JobQueue
 from .model import InferenceModel
+from .model_server import RemoteInferenceModel
+from .persistence import LocalTableClient, ResultRecorder
+from .registry import ModelRegistry
+from .scoring import score_uploads
+from .storage import BackgroundWriter, ContentStore
+from .thumbnails import ThumbnailCache
 
 # --- Global Instances ---
 supabase: Client = None
+token_cache: TokenCache = None
+result_recorder: ResultRecorder = None
 inference_model: InferenceModel = None
+upload_writer: BackgroundWriter = None
+content_store: ContentStore = None
+thumbnail_cache: ThumbnailCache = None
+prediction_cache: PredictionCache = None
+decode_pool: ThreadPoolExecutor = None
+job_queue: JobQueue = None
+model_registry: ModelRegistry = None
 
 def create_app(config_class=Config):
     """The application factory."""
@@ -25,7 +44,8 @@ def create_app(config_class=Config):
     # ================================================================= #
 
     # Allow access to global instances
-    global supabase, inference_model
+    global supabase, token_cache, result_recorder, inference_model, upload_writer, content_store, thumbnail_cache, \
+        prediction_cache, decode_pool, job_queue, model_registry
 
     # --- Initialize Extensions and Services ---
     CORS(app, resources={r"/*": {"origins": app.config['CORS_ALLOWED_ORIGINS']}})
@@ -37,8 +57,96 @@ def create_app(config_class=Config):
     else:
         print("Supabase client not initialized (URL or Key missing).")
 
-    # Initialize the model a single time on startup
-    inference_model = InferenceModel(app.config['MODEL_PATH'])
+    # Bearer tokens are verified once and then served from a cache until they expire
+    token_cache = TokenCache(max_entries=app.config['JWT_CACHE_MAX_ENTRIES'], ttl=app.config['JWT_CACHE_TTL'])
+
+    # Prediction results are persisted off the request path, in batches
+    results_client = supabase
+    if results_client is None and app.config['RESULTS_LOCAL_PATH']:
+        results_client = LocalTableClient(app.config['RESULTS_LOCAL_PATH'])
+        print(f"Recording prediction results locally to '{app.config['RESULTS_LOCAL_PATH']}'.")
+    result_recorder = ResultRecorder(
+        results_client,
+        table=app.config['RESULTS_TABLE'],
+        batch_size=app.config['RESULTS_BATCH_SIZE'],
+        flush_interval=app.config['RESULTS_FLUSH_INTERVAL']
+    )
+
+    # Repeat uploads of the same image are answered from the prediction cache
+    prediction_cache = PredictionCache(
+        max_entries=app.config['CACHE_MAX_ENTRIES'],
+        db_path=app.config['CACHE_DB_PATH']
+    )
+
+    # The active model version comes from the model registry, if one is configured
+    model_path = app.config['MODEL_PATH']
+    if app.config['MODEL_REGISTRY_DIR']:
+        model_registry = ModelRegistry(app.config['MODEL_REGISTRY_DIR'], app.config['MODEL_WATCH_INTERVAL'])
+        model_path = model_registry.current() or model_path
+
+    def on_swap(old_version, new_version):
+        # Results of a replaced model version can never be served again
+        prediction_cache.discard_version(old_version)
+
+    # Initialize the model a single time on startup, or connect to the shared model server
+    if app.config['MODEL_SERVER_SOCKET']:
+        inference_model = RemoteInferenceModel(app.config['MODEL_SERVER_SOCKET'], on_swap=on_swap)
+        print(f"Using the shared model server at '{app.config['MODEL_SERVER_SOCKET']}'.")
+    else:
+        inference_model = InferenceModel(
+            model_path,
+            backend=app.config['MODEL_BACKEND'],
+            max_batch_size=app.config['BATCH_MAX_SIZE'],
+            max_wait_ms=app.config['BATCH_MAX_WAIT_MS'],
+            num_threads=app.config['TFLITE_NUM_THREADS'],
+            warmup=app.config['MODEL_WARMUP'],
+            background=app.config['MODEL_BACKGROUND_LOAD'],
+            on_swap=on_swap
+        )
+        if model_registry:
+            # Activating another version in the registry hot-reloads it in every worker
+            model_registry.watch(inference_model.reload, current_path=model_path)
+
+    # Batch uploads are decoded in parallel on a shared thread pool
+    decode_pool = ThreadPoolExecutor(max_workers=app.config['DECODE_WORKERS'], thread_name_prefix='decode')
+
+    # Large submissions are scored by background job workers instead of request threads
+    allowed_extensions = app.config['ALLOWED_EXTENSIONS']
+    job_queue = JobQueue(
+        os.path.join(project_root, app.config['JOBS_DB_PATH']),
+        os.path.join(project_root, app.config['JOBS_SPOOL_DIR']),
+        # Each job is scored by the model version serving when it starts, behind interactive requests
+        lambda items, start: score_uploads(
+            items, allowed_extensions, inference_model.pin(), prediction_cache, decode_pool, start_index=start,
+            bulk=True
+        ),
+        num_workers=app.config['JOB_WORKERS'],
+        ready_fn=lambda: inference_model.is_ready
+    )
+    # Pick up jobs left queued (or interrupted) by a previous run right away
+    job_queue.start()
+
+    # Uploads are stored once per distinct content, and guest uploads are kept within a retention budget
+    content_store = ContentStore(
+        app.config['UPLOAD_FOLDER'],
+        os.path.join(project_root, app.config['UPLOAD_INDEX_PATH'])
+    )
+    content_store.start_sweeper(
+        {'guest': {
+            'max_bytes': app.config['GUEST_UPLOAD_MAX_BYTES'] or None,
+            'max_age': app.config['GUEST_UPLOAD_MAX_AGE_DAYS'] * 86400 or None,
+        }},
+        interval=app.config['RETENTION_SWEEP_INTERVAL']
+    )
+
+    # Uploads are persisted off the request path by a background writer
+    upload_writer = BackgroundWriter(content_store)
+
+    # Small renditions of uploads for the result pages, generated once and kept on disk
+    thumbnail_cache = ThumbnailCache(
+        os.path.join(project_root, app.config['THUMBNAIL_CACHE_DIR']),
+        max_bytes=app.config['THUMBNAIL_CACHE_MAX_BYTES']
+    )
 
     # --- Create Upload Directories ---
     # This will now use the absolute path we just created.
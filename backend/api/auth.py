@@ -1,27 +1,124 @@
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
 import jwt
-from flask import request, g, current_app
+from flask import request, g, current_app, jsonify
+
+
+class TokenCache:
+    """
+    A bounded cache of JWT verification results, keyed by a digest of the token.
+
+    The same bearer token arrives with every request for its whole lifetime, so
+    only the first request pays for the signature check and claim parsing. A
+    cached token stops being accepted at its `exp`, and every entry is
+    re-verified after `ttl` seconds so a rotated secret takes effect.
+    Tokens with a bad signature or format are remembered too, for
+    `negative_ttl` seconds. Tokens rejected for their claims (e.g. not valid
+    yet because of clock skew) are not, so they are accepted once they are.
+    """
+
+    def __init__(self, max_entries=10000, ttl=300.0, negative_ttl=60.0):
+        """
+        Args:
+            max_entries (int): Maximum number of tokens remembered. 0 disables the cache.
+            ttl (float): Seconds a successful verification is reused for, at most.
+            negative_ttl (float): Seconds a failed verification is reused for.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token, secret):
+        # Neither the token nor the secret is kept in memory in the clear
+        return hashlib.sha256(f'{secret}\0{token}'.encode('utf-8')).digest()
+
+    def verify(self, token, secret):
+        """
+        Verify an HS256 token, using the cached result when there is one.
+
+        Returns:
+            dict | None: The token's claims, or None if it is invalid or expired.
+        """
+        key = self._key(token, secret)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                claims, valid_until = entry
+                if now < valid_until:
+                    self._entries.move_to_end(key)
+                    return claims
+                del self._entries[key]
+
+        try:
+            claims = jwt.decode(token, secret, algorithms=['HS256'])
+            valid_until = now + self.ttl
+            if 'exp' in claims:
+                valid_until = min(valid_until, float(claims['exp']))
+        except jwt.DecodeError:
+            # A bad signature or a malformed token never becomes valid
+            claims, valid_until = None, now + self.negative_ttl
+        except jwt.InvalidTokenError:
+            return None
+
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = (claims, valid_until)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return claims
+
 
 def jwt_optional(f):
     """
     A decorator to optionally decode a JWT from the Authorization header.
-    If the token is valid, it sets `g.is_authenticated = True`.
+    If the token is valid, it sets `g.is_authenticated = True` and `g.user_id` to its subject.
     If the token is missing or invalid, it sets `g.is_authenticated = False`.
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
         g.is_authenticated = False
+        g.user_id = None
         auth_header = request.headers.get('Authorization')
         jwt_secret = current_app.config.get('SUPABASE_JWT_SECRET')
 
         if auth_header and auth_header.startswith('Bearer ') and jwt_secret:
             token = auth_header.split(' ')[1]
-            try:
-                jwt.decode(token, jwt_secret, algorithms=['HS256'])
+            # Repeat requests with the same token skip the signature check (see TokenCache)
+            from . import token_cache
+            claims = token_cache.verify(token, jwt_secret)
+            if claims is not None:
                 g.is_authenticated = True
-            except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
-                # Token is invalid or expired, user remains a guest
-                pass
-        
+                g.user_id = claims.get('sub')
+            # Otherwise the token is invalid or expired, and the user remains a guest
+
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def admin_required(f):
+    """
+    A decorator for operator-only endpoints.
+    Requires `Authorization: Bearer <DF_ADMIN_TOKEN>`; the endpoints do not exist while no token is configured.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        admin_token = current_app.config.get('ADMIN_TOKEN')
+        if not admin_token:
+            return jsonify({'error': 'Not found.'}), 404
+
+        auth_header = request.headers.get('Authorization', '')
+        token = auth_header[len('Bearer '):] if auth_header.startswith('Bearer ') else ''
+        if not hmac.compare_digest(token.encode('utf-8'), admin_token.encode('utf-8')):
+            return jsonify({'error': 'Unauthorized.'}), 401
+
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
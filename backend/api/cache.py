@@ -0,0 +1,160 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .metrics import CACHE_LOOKUPS
+
+
+class PredictionCache:
+    """
+    A two-tier cache of prediction results keyed by image content and model version.
+
+    The first tier is a bounded in-process LRU. The optional second tier is a
+    SQLite database on disk, which every gunicorn worker can share.
+    """
+
+    def __init__(self, max_entries=4096, db_path=None):
+        """
+        Args:
+            max_entries (int): Maximum number of entries kept in memory. 0 disables the memory tier.
+            db_path (str, optional): Path of the shared SQLite database. None disables the disk tier.
+        """
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._connection().execute(
+                'CREATE TABLE IF NOT EXISTS predictions ('
+                'key TEXT PRIMARY KEY, result TEXT NOT NULL, percentage REAL NOT NULL, created REAL NOT NULL)'
+            )
+
+    @staticmethod
+    def make_key(data, model_version, mode='single', digest=None):
+        """
+        Build a cache key from raw image bytes, the model version fingerprint and the prediction mode.
+
+        Args:
+            data (bytes): Raw image bytes.
+            model_version (str): Fingerprint of the model that produced the prediction.
+            mode (str): Prediction mode the result was computed with.
+            digest (str, optional): SHA-256 hex digest of `data`, if already computed.
+
+        Returns:
+            str: Cache key.
+        """
+        if mode != 'single':
+            model_version = f'{model_version}:{mode}'
+        return f'{model_version}:{digest or hashlib.sha256(data).hexdigest()}'
+
+    def _connection(self):
+        # SQLite connections cannot be shared across threads or forked processes.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _remember(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Look up a cached prediction.
+
+        Returns:
+            tuple | None: ('Real' | 'Fake', prediction percentage), or None on a miss.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_LOOKUPS.labels(result='hit').inc()
+                return value
+
+        if self.db_path:
+            try:
+                row = self._connection().execute(
+                    'SELECT result, percentage FROM predictions WHERE key = ?', (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"🚨 Prediction cache read failed: {e}")
+                row = None
+            if row is not None:
+                value = (row[0], row[1])
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                CACHE_LOOKUPS.labels(result='disk_hit').inc()
+                return value
+
+        with self._lock:
+            self.misses += 1
+        CACHE_LOOKUPS.labels(result='miss').inc()
+        return None
+
+    def put(self, key, value):
+        """
+        Store a prediction in every enabled tier.
+
+        Args:
+            key (str): Cache key from `make_key`.
+            value (tuple): ('Real' | 'Fake', prediction percentage).
+        """
+        self._remember(key, value)
+        if self.db_path:
+            try:
+                self._connection().execute(
+                    'INSERT OR REPLACE INTO predictions (key, result, percentage, created) VALUES (?, ?, ?, ?)',
+                    (key, value[0], value[1], time.time())
+                )
+            except sqlite3.Error as e:
+                print(f"🚨 Prediction cache write failed: {e}")
+
+    def discard_version(self, model_version):
+        """
+        Drop every cached prediction made by a model version, e.g. after it was replaced.
+
+        Args:
+            model_version (str): Fingerprint of the retired model.
+        """
+        prefix = f'{model_version}:'
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+        if self.db_path:
+            try:
+                self._connection().execute(
+                    "DELETE FROM predictions WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+                )
+            except sqlite3.Error as e:
+                print(f"🚨 Prediction cache cleanup failed: {e}")
+
+    def stats(self):
+        """Return the hit/miss counters and the current size of the memory tier."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+            }
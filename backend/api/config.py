@@ -14,7 +14,87 @@ class Config:
     # --- Application-Specific Settings ---
     UPLOAD_FOLDER = os.getenv('DF_UPLOAD_FOLDER', 'uploads')
     MODEL_PATH = os.getenv('DF_MODEL_PATH', 'deepfake_detector_model.keras')
+    # 'keras', 'tflite', or 'auto' to pick the backend from the MODEL_PATH extension
+    MODEL_BACKEND = os.getenv('DF_MODEL_BACKEND', 'auto')
+    TFLITE_NUM_THREADS = int(os.getenv('DF_TFLITE_NUM_THREADS', '0')) or None
+    # Run a synthetic batch through the model before reporting ready
+    MODEL_WARMUP = os.getenv('DF_MODEL_WARMUP', 'true').lower() == 'true'
+    # Load the model on a background thread so the server starts listening immediately;
+    # /readyz reports 503 until the model is loaded and warmed up
+    MODEL_BACKGROUND_LOAD = os.getenv('DF_MODEL_BACKGROUND_LOAD', 'false').lower() == 'true'
+    # When set, a single model server process owns the model (see api/model_server.py)
+    # and every gunicorn worker sends it decoded images over this Unix socket, authenticated
+    # with DF_MODEL_SERVER_AUTHKEY (generated by gunicorn.conf.py when not set)
+    MODEL_SERVER_SOCKET = os.getenv('DF_MODEL_SERVER_SOCKET')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+    # Default prediction mode for /upload: 'single' (center resize), 'flip' (plus its mirror
+    # image) or 'multicrop' (plus a 3x3 grid of native resolution crops). Requests can
+    # override it with a 'mode' field. All views of an image share one forward pass as long
+    # as BATCH_MAX_SIZE is at least 11.
+    PREDICTION_MODE = os.getenv('DF_PREDICTION_MODE', 'single')
+
+    # --- Model Registry / Hot Reload Settings ---
+    # When set, the active model is the file named in MODEL_REGISTRY_DIR/CURRENT (falling
+    # back to MODEL_PATH), and every worker hot-reloads when CURRENT changes, checking
+    # every MODEL_WATCH_INTERVAL seconds. ADMIN_TOKEN enables the /admin/model endpoints.
+    MODEL_REGISTRY_DIR = os.getenv('DF_MODEL_REGISTRY_DIR')
+    MODEL_WATCH_INTERVAL = float(os.getenv('DF_MODEL_WATCH_INTERVAL', '5'))
+    ADMIN_TOKEN = os.getenv('DF_ADMIN_TOKEN')
+
+    # --- Video Scoring Settings ---
+    # Clips are scored on VIDEO_SAMPLE_FPS frames per second (at most VIDEO_MAX_FRAMES).
+    # Scoring stops early once VIDEO_MIN_FRAMES frames agree on a verdict with a mean
+    # score beyond VIDEO_EARLY_STOP_CONFIDENCE.
+    ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'mov', 'avi', 'mkv', 'webm'}
+    VIDEO_SAMPLE_FPS = float(os.getenv('DF_VIDEO_SAMPLE_FPS', '2'))
+    VIDEO_MAX_FRAMES = int(os.getenv('DF_VIDEO_MAX_FRAMES', '300'))
+    VIDEO_MIN_FRAMES = int(os.getenv('DF_VIDEO_MIN_FRAMES', '16'))
+    VIDEO_EARLY_STOP_CONFIDENCE = float(os.getenv('DF_VIDEO_EARLY_STOP_CONFIDENCE', '0.9'))
+
+    # --- Inference Batching Settings ---
+    # Concurrent predictions are grouped into one forward pass of at most
+    # BATCH_MAX_SIZE images, waiting no longer than BATCH_MAX_WAIT_MS to fill it.
+    BATCH_MAX_SIZE = int(os.getenv('DF_BATCH_MAX_SIZE', '16'))
+    BATCH_MAX_WAIT_MS = float(os.getenv('DF_BATCH_MAX_WAIT_MS', '5'))
+
+    # --- Upload Storage Settings ---
+    # Uploads are stored once per distinct content under UPLOAD_FOLDER/objects and indexed in
+    # UPLOAD_INDEX_PATH. Guest uploads are deleted oldest first beyond GUEST_UPLOAD_MAX_BYTES
+    # or after GUEST_UPLOAD_MAX_AGE_DAYS (0 disables either limit), checked every
+    # RETENTION_SWEEP_INTERVAL seconds.
+    UPLOAD_INDEX_PATH = os.getenv('DF_UPLOAD_INDEX_PATH', 'storage/uploads.sqlite3')
+    GUEST_UPLOAD_MAX_BYTES = int(os.getenv('DF_GUEST_UPLOAD_MAX_BYTES', str(5 * 1024 ** 3)))
+    GUEST_UPLOAD_MAX_AGE_DAYS = float(os.getenv('DF_GUEST_UPLOAD_MAX_AGE_DAYS', '30'))
+    RETENTION_SWEEP_INTERVAL = float(os.getenv('DF_RETENTION_SWEEP_INTERVAL', '600'))
+
+    # --- Upload Serving Settings ---
+    # Content-addressed uploads never change and are cached by clients for a year; other
+    # files in the upload folder for UPLOAD_CACHE_MAX_AGE seconds. Thumbnails (?size=<px>,
+    # one of THUMBNAIL_SIZES) are generated once into THUMBNAIL_CACHE_DIR and evicted least
+    # recently used first beyond THUMBNAIL_CACHE_MAX_BYTES.
+    UPLOAD_CACHE_MAX_AGE = int(os.getenv('DF_UPLOAD_CACHE_MAX_AGE', '3600'))
+    THUMBNAIL_SIZES = {64, 128, 256, 512}
+    THUMBNAIL_CACHE_DIR = os.getenv('DF_THUMBNAIL_CACHE_DIR', 'storage/thumbnails')
+    THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv('DF_THUMBNAIL_CACHE_MAX_BYTES', str(256 * 1024 ** 2)))
+
+    # --- Batch Upload Settings ---
+    # Maximum number of images accepted by /upload/batch, and the number of
+    # threads used to decode them in parallel.
+    BATCH_UPLOAD_MAX_FILES = int(os.getenv('DF_BATCH_UPLOAD_MAX_FILES', '1000'))
+    DECODE_WORKERS = int(os.getenv('DF_DECODE_WORKERS', '4'))
+
+    # --- Async Job Settings ---
+    # Jobs are tracked in a SQLite database shared by all workers; their files
+    # wait in JOBS_SPOOL_DIR until one of the JOB_WORKERS threads scores them.
+    JOBS_DB_PATH = os.getenv('DF_JOBS_DB_PATH', 'jobs/jobs.sqlite3')
+    JOBS_SPOOL_DIR = os.getenv('DF_JOBS_SPOOL_DIR', 'jobs/spool')
+    JOB_WORKERS = int(os.getenv('DF_JOB_WORKERS', '1'))
+
+    # --- Prediction Cache Settings ---
+    # Results are cached by image hash and model version. CACHE_DB_PATH enables a
+    # SQLite tier shared by all workers; leave it unset to use the memory tier only.
+    CACHE_MAX_ENTRIES = int(os.getenv('DF_CACHE_MAX_ENTRIES', '4096'))
+    CACHE_DB_PATH = os.getenv('DF_CACHE_DB_PATH')
 
     # --- CORS Settings ---
     # Default to allowing your Next.js frontend in development
@@ -27,4 +107,14 @@ class Config:
     # --- Supabase Settings ---
     SUPABASE_URL = os.getenv('SUPABASE_URL')
     SUPABASE_KEY = os.getenv('SUPABASE_KEY')
-    SUPABASE_JWT_SECRET = os.getenv('SUPABASE_JWT_SECRET')
\ No newline at end of file
+    SUPABASE_JWT_SECRET = os.getenv('SUPABASE_JWT_SECRET')
+    # Verified tokens are reused until their 'exp' (re-verified at least every JWT_CACHE_TTL seconds)
+    JWT_CACHE_MAX_ENTRIES = int(os.getenv('DF_JWT_CACHE_MAX_ENTRIES', '10000'))
+    JWT_CACHE_TTL = float(os.getenv('DF_JWT_CACHE_TTL', '300'))
+    # Prediction results are inserted into RESULTS_TABLE in the background, in batches of
+    # RESULTS_BATCH_SIZE at least every RESULTS_FLUSH_INTERVAL seconds. Without Supabase,
+    # RESULTS_LOCAL_PATH records them to a local JSON lines file instead.
+    RESULTS_TABLE = os.getenv('DF_RESULTS_TABLE', 'predictions')
+    RESULTS_BATCH_SIZE = int(os.getenv('DF_RESULTS_BATCH_SIZE', '50'))
+    RESULTS_FLUSH_INTERVAL = float(os.getenv('DF_RESULTS_FLUSH_INTERVAL', '1'))
+    RESULTS_LOCAL_PATH = os.getenv('DF_RESULTS_LOCAL_PATH')
\ No newline at end of file
@@ -0,0 +1,222 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+from .metrics import ERRORS
+
+
+class JobQueue:
+    """
+    A local, SQLite-backed job queue for large or slow scoring submissions.
+
+    Submitting spools the files to disk and returns a job id immediately. A pool
+    of worker threads in every gunicorn worker claims queued jobs from the shared
+    database, scores them chunk by chunk and records each file's result, so bulk
+    work never occupies a request thread. Jobs are scored through the model's
+    bulk batcher, whose forward passes yield to interactive requests.
+    """
+
+    def __init__(self, db_path, spool_dir, score_fn, num_workers=1, poll_interval=1.0, stale_after=300,
+                 ready_fn=None):
+        """
+        Args:
+            db_path (str): Path of the SQLite database shared by all workers.
+            spool_dir (str): Directory where submitted files wait to be scored.
+            score_fn (callable): Maps ((filename, bytes) list, start index) to an iterable of result dicts.
+            num_workers (int): Number of job worker threads per process.
+            poll_interval (float): Seconds between polls of the queue when idle.
+            stale_after (float): Seconds after which a running job without progress is requeued.
+            ready_fn (callable, optional): Returns False while jobs cannot be scored yet (e.g. the model is loading).
+        """
+        self.db_path = db_path
+        self.spool_dir = spool_dir
+        self.score_fn = score_fn
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.ready_fn = ready_fn
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._pid = None
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, status TEXT NOT NULL, total INTEGER NOT NULL, '
+            'completed INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL, updated REAL NOT NULL, error TEXT)'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS job_results ('
+            'job_id TEXT NOT NULL, idx INTEGER NOT NULL, result TEXT NOT NULL, PRIMARY KEY (job_id, idx))'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)')
+
+    def _connection(self):
+        # SQLite connections cannot be shared across threads or forked processes.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def start(self):
+        """Start the worker threads for this process, if they are not running already."""
+        if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+            return
+        with self._lock:
+            if self._pid != os.getpid() or not all(t.is_alive() for t in self._threads):
+                self._pid = os.getpid()
+                self._threads = [
+                    threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+                    for i in range(self.num_workers)
+                ]
+                for thread in self._threads:
+                    thread.start()
+
+    def submit(self, items):
+        """
+        Spool a list of files and queue them as one job.
+
+        Args:
+            items (list): (filename, bytes) pairs. Bytes may be None for rejected files.
+
+        Returns:
+            str: The new job id.
+        """
+        self.start()
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.spool_dir, job_id)
+        os.makedirs(job_dir)
+        manifest = []
+        for index, (filename, data) in enumerate(items):
+            path = None
+            if data is not None:
+                path = os.path.join(job_dir, str(index))
+                with open(path, 'wb') as f:
+                    f.write(data)
+            manifest.append({'filename': filename, 'path': path})
+        with open(os.path.join(job_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+
+        now = time.time()
+        self._connection().execute(
+            'INSERT INTO jobs (id, status, total, created, updated) VALUES (?, ?, ?, ?, ?)',
+            (job_id, 'queued', len(items), now, now)
+        )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """
+        Look up a job's status.
+
+        Returns:
+            dict | None: Job status, or None if the job does not exist.
+        """
+        row = self._connection().execute(
+            'SELECT id, status, total, completed, created, updated, error FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ('job_id', 'status', 'total', 'completed', 'created', 'updated', 'error')
+        return dict(zip(keys, row))
+
+    def results(self, job_id, after=-1):
+        """
+        Fetch the recorded results of a job.
+
+        Args:
+            job_id (str): The job id.
+            after (int): Only return results with an index greater than this.
+
+        Returns:
+            list: Result dicts in index order.
+        """
+        rows = self._connection().execute(
+            'SELECT result FROM job_results WHERE job_id = ? AND idx > ? ORDER BY idx', (job_id, after)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _claim(self):
+        """Atomically move the oldest queued (or stale running) job to 'running' and return its id."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND updated < ?) "
+                "ORDER BY created LIMIT 1",
+                (now - self.stale_after,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', updated = ? WHERE id = ?", (now, row[0]))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return row[0] if row else None
+
+    def _run(self):
+        while True:
+            if self.ready_fn is not None and not self.ready_fn():
+                time.sleep(self.poll_interval)
+                continue
+            try:
+                job_id = self._claim()
+            except sqlite3.Error as e:
+                print(f"🚨 Job queue poll failed: {e}")
+                job_id = None
+            if job_id is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._process(job_id)
+
+    def _process(self, job_id):
+        conn = self._connection()
+        job_dir = os.path.join(self.spool_dir, job_id)
+        try:
+            with open(os.path.join(job_dir, 'manifest.json')) as f:
+                manifest = json.load(f)
+
+            # A requeued job resumes after the results it already recorded
+            completed = conn.execute(
+                'SELECT COUNT(*) FROM job_results WHERE job_id = ?', (job_id,)
+            ).fetchone()[0]
+            items = []
+            for entry in manifest[completed:]:
+                data = None
+                if entry['path'] is not None:
+                    with open(entry['path'], 'rb') as f:
+                        data = f.read()
+                items.append((entry['filename'], data))
+
+            for result in self.score_fn(items, completed):
+                completed += 1
+                conn.execute(
+                    'INSERT OR REPLACE INTO job_results (job_id, idx, result) VALUES (?, ?, ?)',
+                    (job_id, result['index'], json.dumps(result))
+                )
+                conn.execute(
+                    'UPDATE jobs SET completed = ?, updated = ? WHERE id = ?', (completed, time.time(), job_id)
+                )
+            conn.execute("UPDATE jobs SET status = 'done', updated = ? WHERE id = ?", (time.time(), job_id))
+        except Exception as e:
+            ERRORS.labels(endpoint='jobs').inc()
+            print(f"🚨 Job {job_id} failed: {e}")
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                ('An internal server error occurred.', time.time(), job_id)
+            )
+        shutil.rmtree(job_dir, ignore_errors=True)
@@ -0,0 +1,82 @@
+"""
+Prometheus metrics for the inference path.
+
+When PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py sets it), every gunicorn
+worker and the model server write their samples to that directory and /metrics
+aggregates them, so a scrape sees the whole container rather than one worker.
+"""
+import os
+
+# The metrics below write to the directory as soon as they are created
+if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+# Request stages, from parsing the multipart body to serializing the response
+STAGE_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0)
+STAGE_SECONDS = Histogram(
+    'df_stage_duration_seconds',
+    'Time spent in each stage of the inference path.',
+    ['stage'],
+    buckets=STAGE_BUCKETS
+)
+PARSE_SECONDS = STAGE_SECONDS.labels(stage='parse')
+SAVE_SECONDS = STAGE_SECONDS.labels(stage='save')
+DECODE_SECONDS = STAGE_SECONDS.labels(stage='decode')
+FORWARD_SECONDS = STAGE_SECONDS.labels(stage='forward')
+SERIALIZE_SECONDS = STAGE_SECONDS.labels(stage='serialize')
+THUMBNAIL_SECONDS = STAGE_SECONDS.labels(stage='thumbnail')
+
+REQUESTS = Counter(
+    'df_http_requests_total',
+    'HTTP requests handled, by endpoint and status code.',
+    ['endpoint', 'status']
+)
+ERRORS = Counter(
+    'df_errors_total',
+    'Requests or files that failed with an internal error, by endpoint.',
+    ['endpoint']
+)
+FALLBACK_REJECTIONS = Counter(
+    'df_fallback_rejections_total',
+    'Requests rejected because the model was loading or failed to load.',
+    ['endpoint', 'reason']
+)
+CACHE_LOOKUPS = Counter(
+    'df_prediction_cache_lookups_total',
+    'Prediction cache lookups, by result (hit, disk_hit or miss).',
+    ['result']
+)
+RESULT_RECORDS = Counter(
+    'df_result_records_total',
+    'Prediction results sent to Supabase, by outcome (written, failed or dropped).',
+    ['outcome']
+)
+BATCH_SIZE = Histogram(
+    'df_batch_size',
+    'Number of images in each forward pass of the model.',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+
+def render_metrics():
+    """
+    Render every metric in the Prometheus text format.
+
+    Returns:
+        tuple: (payload bytes, content type).
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -1,32 +1,709 @@
+import hashlib
+import io
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
+from PIL import Image
+
+from .metrics import BATCH_SIZE, DECODE_SECONDS, FORWARD_SECONDS
+
+# TensorFlow is imported lazily by the backends, so importing this module (and
+# starting the web server) does not pay for it until a model is actually loaded.
+
+
+def load_image_array(source, target_size=(128, 128)):
+    """
+    Decode an image into a uint8 (H, W, 3) array of the given target size.
+
+    The conversion matches `keras.preprocessing.image.load_img` (RGB, nearest
+    neighbour resize) so scores are identical to the file-based path.
+
+    Args:
+        source (str | bytes | file-like): A file path, raw image bytes or a binary stream.
+        target_size (tuple): (height, width) to resize the image to.
+
+    Returns:
+        np.ndarray: Decoded image array.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with DECODE_SECONDS.time(), Image.open(source) as img:
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        width_height = (target_size[1], target_size[0])
+        if img.size != width_height:
+            img = img.resize(width_height, Image.NEAREST)
+        return np.asarray(img, dtype=np.uint8)
+
+
+# Views scored per image in each prediction mode: the center resize only; plus its
+# mirror image; or plus a grid of crops taken at the image's native resolution.
+PREDICTION_MODES = ('single', 'flip', 'multicrop')
+
+
+def _grid_crops(img_array, crop_size, grid):
+    """
+    Cut a `grid` x `grid` set of evenly spaced crops out of an image in one gather.
+
+    Args:
+        img_array (np.ndarray): Full resolution (H, W, 3) image.
+        crop_size (tuple): (height, width) of each crop.
+        grid (int): Number of crops along each axis.
+
+    Returns:
+        np.ndarray: (grid * grid, height, width, 3) crops, or no crops if the image is smaller than one crop.
+    """
+    height, width = crop_size
+    if img_array.shape[0] < height or img_array.shape[1] < width:
+        return np.empty((0, height, width, 3), dtype=img_array.dtype)
+    ys = np.linspace(0, img_array.shape[0] - height, grid).round().astype(np.intp)
+    xs = np.linspace(0, img_array.shape[1] - width, grid).round().astype(np.intp)
+    rows = (ys[:, None] + np.arange(height))[:, None, :, None]
+    cols = (xs[:, None] + np.arange(width))[None, :, None, :]
+    return img_array[rows, cols].reshape(grid * grid, height, width, 3)
+
+
+def load_image_views(source, target_size=(128, 128), mode='single', grid=3):
+    """
+    Decode an image into the batch of views scored by a prediction mode.
+
+    The image is decoded once; the flipped view and the native resolution
+    crops are then cut from it with array operations, so every view can go
+    through the model in the same forward pass.
+
+    Args:
+        source (str | bytes | file-like): A file path, raw image bytes or a binary stream.
+        target_size (tuple): (height, width) of the model input.
+        mode (str): One of PREDICTION_MODES.
+        grid (int): Number of crops along each axis in 'multicrop' mode.
+
+    Returns:
+        np.ndarray: uint8 (N, H, W, 3) views, the center resize first.
+    """
+    if mode not in PREDICTION_MODES:
+        raise ValueError(f"Unknown prediction mode '{mode}'.")
+    if mode == 'single':
+        return load_image_array(source, target_size)[None]
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with DECODE_SECONDS.time(), Image.open(source) as img:
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        width_height = (target_size[1], target_size[0])
+        resized = img if img.size == width_height else img.resize(width_height, Image.NEAREST)
+        center = np.asarray(resized, dtype=np.uint8)
+        native = np.asarray(img, dtype=np.uint8) if mode == 'multicrop' else None
+    views = [center[None], center[None, :, ::-1]]
+    if native is not None:
+        views.append(_grid_crops(native, target_size, grid))
+    return np.concatenate(views)
+
+
+def model_fingerprint(model_path):
+    """
+    Compute a short version fingerprint from the contents of a model file.
+
+    Args:
+        model_path (str): Path to the model file.
+
+    Returns:
+        str: The first 16 hex digits of the file's SHA-256.
+    """
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class KerasBackend:
+    """Runs inference with the full Keras model."""
+
+    @staticmethod
+    def import_runtime():
+        """Import the (slow to import) runtime this backend needs."""
+        from tensorflow.keras.models import load_model
+        return load_model
 
-class InferenceModel:
-    """A class to encapsulate model loading and prediction logic safely."""
     def __init__(self, model_path):
-        self.model = None
+        load_model = self.import_runtime()
+        self.model = load_model(model_path)
+        self.input_size = tuple(self.model.input_shape[1:3])
+
+    def predict(self, batch):
+        """Run one forward pass over a (N, H, W, 3) batch and return N scores."""
+        return np.asarray(self.model.predict_on_batch(batch)).reshape(-1)
+
+
+class TFLiteBackend:
+    """
+    Runs inference with an exported TFLite model (see `ModelExporter` in train.py).
+
+    Resizing an interpreter's input reallocates all of its tensors, so batches
+    are padded up to the next power of two and each of those batch sizes gets
+    its own interpreter, allocated once. Interpreters are not thread-safe;
+    `ModelVersion` runs one forward pass at a time across both of its batchers.
+    """
+
+    @staticmethod
+    def import_runtime():
+        """Import the lightest available TFLite interpreter, falling back to full TensorFlow."""
         try:
-            if os.path.exists(model_path):
-                self.model = load_model(model_path)
-                print(f"✅ Model loaded successfully from '{model_path}'.")
-            else:
-                print(f"🚨 FATAL WARNING: Model file not found at '{model_path}'. Server will run in fallback mode.")
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            try:
+                from tflite_runtime.interpreter import Interpreter
+            except ImportError:
+                import tensorflow as tf
+                Interpreter = tf.lite.Interpreter
+        return Interpreter
+
+    @staticmethod
+    def bucket_size(batch_size):
+        """Return the batch size a batch of `batch_size` images is padded to."""
+        return 1 << (batch_size - 1).bit_length()
+
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self._Interpreter = self.import_runtime()
+        interpreter = self._Interpreter(model_path=model_path, num_threads=num_threads)
+        input_details = interpreter.get_input_details()[0]
+        self.input_index = input_details['index']
+        self.input_size = tuple(int(d) for d in input_details['shape'][1:3])
+        self.output_index = interpreter.get_output_details()[0]['index']
+        self._interpreters = {}
+        self._interpreter_for(1, interpreter)
+
+    def _interpreter_for(self, bucket, interpreter=None):
+        """Return the interpreter allocated for batches of `bucket` images, creating it on first use."""
+        if bucket not in self._interpreters:
+            if interpreter is None:
+                interpreter = self._Interpreter(model_path=self.model_path, num_threads=self.num_threads)
+            interpreter.resize_tensor_input(self.input_index, (bucket,) + self.input_size + (3,))
+            interpreter.allocate_tensors()
+            self._interpreters[bucket] = interpreter
+        return self._interpreters[bucket]
+
+    def predict(self, batch):
+        """Run one forward pass over a (N, H, W, 3) batch and return N scores."""
+        size = len(batch)
+        bucket = self.bucket_size(size)
+        if bucket != size:
+            batch = np.concatenate([batch, np.zeros((bucket - size,) + batch.shape[1:], dtype=batch.dtype)])
+        interpreter = self._interpreter_for(bucket)
+        interpreter.set_tensor(self.input_index, batch)
+        interpreter.invoke()
+        return interpreter.get_tensor(self.output_index).reshape(-1)[:size]
+
+
+def get_backend_class(model_path, backend='auto'):
+    """
+    Resolve the inference backend class for a model file.
+
+    Args:
+        model_path (str): Path to a .keras or .tflite model file.
+        backend (str): 'keras', 'tflite', or 'auto' to choose by file extension.
+
+    Returns:
+        type: KerasBackend or TFLiteBackend.
+    """
+    if backend == 'auto':
+        backend = 'tflite' if model_path.endswith('.tflite') else 'keras'
+    if backend == 'tflite':
+        return TFLiteBackend
+    if backend == 'keras':
+        return KerasBackend
+    raise ValueError(f"Unknown model backend '{backend}'.")
+
+
+def create_backend(model_path, backend='auto', num_threads=None):
+    """
+    Load a model with the requested inference backend.
+
+    Args:
+        model_path (str): Path to a .keras or .tflite model file.
+        backend (str): 'keras', 'tflite', or 'auto' to choose by file extension.
+        num_threads (int, optional): Number of CPU threads used by the TFLite interpreter.
+
+    Returns:
+        KerasBackend | TFLiteBackend: The loaded backend.
+    """
+    backend_class = get_backend_class(model_path, backend)
+    if backend_class is TFLiteBackend:
+        return TFLiteBackend(model_path, num_threads=num_threads)
+    return KerasBackend(model_path)
+
+
+class MicroBatcher:
+    """
+    Groups concurrent prediction requests into batches and runs each batch
+    through a single forward pass on a background thread.
+
+    A batch is dispatched as soon as it holds `max_batch_size` items or the
+    oldest item has waited `max_wait_ms`, whichever comes first.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5.0):
+        """
+        Args:
+            predict_fn (callable): Maps a (N, H, W, C) array to N scores.
+            max_batch_size (int): Maximum number of items per forward pass.
+            max_wait_ms (float): Maximum time to wait for a batch to fill up.
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+        self._pid = None
+        # float32 input buffer reused for every batch, allocated on first use
+        self._buffer = None
+
+    def _ensure_started(self):
+        # The worker thread is started lazily (and restarted after a fork) so the
+        # batcher is safe to create before gunicorn forks its workers.
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, img_array):
+        """
+        Queue a single preprocessed image for prediction.
+
+        Args:
+            img_array (np.ndarray): Image array of shape (H, W, C), any numeric dtype.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the model's score for the image.
+        """
+        future = Future()
+        with self._close_lock:
+            if not self._closed:
+                self._ensure_started()
+                self._queue.put((img_array, future))
+                return future
+        # A closed batcher still answers late submits, one forward pass each
+        try:
+            batch = np.asarray(img_array, dtype=np.float32)[None]
+            future.set_result(float(self.predict_fn(batch)[0]))
         except Exception as e:
-            print(f"🚨 FATAL WARNING: An error occurred while loading the model: {e}. Server will run in fallback mode.")
+            future.set_exception(e)
+        return future
+
+    @property
+    def pending(self):
+        """Number of items queued and not yet collected into a batch."""
+        return self._queue.qsize()
+
+    def close(self):
+        """Stop the worker thread once everything queued so far has been scored."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._thread is not None and self._pid == os.getpid():
+                self._queue.put(None)
+
+    def _collect(self):
+        """
+        Block for the first item, then gather more until the batch is full or the wait expires.
+
+        Returns None once the batcher has been closed and drained.
+        """
+        first = self._queue.get()
+        if first is None:
+            return None
+        items = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Closed: score this batch first, then stop on the next collect
+                self._queue.put(None)
+                break
+            items.append(item)
+        return items
+
+    def _fill_buffer(self, items):
+        """Copy the queued images into the preallocated float32 buffer and return the filled view."""
+        shape = items[0][0].shape
+        if self._buffer is None or self._buffer.shape[1:] != shape:
+            self._buffer = np.empty((self.max_batch_size,) + shape, dtype=np.float32)
+        for i, (img_array, _) in enumerate(items):
+            self._buffer[i] = img_array
+        return self._buffer[:len(items)]
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            if items is None:
+                return
+            BATCH_SIZE.observe(len(items))
+            try:
+                batch = self._fill_buffer(items)
+                with FORWARD_SECONDS.time():
+                    scores = self.predict_fn(batch)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), score in zip(items, scores):
+                future.set_result(float(score))
+
+
+class Predictor:
+    """
+    Prediction helpers shared by InferenceModel and ModelVersion.
+
+    Subclasses provide `score_arrays` and `input_size`.
+    """
+
+    @staticmethod
+    def format_prediction(prediction):
+        """
+        Turn a raw model score into the reported label and percentage.
+
+        Args:
+            prediction (float): Model score in [0, 1]; 0.5 and above is Fake.
+
+        Returns:
+            tuple: ('Real' | 'Fake', prediction percentage rounded to 2 decimals).
+        """
+        prediction_percentage = float(prediction * 100)
+        return 'Fake' if prediction >= 0.5 else 'Real', round(prediction_percentage, 2)
+
+    def predict_array(self, img_array):
+        """Predict whether a decoded (128, 128, 3) image array is Real or Fake."""
+        # Concurrent requests are batched together into a single forward pass
+        return self.format_prediction(self.score_arrays([img_array])[0])
+
+    def predict_arrays(self, img_arrays, bulk=False):
+        """
+        Predict a list of decoded image arrays in as few forward passes as possible.
+
+        Args:
+            img_arrays (list): Decoded image arrays.
+            bulk (bool): Score as background work, which yields to interactive requests.
+
+        Returns:
+            list: ('Real' | 'Fake', prediction percentage) per image, in input order.
+        """
+        return [self.format_prediction(score) for score in self.score_arrays(img_arrays, bulk=bulk)]
+
+    def predict_views(self, views):
+        """
+        Predict one image from several views of it, averaging their scores.
+
+        The views are queued together, so up to `max_batch_size` of them share one forward pass.
+
+        Args:
+            views (np.ndarray): (N, H, W, 3) views from `load_image_views`.
+
+        Returns:
+            tuple: ('Real' | 'Fake', prediction percentage).
+        """
+        return self.format_prediction(float(np.mean(self.score_arrays(list(views)))))
 
     def predict_image(self, file_path):
         """Predict whether an image is Real or Fake. Raises error if model is not loaded."""
-        if self.model is None:
+        return self.predict_array(load_image_array(file_path))
+
+    def predict_bytes(self, data, mode='single'):
+        """
+        Predict whether an in-memory image is Real or Fake, without touching the disk.
+
+        Args:
+            data (bytes | file-like): Raw image bytes or a binary stream.
+            mode (str): One of PREDICTION_MODES. 'flip' and 'multicrop' trade some latency for accuracy.
+
+        Returns:
+            tuple: ('Real' | 'Fake', prediction percentage).
+        """
+        if mode == 'single':
+            return self.predict_array(load_image_array(data, self.input_size))
+        return self.predict_views(load_image_views(data, self.input_size, mode))
+
+
+class ModelVersion(Predictor):
+    """
+    One loaded model version: its backend, version fingerprint and micro-batchers.
+
+    Interactive requests and bulk work (job workers) are batched separately.
+    A bulk forward pass only starts while no interactive batch is queued or
+    running, so bulk jobs add at most one forward pass to a request's latency.
+
+    A version retired by a hot reload keeps serving the requests that pinned it
+    (see `InferenceModel.pin`) until they finish.
+    """
+
+    def __init__(self, model, version, model_path, max_batch_size=16, max_wait_ms=5.0):
+        self.model = model
+        self.version = version
+        self.model_path = model_path
+        self.batcher = MicroBatcher(self._predict_batch, max_batch_size, max_wait_ms)
+        self.bulk_batcher = MicroBatcher(self._predict_bulk_batch, max_batch_size, max_wait_ms)
+        # Serializes the forward passes of both batchers, giving interactive ones priority
+        self._forward = threading.Condition()
+        self._forward_busy = False
+        self._interactive_waiting = 0
+
+    @property
+    def max_batch_size(self):
+        return self.batcher.max_batch_size
+
+    @property
+    def input_size(self):
+        """(height, width) of the model input."""
+        return self.model.input_size
+
+    def _forward_pass(self, batch):
+        try:
+            return self.model.predict(batch)
+        finally:
+            with self._forward:
+                self._forward_busy = False
+                self._forward.notify_all()
+
+    def _predict_batch(self, batch):
+        """Run one forward pass over an interactive (N, H, W, 3) batch and return N scores."""
+        with self._forward:
+            self._interactive_waiting += 1
+            self._forward.wait_for(lambda: not self._forward_busy)
+            self._interactive_waiting -= 1
+            self._forward_busy = True
+        return self._forward_pass(batch)
+
+    def _predict_bulk_batch(self, batch):
+        """Run one forward pass over a bulk batch once no interactive batch is waiting."""
+        def idle():
+            return not self._forward_busy and not self._interactive_waiting and not self.batcher.pending
+
+        with self._forward:
+            # Interactive items still being collected do not notify; recheck at the batching interval
+            while not self._forward.wait_for(idle, timeout=max(self.batcher.max_wait, 0.001)):
+                pass
+            self._forward_busy = True
+        return self._forward_pass(batch)
+
+    def score_arrays(self, img_arrays, bulk=False):
+        """
+        Return the raw model score of each decoded image array, in input order.
+
+        Everything is queued up front so the batcher can fill whole batches.
+        """
+        batcher = self.bulk_batcher if bulk else self.batcher
+        futures = [batcher.submit(img_array) for img_array in img_arrays]
+        return [future.result() for future in futures]
+
+    def retire(self):
+        """Stop this version's batchers once their queued requests are scored."""
+        self.batcher.close()
+        self.bulk_batcher.close()
+
+
+class InferenceModel(Predictor):
+    """
+    A class to encapsulate model loading and prediction logic safely.
+
+    The model moves through three states: 'loading' while the runtime is imported,
+    the weights are loaded and a warmup batch is run; 'ready' once it can serve;
+    and 'fallback' if loading failed. `model` stays None until the model is ready.
+
+    `reload` loads and warms up another model file alongside the serving one and
+    swaps it in atomically, so the service keeps answering throughout.
+    """
+    def __init__(self, model_path, backend='auto', max_batch_size=16, max_wait_ms=5.0, num_threads=None,
+                 warmup=True, background=False, on_swap=None):
+        """
+        Args:
+            on_swap (callable, optional): Called with (old version, new version) after a reload replaces
+                the serving model with a different version.
+        """
+        self.backend = backend
+        self.num_threads = num_threads
+        self.warmup = warmup
+        self.max_wait_ms = max_wait_ms
+        self.on_swap = on_swap
+        self.state = 'loading'
+        self.startup_timings = {}
+        self.reloading = False
+        self._max_batch_size = max(1, int(max_batch_size))
+        self._current = None
+        self._reload_lock = threading.Lock()
+        # The model path being loaded by the reload in progress, and the latest one requested meanwhile
+        self._loading_path = None
+        self._pending_path = None
+        if background:
+            # Let the server start accepting (readiness) probes while the model loads
+            threading.Thread(target=self._load, args=(model_path,), name='model-loader', daemon=True).start()
+        else:
+            self._load(model_path)
+
+    @property
+    def is_ready(self):
+        return self.state == 'ready'
+
+    @property
+    def model(self):
+        current = self._current
+        return current.model if current is not None else None
+
+    @property
+    def version(self):
+        current = self._current
+        return current.version if current is not None else None
+
+    @property
+    def model_path(self):
+        current = self._current
+        return current.model_path if current is not None else None
+
+    @property
+    def max_batch_size(self):
+        return self._max_batch_size
+
+    @property
+    def input_size(self):
+        """(height, width) of the model input."""
+        current = self._current
+        return current.input_size if current is not None else (128, 128)
+
+    def _load_version(self, model_path):
+        """Import the runtime, load the model and warm it up, timing each phase."""
+        timings = {}
+        start = time.perf_counter()
+        backend_class = get_backend_class(model_path, self.backend)
+        backend_class.import_runtime()
+        timings['import_s'] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        model = create_backend(model_path, self.backend, self.num_threads)
+        version = model_fingerprint(model_path)
+        timings['load_s'] = round(time.perf_counter() - start, 3)
+
+        if self.warmup:
+            # Trace the forward pass for a single image, a full batch and every TFLite batch
+            # size bucket in between before serving
+            start = time.perf_counter()
+            batch_sizes = {1, self._max_batch_size}
+            if backend_class is TFLiteBackend:
+                batch_sizes.update(TFLiteBackend.bucket_size(n) for n in range(1, self._max_batch_size + 1))
+            for batch_size in sorted(batch_sizes):
+                model.predict(np.zeros((batch_size,) + model.input_size + (3,), dtype=np.float32))
+            timings['warmup_s'] = round(time.perf_counter() - start, 3)
+
+        model_version = ModelVersion(model, version, model_path, self._max_batch_size, self.max_wait_ms)
+        return model_version, timings
+
+    def _load(self, model_path):
+        try:
+            if not os.path.exists(model_path):
+                print(f"🚨 FATAL WARNING: Model file not found at '{model_path}'. Server will run in fallback mode.")
+                self.state = 'fallback'
+                return
+
+            self._current, self.startup_timings = self._load_version(model_path)
+            self.state = 'ready'
+            print(f"✅ Model loaded successfully from '{model_path}' ({type(self._current.model).__name__}).")
+            print(f"⏱️ Model startup timings: {self.startup_timings}")
+        except Exception as e:
+            self.state = 'fallback'
+            print(f"🚨 FATAL WARNING: An error occurred while loading the model: {e}. Server will run in fallback mode.")
+
+    def reload(self, model_path, background=True):
+        """
+        Load a model file alongside the serving model and swap it in once it is warmed up.
+
+        Requests keep being served by the current model throughout; requests that
+        already pinned it finish on it. If the new model fails to load, the current
+        one stays in service.
+
+        A reload requested while another is in progress is queued and runs once
+        that one finishes; only the latest queued path is kept. Requesting the
+        path that is already serving, loading or queued does nothing, so the
+        same activation can arrive both directly and from the registry watcher.
+
+        Args:
+            model_path (str): Path to the new .keras or .tflite model file.
+            background (bool): Load on a background thread and return immediately.
+
+        Returns:
+            str: 'reloading' if the reload started, 'queued' if it waits for the one in progress,
+                or 'unchanged' if the model already serves, or is about to serve, that path.
+        """
+        with self._reload_lock:
+            if self.reloading:
+                latest_path = self._pending_path or self._loading_path
+            else:
+                latest_path = self.model_path if self.state == 'ready' else None
+            if model_path == latest_path:
+                return 'unchanged'
+            if self.reloading:
+                self._pending_path = model_path
+                return 'queued'
+            self.reloading = True
+            self._loading_path = model_path
+        if background:
+            threading.Thread(target=self._reload, args=(model_path,), name='model-reloader', daemon=True).start()
+        else:
+            self._reload(model_path)
+        return 'reloading'
+
+    def _reload(self, model_path):
+        while model_path is not None:
+            try:
+                new, timings = self._load_version(model_path)
+                old, self._current = self._current, new
+                self.startup_timings, self.state = timings, 'ready'
+                print(f"✅ Model version {new.version} from '{model_path}' is now serving. Reload timings: {timings}")
+                if old is not None:
+                    old.retire()
+                    if self.on_swap is not None and old.version != new.version:
+                        self.on_swap(old.version, new.version)
+            except Exception as e:
+                print(f"🚨 Reloading the model from '{model_path}' failed, the current model stays in service: {e}")
+            # Then load whatever was requested meanwhile
+            with self._reload_lock:
+                model_path, self._pending_path = self._pending_path, None
+                self._loading_path = model_path
+                if model_path is None:
+                    self.reloading = False
+
+    def pin(self):
+        """
+        Return the model version serving right now, for requests that need a consistent version.
+
+        Scoring and reporting through the returned object keeps using that version
+        even if a reload swaps in another one meanwhile.
+        """
+        current = self._current
+        if current is None:
             raise RuntimeError("Prediction called but the model is not loaded.")
-        
-        img = image.load_img(file_path, target_size=(128, 128))
-        img_array = image.img_to_array(img)
-        img_array = np.expand_dims(img_array, axis=0)
+        return current
 
-        result = self.model.predict(img_array)
-        prediction = result[0][0]
-        prediction_percentage = float(prediction * 100)
-        
-        return 'Fake' if prediction >= 0.5 else 'Real', round(prediction_percentage, 2)
\ No newline at end of file
+    def score_arrays(self, img_arrays, bulk=False):
+        """
+        Return the raw model score of each decoded image array, in input order.
+
+        Everything is queued up front so the batcher can fill whole batches.
+        """
+        return self.pin().score_arrays(img_arrays, bulk=bulk)
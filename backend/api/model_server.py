@@ -0,0 +1,265 @@
+"""
+A single inference process shared by every gunicorn worker.
+
+The model server owns the only copy of the model and its micro-batcher. Web
+workers decode uploads themselves and send the uint8 tensors over a local Unix
+socket, so requests from all workers meet in one batcher.
+
+Run it with `python -m api.model_server`; gunicorn.conf.py starts it
+automatically when DF_MODEL_SERVER_SOCKET is set. Connections are authenticated
+with DF_MODEL_SERVER_AUTHKEY, which gunicorn generates for the server and its
+workers unless one is configured.
+"""
+import os
+import threading
+import time
+from multiprocessing.connection import Listener, Client
+import numpy as np
+
+from .model import InferenceModel, Predictor
+
+
+def _authkey():
+    """
+    Return the key shared by the model server and its clients.
+
+    Messages on the socket are pickles, so an unauthenticated connection would let
+    any local process run code in the server; there is no fallback to no key.
+
+    Raises:
+        RuntimeError: If DF_MODEL_SERVER_AUTHKEY is not set.
+    """
+    key = os.getenv('DF_MODEL_SERVER_AUTHKEY')
+    if not key:
+        raise RuntimeError('DF_MODEL_SERVER_AUTHKEY must be set to use the model server.')
+    return key.encode()
+
+
+class ModelServer:
+    """Serves an InferenceModel to other processes over a Unix socket."""
+
+    def __init__(self, inference_model, socket_path):
+        """
+        Args:
+            inference_model (InferenceModel): The model to serve.
+            socket_path (str): Path of the Unix socket to listen on.
+        """
+        self.inference_model = inference_model
+        self.socket_path = socket_path
+
+    def _status(self):
+        model = self.inference_model
+        return {
+            'state': model.state,
+            'version': model.version,
+            'startup_timings': model.startup_timings,
+            'max_batch_size': model.max_batch_size,
+            'input_size': model.input_size,
+            'model_path': model.model_path,
+            'reloading': model.reloading,
+        }
+
+    def _handle(self, conn):
+        """Answer requests from one web worker thread until it disconnects."""
+        with conn:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if op == 'status':
+                        reply = ('ok', self._status())
+                    elif op in ('score', 'score_bulk'):
+                        # Report the version that produced the scores, which a reload may have changed
+                        served = self.inference_model.pin()
+                        scores = served.score_arrays(list(payload), bulk=op == 'score_bulk')
+                        reply = ('ok', (scores, served.version))
+                    else:
+                        reply = ('error', f"Unknown operation '{op}'.")
+                except Exception as e:
+                    reply = ('error', str(e))
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+
+    def serve_forever(self):
+        """Accept connections, handling each one on its own thread."""
+        authkey = _authkey()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        with Listener(self.socket_path, family='AF_UNIX', authkey=authkey) as listener:
+            # Only this user's processes can connect at all
+            os.chmod(self.socket_path, 0o600)
+            print(f"✅ Model server listening on '{self.socket_path}'.")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"🚨 Model server failed to accept a connection: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), name='model-server-conn', daemon=True).start()
+
+
+class RemoteModelVersion(Predictor):
+    """
+    The model server's serving version as pinned by one request.
+
+    The server may swap versions between two scoring calls, so `version` is the
+    one reported with the latest scores rather than a cached status snapshot.
+    """
+
+    def __init__(self, remote):
+        self._remote = remote
+        self.version = remote.version
+        self.max_batch_size = remote.max_batch_size
+        self.input_size = remote.input_size
+
+    def score_arrays(self, img_arrays, bulk=False):
+        scores, version = self._remote.score_with_version(img_arrays, bulk=bulk)
+        if version is not None:
+            self.version = version
+        return scores
+
+
+class RemoteInferenceModel(InferenceModel):
+    """
+    A drop-in replacement for InferenceModel that forwards decoded images to a ModelServer.
+
+    Each web worker thread keeps its own connection to the server. The server's
+    state is cached for `status_ttl` seconds so readiness checks stay cheap.
+    """
+
+    def __init__(self, socket_path, status_ttl=1.0, on_swap=None):
+        """
+        Args:
+            socket_path (str): Path of the model server's Unix socket.
+            status_ttl (float): Seconds the server's state is cached for.
+            on_swap (callable, optional): Called with (old version, new version) when the server is
+                seen serving a different version.
+        """
+        self.socket_path = socket_path
+        self.status_ttl = status_ttl
+        self.on_swap = on_swap
+        self._authkey = _authkey()
+        self._local = threading.local()
+        self._status = {'state': 'loading', 'version': None, 'startup_timings': {}, 'max_batch_size': 1,
+                        'input_size': (128, 128), 'model_path': None, 'reloading': False}
+        self._status_checked = 0.0
+
+    def _request(self, op, payload=None):
+        # Reconnect once if the server was restarted since the last request
+        for attempt in range(2):
+            conn = getattr(self._local, 'conn', None)
+            try:
+                if conn is None or self._local.pid != os.getpid():
+                    conn = Client(self.socket_path, family='AF_UNIX', authkey=self._authkey)
+                    self._local.conn, self._local.pid = conn, os.getpid()
+                conn.send((op, payload))
+                status, reply = conn.recv()
+                break
+            except (EOFError, OSError):
+                self._local.conn = None
+                if attempt:
+                    raise
+        if status != 'ok':
+            raise RuntimeError(f"Model server error: {reply}")
+        return reply
+
+    def _refresh_status(self):
+        if time.monotonic() - self._status_checked < self.status_ttl:
+            return self._status
+        old_version = self._status['version']
+        try:
+            self._status = self._request('status')
+        except (EOFError, OSError):
+            # The server is not up (yet); report it as loading rather than failing
+            self._status = dict(self._status, state='loading')
+        self._status_checked = time.monotonic()
+        new_version = self._status['version']
+        if self.on_swap is not None and old_version is not None and new_version not in (None, old_version):
+            self.on_swap(old_version, new_version)
+        return self._status
+
+    @property
+    def state(self):
+        return self._refresh_status()['state']
+
+    @property
+    def model(self):
+        # Truthy only while the server can serve, mirroring InferenceModel.model
+        return self if self.state == 'ready' else None
+
+    @property
+    def version(self):
+        return self._refresh_status()['version']
+
+    @property
+    def startup_timings(self):
+        return self._refresh_status()['startup_timings']
+
+    @property
+    def max_batch_size(self):
+        return self._refresh_status()['max_batch_size']
+
+    @property
+    def input_size(self):
+        return tuple(self._refresh_status()['input_size'])
+
+    @property
+    def model_path(self):
+        return self._refresh_status()['model_path']
+
+    @property
+    def reloading(self):
+        return self._refresh_status()['reloading']
+
+    def pin(self):
+        # Versions are swapped inside the model server, which pins them per scoring call
+        if self.state != 'ready':
+            raise RuntimeError("Prediction called but the model is not loaded.")
+        return RemoteModelVersion(self)
+
+    def reload(self, model_path, background=True):
+        """The model server reloads itself by watching the model registry; workers have nothing to do."""
+        return 'reloading'
+
+    def score_with_version(self, img_arrays, bulk=False):
+        """
+        Send the decoded images to the model server as one uint8 tensor.
+
+        Returns:
+            tuple: (scores, version of the model that produced them).
+        """
+        if not img_arrays:
+            return [], None
+        op = 'score_bulk' if bulk else 'score'
+        return self._request(op, np.stack(img_arrays).astype(np.uint8, copy=False))
+
+    def score_arrays(self, img_arrays, bulk=False):
+        """Send the decoded images to the model server as one uint8 tensor and return their scores."""
+        return self.score_with_version(img_arrays, bulk=bulk)[0]
+
+
+if __name__ == '__main__':
+    from .config import Config
+    from .registry import ModelRegistry
+
+    model_registry = ModelRegistry(Config.MODEL_REGISTRY_DIR, Config.MODEL_WATCH_INTERVAL) \
+        if Config.MODEL_REGISTRY_DIR else None
+    model_path = (model_registry.current() if model_registry else None) or Config.MODEL_PATH
+
+    server_model = InferenceModel(
+        model_path,
+        backend=Config.MODEL_BACKEND,
+        max_batch_size=Config.BATCH_MAX_SIZE,
+        max_wait_ms=Config.BATCH_MAX_WAIT_MS,
+        num_threads=Config.TFLITE_NUM_THREADS,
+        warmup=Config.MODEL_WARMUP,
+        background=Config.MODEL_BACKGROUND_LOAD
+    )
+    if model_registry:
+        # The server hot-reloads new model versions; workers see them through the status op
+        model_registry.watch(server_model.reload, current_path=model_path)
+    ModelServer(server_model, Config.MODEL_SERVER_SOCKET).serve_forever()
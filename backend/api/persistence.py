@@ -0,0 +1,163 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+from .metrics import RESULT_RECORDS
+
+
+class LocalTableClient:
+    """
+    A local stand-in for the Supabase client's `table(...).insert(...).execute()` API.
+
+    Rows are kept in memory per table and, if `path` is given, appended to it
+    as JSON lines. Useful in development and tests, where no Supabase project
+    is configured.
+    """
+
+    class _Query:
+        def __init__(self, client, table, rows):
+            self.client, self.table, self.rows = client, table, rows
+
+        def execute(self):
+            self.client._insert(self.table, self.rows)
+            return self
+
+    class _Table:
+        def __init__(self, client, name):
+            self.client, self.name = client, name
+
+        def insert(self, rows):
+            return LocalTableClient._Query(self.client, self.name, rows if isinstance(rows, list) else [rows])
+
+    def __init__(self, path=None):
+        self.path = path
+        self.tables = {}
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        return self._Table(self, name)
+
+    def _insert(self, table, rows):
+        with self._lock:
+            self.tables.setdefault(table, []).extend(rows)
+            if self.path:
+                with open(self.path, 'a') as f:
+                    for row in rows:
+                        f.write(json.dumps(dict(row, _table=table)) + '\n')
+
+
+class ResultRecorder:
+    """
+    Records prediction results in a Supabase table without blocking the response.
+
+    `record` only appends the row to a pending list. A background thread inserts
+    pending rows in batches of up to `batch_size`, at least every `flush_interval`
+    seconds, retrying failed batches with backoff. Rows stay pending until they
+    are inserted, so `flush` (run at exit) gets every one of them. If `max_pending`
+    rows are waiting (e.g. Supabase is down), new rows are dropped and counted
+    rather than slowing requests.
+    """
+
+    def __init__(self, client, table='predictions', batch_size=50, flush_interval=1.0, max_pending=10000,
+                 max_retries=3):
+        """
+        Args:
+            client: A Supabase client (or LocalTableClient). None disables recording.
+            table (str): Table the rows are inserted into.
+            batch_size (int): Maximum number of rows per insert.
+            flush_interval (float): Maximum seconds a row waits before its batch is inserted.
+            max_pending (int): Maximum number of rows waiting to be inserted.
+            max_retries (int): Attempts per batch before it is dropped.
+        """
+        self.client = client
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self._rows = []
+        self._inserting = False
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        # Started lazily (and restarted after a fork) so gunicorn workers each get their own thread.
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                # Rows pending in the parent process are the parent's to insert
+                self._rows = []
+                self._inserting = False
+                self._cond = threading.Condition()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='result-recorder', daemon=True)
+                self._thread.start()
+                # Insert whatever is still pending when the worker shuts down
+                atexit.register(self.flush)
+
+    def record(self, row):
+        """
+        Queue a row to be inserted.
+
+        Args:
+            row (dict): Column values. 'created_at' defaults to the current time.
+        """
+        if self.client is None:
+            return
+        self._ensure_started()
+        row.setdefault('created_at', time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+        with self._cond:
+            if len(self._rows) >= self.max_pending:
+                RESULT_RECORDS.labels(outcome='dropped').inc()
+                return
+            self._rows.append(row)
+            if len(self._rows) >= self.batch_size:
+                self._cond.notify_all()
+
+    def _insert(self, rows):
+        for attempt in range(self.max_retries):
+            try:
+                self.client.table(self.table).insert(rows).execute()
+                RESULT_RECORDS.labels(outcome='written').inc(len(rows))
+                return
+            except Exception as e:
+                print(f"🚨 Recording {len(rows)} results in '{self.table}' failed (attempt {attempt + 1}): {e}")
+                if attempt + 1 < self.max_retries:
+                    time.sleep(min(2 ** attempt, 10))
+        RESULT_RECORDS.labels(outcome='failed').inc(len(rows))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._rows)
+                # Give a partial batch up to flush_interval to fill up before inserting it
+                self._cond.wait_for(lambda: len(self._rows) >= self.batch_size, timeout=self.flush_interval)
+                rows, self._rows = self._rows[:self.batch_size], self._rows[self.batch_size:]
+                self._inserting = bool(rows)
+            if not rows:
+                # flush() took them meanwhile
+                continue
+            try:
+                self._insert(rows)
+            finally:
+                with self._cond:
+                    self._inserting = False
+                    self._cond.notify_all()
+
+    def flush(self, timeout=30.0):
+        """
+        Insert every pending row now, on the calling thread.
+
+        Args:
+            timeout (float): Maximum seconds to wait for a batch the background thread is inserting.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: not self._inserting, timeout=timeout)
+            rows, self._rows = self._rows, []
+        for i in range(0, len(rows), self.batch_size):
+            self._insert(rows[i:i + self.batch_size])
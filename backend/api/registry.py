@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+
+MODEL_EXTENSIONS = ('.keras', '.h5', '.tflite')
+CURRENT_FILE = 'CURRENT'
+
+
+class ModelRegistry:
+    """
+    A directory of versioned model files with a CURRENT file naming the active one.
+
+    Every process serving the model (each gunicorn worker, or the model server)
+    watches CURRENT and hot-reloads when it changes, so activating a version
+    once rolls it out everywhere without a restart.
+    """
+
+    def __init__(self, directory, poll_interval=5.0):
+        """
+        Args:
+            directory (str): Directory holding the model files and the CURRENT file.
+            poll_interval (float): Seconds between checks of the CURRENT file.
+        """
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _model_path(self, name):
+        """Resolve a model file name inside the registry, rejecting anything outside it."""
+        if not name or name != os.path.basename(name) or not name.endswith(MODEL_EXTENSIONS):
+            raise ValueError(f"Invalid model name '{name}'.")
+        return os.path.join(self.directory, name)
+
+    def list_models(self):
+        """
+        List the model files in the registry, newest first.
+
+        Returns:
+            list: {'name', 'size', 'modified'} per model file.
+        """
+        models = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(MODEL_EXTENSIONS):
+                stat = entry.stat()
+                models.append({'name': entry.name, 'size': stat.st_size, 'modified': stat.st_mtime})
+        return sorted(models, key=lambda m: m['modified'], reverse=True)
+
+    def current(self):
+        """
+        Return the path of the active model file, or None if no version has been activated.
+        """
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE)) as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return self._model_path(name) if name else None
+
+    def activate(self, name):
+        """
+        Make a model file the active version.
+
+        Args:
+            name (str): File name of a model in the registry.
+
+        Returns:
+            str: Path of the activated model file.
+
+        Raises:
+            ValueError: If the name is invalid or no such model exists.
+        """
+        path = self._model_path(name)
+        if not os.path.isfile(path):
+            raise ValueError(f"Model '{name}' does not exist in the registry.")
+        temp_path = os.path.join(self.directory, f'.{CURRENT_FILE}.{os.getpid()}.tmp')
+        with open(temp_path, 'w') as f:
+            f.write(name + '\n')
+        os.replace(temp_path, os.path.join(self.directory, CURRENT_FILE))
+        return path
+
+    def watch(self, on_change, current_path=None):
+        """
+        Start a thread that calls `on_change(path)` whenever the active model changes.
+
+        Args:
+            on_change (callable): Called with the newly activated model path.
+            current_path (str, optional): The path already being served, which does not trigger a change.
+        """
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, args=(on_change, current_path), name='model-watcher', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self, on_change, last_path):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                path = self.current()
+            except (OSError, ValueError) as e:
+                print(f"🚨 Could not read the active model from the registry: {e}")
+                continue
+            if path is not None and path != last_path:
+                print(f"Model registry switched to '{path}', reloading.")
+                last_path = path
+                on_change(path)
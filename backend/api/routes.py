@@ -1,23 +1,93 @@
 import os
+import json
+import time
+import zipfile
+import tempfile
 from flask import (
     Blueprint, 
     jsonify, 
     request, 
     current_app, 
     g, 
-    send_from_directory
+    send_file,
+    Response,
+    stream_with_context
 )
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
-from .utils import allowed_file
-from .auth import jwt_optional
+from PIL import Image, UnidentifiedImageError
+from .utils import allowed_file, is_archive, read_archive_members
+from .auth import admin_required, jwt_optional
+from .scoring import score_uploads
+from .video import InvalidVideoError, score_video
+from .model import PREDICTION_MODES
+from .storage import content_digest
+from .metrics import (
+    ERRORS,
+    FALLBACK_REJECTIONS,
+    PARSE_SECONDS,
+    REQUESTS,
+    SERIALIZE_SECONDS,
+    render_metrics
+)
 
-# Use the model instance created in __init__.py
-from . import inference_model
+# Use the model, storage, cache, decode pool, job queue and registry instances created in __init__.py
+from . import (
+    inference_model,
+    upload_writer,
+    content_store,
+    thumbnail_cache,
+    prediction_cache,
+    decode_pool,
+    job_queue,
+    model_registry,
+    result_recorder
+)
 
 # Create the Blueprint for these routes
 main_bp = Blueprint('main', __name__)
 
 
+@main_bp.after_request
+def record_request(response):
+    """Count every request by endpoint and status code."""
+    REQUESTS.labels(endpoint=request.endpoint, status=response.status_code).inc()
+    return response
+
+
+def _model_unavailable(action):
+    """Build the 503 response for requests that arrive while the model is loading or failed to load."""
+    state = inference_model.state
+    FALLBACK_REJECTIONS.labels(endpoint=request.endpoint, reason=state).inc()
+    if state == 'loading':
+        current_app.logger.info(f"{action} rejected: The model is still loading.")
+        response = jsonify({'error': "Our AI model is still warming up, please try again in a moment."})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    current_app.logger.warning(f"{action} rejected: Model is not loaded. The server is in fallback mode.")
+    return jsonify({'error': "Our AI model is feeling lazy right now, please try again later."}), 503
+
+
+@main_bp.route('/healthz', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return jsonify({'status': 'ok'}), 200
+
+
+@main_bp.route('/readyz', methods=['GET'])
+def readiness():
+    """Readiness probe: the model is loaded and warmed up, with the startup timings of each phase."""
+    body = {'status': inference_model.state, 'startup_timings': inference_model.startup_timings}
+    return jsonify(body), 200 if inference_model.is_ready else 503
+
+
+@main_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Exposes latency histograms and counters in the Prometheus text format."""
+    payload, content_type = render_metrics()
+    return Response(payload, mimetype=content_type)
+
+
 @main_bp.route('/upload', methods=['POST'])
 @jwt_optional
 def upload_file_api():
@@ -25,69 +95,382 @@ def upload_file_api():
     Handles file uploads.
     - If the model is loaded, it predicts and saves the image permanently.
     - If the model is NOT loaded, it rejects the upload without saving the file.
+    - An optional 'mode' field ('single', 'flip' or 'multicrop') selects how many views of the image are scored.
     """
     # 1. --- Initial File Validation ---
-    if 'file' not in request.files or not request.files['file'].filename:
+    with PARSE_SECONDS.time():
+        files = request.files
+    if 'file' not in files or not files['file'].filename:
         return jsonify({'error': 'No file selected or file part is missing.'}), 400
 
-    file = request.files['file']
+    file = files['file']
 
     if not file or not allowed_file(file.filename, current_app.config['ALLOWED_EXTENSIONS']):
         return jsonify({'error': 'Invalid file type.'}), 400
 
-    # 2. --- Fallback Logic: Model Failed to Load ---
+    mode = request.form.get('mode') or request.args.get('mode') or current_app.config['PREDICTION_MODE']
+    if mode not in PREDICTION_MODES:
+        return jsonify({'error': f"Invalid mode, expected one of: {', '.join(PREDICTION_MODES)}."}), 400
+
+    # 2. --- Fallback Logic: Model Still Loading or Failed to Load ---
     # If the model isn't loaded, reject the request immediately WITHOUT saving the file.
     if inference_model.model is None:
-        current_app.logger.warning("Upload rejected: Model is not loaded. The server is in fallback mode.")
-        return jsonify({'error': "Our AI model is feeling lazy right now, please try again later."}), 503
+        return _model_unavailable("Upload")
 
     # 3. --- Normal Prediction Logic (Model is loaded) ---
     try:
-        # Determine the permanent save folder based on auth status
-        user_folder = 'user' if g.is_authenticated else 'guest'
-        save_directory = os.path.join(current_app.config['UPLOAD_FOLDER'], user_folder)
-        
-        # Ensure the directory exists before saving
-        os.makedirs(save_directory, exist_ok=True)
-        
+        # Uploads are owned by the 'user' or 'guest' namespace based on auth status
+        namespace = 'user' if g.is_authenticated else 'guest'
+
         # Use a secure filename to prevent security vulnerabilities
         filename = secure_filename(file.filename)
-        filepath = os.path.join(save_directory, filename)
-
-        # Save the file to its permanent location
-        file.save(filepath)
-        current_app.logger.info(f"File saved permanently to {filepath}")
-        
-        # Perform the prediction on the saved file
-        result_status, prediction_percentage = inference_model.predict_image(filepath)
-        
-        # Return a successful response with the prediction results
-        return jsonify({
+
+        # Check the cache first, then predict straight from memory without a disk round trip.
+        # The serving model version is pinned so a hot reload cannot change it mid-request.
+        served = inference_model.pin()
+        data = file.read()
+        digest = content_digest(data)
+        cache_key = prediction_cache.make_key(data, served.version, mode, digest=digest)
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            result_status, prediction_percentage = cached
+        else:
+            result_status, prediction_percentage = served.predict_bytes(data, mode)
+            # With a model server, the version that answered may differ from the one looked up
+            cache_key = prediction_cache.make_key(data, served.version, mode, digest=digest)
+            prediction_cache.put(cache_key, (result_status, prediction_percentage))
+
+        # Store the file under its content hash in the background; repeat uploads are stored once
+        stored_path = upload_writer.save(data, filename, namespace, digest=digest)
+
+        # Record the result in Supabase in the background
+        result_recorder.record({
+            'user_id': g.user_id,
+            'file_url': f'/uploads/{stored_path}',
             'result': result_status,
-            'prediction_percentage': prediction_percentage
-        }), 200
-        
+            'prediction_percentage': prediction_percentage,
+            'model_version': served.version,
+            'mode': mode,
+        })
+
+        # Return a successful response with the prediction results
+        with SERIALIZE_SECONDS.time():
+            response = jsonify({
+                'result': result_status,
+                'prediction_percentage': prediction_percentage,
+                'mode': mode,
+                'model_version': served.version,
+                'file_url': f'/uploads/{stored_path}'
+            })
+        response.headers['X-Cache'] = 'HIT' if cached is not None else 'MISS'
+        return response, 200
+
+    except Image.DecompressionBombError:
+        return jsonify({'error': 'The uploaded image has too many pixels.'}), 400
+    except UnidentifiedImageError:
+        return jsonify({'error': 'The uploaded file is not a valid image.'}), 400
     except Exception as e:
+        ERRORS.labels(endpoint=request.endpoint).inc()
         current_app.logger.error(f"An unexpected error occurred during prediction or file save: {e}")
         return jsonify({'error': 'An internal server error occurred.'}), 500
     # Note: The 'finally' block that deleted the file has been intentionally removed
     # to make the save permanent on success.
 
 
+@main_bp.route('/upload/video', methods=['POST'])
+@jwt_optional
+def upload_video_api():
+    """
+    Handles video clip uploads.
+    - Samples frames from the clip as it is decoded and scores them through the model in batches.
+    - Returns the clip verdict (from the mean frame score) with the score of every sampled frame.
+    - If the model is NOT loaded, it rejects the upload without saving the file.
+    """
+    with PARSE_SECONDS.time():
+        files = request.files
+    if 'file' not in files or not files['file'].filename:
+        return jsonify({'error': 'No file selected or file part is missing.'}), 400
+
+    file = files['file']
+
+    if not allowed_file(file.filename, current_app.config['ALLOWED_VIDEO_EXTENSIONS']):
+        return jsonify({'error': 'Invalid file type.'}), 400
+
+    if inference_model.model is None:
+        return _model_unavailable("Video upload")
+
+    namespace = 'user' if g.is_authenticated else 'guest'
+    filename = secure_filename(file.filename)
+
+    # OpenCV reads from a path, so the clip is spooled into the content store and
+    # renamed into place once scored instead of being held in memory
+    fd, temp_path = tempfile.mkstemp(dir=content_store.temp_dir, suffix=os.path.splitext(filename)[1])
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            file.save(f)
+        served = inference_model.pin()
+        result = score_video(
+            temp_path,
+            served,
+            sample_fps=current_app.config['VIDEO_SAMPLE_FPS'],
+            max_frames=current_app.config['VIDEO_MAX_FRAMES'],
+            min_frames=current_app.config['VIDEO_MIN_FRAMES'],
+            early_stop_confidence=current_app.config['VIDEO_EARLY_STOP_CONFIDENCE']
+        )
+        result['model_version'] = served.version
+        result['file_url'] = '/uploads/' + content_store.put_file(temp_path, filename, namespace)
+        result_recorder.record({
+            'user_id': g.user_id,
+            'file_url': result['file_url'],
+            'result': result['result'],
+            'prediction_percentage': result['prediction_percentage'],
+            'model_version': served.version,
+            'mode': 'video',
+        })
+
+        with SERIALIZE_SECONDS.time():
+            response = jsonify(result)
+        return response, 200
+
+    except InvalidVideoError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        ERRORS.labels(endpoint=request.endpoint).inc()
+        current_app.logger.error(f"An unexpected error occurred during video prediction or file save: {e}")
+        return jsonify({'error': 'An internal server error occurred.'}), 500
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _collect_uploads():
+    """
+    Read every 'files' part of the request into memory, expanding zip archives.
+
+    Returns:
+        tuple: (list of (filename, bytes) pairs, None) or (None, error response).
+    """
+    with PARSE_SECONDS.time():
+        uploads = [f for f in request.files.getlist('files') if f and f.filename]
+    if not uploads:
+        return None, (jsonify({'error': 'No files selected or file part is missing.'}), 400)
+
+    max_files = current_app.config['BATCH_UPLOAD_MAX_FILES']
+    items = []
+    for upload in uploads:
+        if is_archive(upload.filename):
+            try:
+                items.extend(read_archive_members(upload.stream, max_files - len(items) + 1))
+            except zipfile.BadZipFile:
+                return None, (jsonify({'error': f'Invalid archive: {upload.filename}'}), 400)
+        else:
+            items.append((upload.filename, upload.read()))
+        if len(items) > max_files:
+            return None, (jsonify({'error': f'Too many files, the limit is {max_files}.'}), 413)
+    return items, None
+
+
+@main_bp.route('/upload/batch', methods=['POST'])
+@jwt_optional
+def upload_batch_api():
+    """
+    Scores many images in one request.
+    - Accepts any number of 'files' parts; zip archives of images are expanded.
+    - Decodes the images in parallel and scores them through the model in batches.
+    - Streams one NDJSON line per file, in submission order, as each batch is scored.
+    """
+    # 1. --- Collect the files from the request ---
+    items, error_response = _collect_uploads()
+    if error_response:
+        return error_response
+
+    # 2. --- Fallback Logic: Model Still Loading or Failed to Load ---
+    if inference_model.model is None:
+        return _model_unavailable("Batch upload")
+
+    # 3. --- Score and stream the results ---
+    namespace = 'user' if g.is_authenticated else 'guest'
+
+    def save_upload(filename, data):
+        upload_writer.save(data, secure_filename(os.path.basename(filename)), namespace)
+
+    results = score_uploads(
+        items,
+        current_app.config['ALLOWED_EXTENSIONS'],
+        inference_model.pin(),
+        prediction_cache,
+        decode_pool,
+        on_accepted=save_upload
+    )
+
+    def generate():
+        for entry in results:
+            yield json.dumps(entry) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@main_bp.route('/jobs', methods=['POST'])
+@jwt_optional
+def submit_job_api():
+    """
+    Queues a large submission for background scoring.
+    - Accepts the same 'files' parts and zip archives as /upload/batch.
+    - Returns a job id immediately; poll /jobs/<job_id> or stream /jobs/<job_id>/results.
+    """
+    items, error_response = _collect_uploads()
+    if error_response:
+        return error_response
+
+    if inference_model.model is None:
+        return _model_unavailable("Job")
+
+    try:
+        job_id = job_queue.submit(items)
+    except Exception as e:
+        ERRORS.labels(endpoint=request.endpoint).inc()
+        current_app.logger.error(f"An unexpected error occurred while queueing a job: {e}")
+        return jsonify({'error': 'An internal server error occurred.'}), 500
+
+    response = jsonify({'job_id': job_id, 'status': 'queued', 'total': len(items)})
+    response.headers['Location'] = f'/jobs/{job_id}'
+    return response, 202
+
+
+@main_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job_api(job_id):
+    """Reports a job's status and progress."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    return jsonify(job), 200
+
+
+@main_bp.route('/jobs/<job_id>/results', methods=['GET'])
+def get_job_results_api(job_id):
+    """
+    Returns a job's results.
+    - By default, returns the results recorded so far (optionally only those after ?after=<index>).
+    - With ?stream=1, streams NDJSON lines as results are recorded until the job finishes.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+
+    after = request.args.get('after', -1, type=int)
+    if not request.args.get('stream'):
+        return jsonify({'status': job['status'], 'results': job_queue.results(job_id, after)}), 200
+
+    def generate():
+        last = after
+        while True:
+            status = job_queue.get(job_id)['status']
+            for result in job_queue.results(job_id, last):
+                last = result['index']
+                yield json.dumps(result) + '\n'
+            if status in ('done', 'failed'):
+                break
+            time.sleep(0.5)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@main_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Reports the prediction cache's hit/miss counters for this worker."""
+    return jsonify(prediction_cache.stats()), 200
+
+
+@main_bp.route('/admin/model', methods=['GET'])
+@admin_required
+def get_model_api():
+    """Reports the serving model version and the versions available in the model registry."""
+    body = {
+        'status': inference_model.state,
+        'model_version': inference_model.version,
+        'model_path': inference_model.model_path,
+        'reloading': inference_model.reloading,
+        'startup_timings': inference_model.startup_timings,
+        'available': model_registry.list_models() if model_registry else None,
+    }
+    return jsonify(body), 200
+
+
+@main_bp.route('/admin/model', methods=['POST'])
+@admin_required
+def activate_model_api():
+    """
+    Activates a model version from the registry without downtime.
+    - Expects JSON {"model": "<file name in the registry>"}.
+    - Every worker loads and warms up the new version in the background and swaps it in
+      once ready; requests in flight finish on the previous version.
+    - The status is 'queued' if this worker is still loading a previous version; the new
+      one is loaded right after it. It is 'unchanged' if this worker already serves or loads it.
+    """
+    if model_registry is None:
+        return jsonify({'error': 'No model registry is configured (set DF_MODEL_REGISTRY_DIR).'}), 400
+
+    name = (request.get_json(silent=True) or {}).get('model')
+    try:
+        model_path = model_registry.activate(name)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # This worker reloads right away; the others pick up the change from the registry
+    status = inference_model.reload(model_path)
+    return jsonify({'status': status, 'model_path': model_path}), 202
+
+
 @main_bp.route('/uploads/<path:filepath>')
 def serve_upload(filepath):
     """
     Serves a file from the upload folder.
     This makes the uploaded images accessible via a URL.
-    Example URL: http://localhost:5000/uploads/guest/my-image.jpg
+    Example URL: http://localhost:5000/uploads/objects/ab/cd/<sha256>.jpg
+    - Content-addressed files never change: they are cached for a year, with their digest as a strong ETag.
+    - Conditional (If-None-Match) and Range requests are answered with 304 and 206 responses.
+    - ?size=<px> serves a JPEG thumbnail no larger than size x size, generated once and cached on disk.
     """
-    try:
-        # 'directory' is the path to the main 'uploads' folder
-        # 'filepath' is the rest of the path (e.g., "guest/image.jpg")
-        return send_from_directory(
-            current_app.config['UPLOAD_FOLDER'],
-            filepath,
-            as_attachment=False  # as_attachment=False displays the image in the browser
-        )
-    except FileNotFoundError:
-        return jsonify({'error': 'File not found.'}), 404
\ No newline at end of file
+    # 'filepath' is the rest of the path (e.g., "objects/ab/cd/<sha256>.jpg"); hidden (temporary) files are never served
+    source_path = safe_join(current_app.config['UPLOAD_FOLDER'], filepath)
+    if source_path is None or any(part.startswith('.') for part in filepath.split('/')) \
+            or not os.path.isfile(source_path):
+        return jsonify({'error': 'File not found.'}), 404
+
+    immutable = filepath.startswith('objects/')
+    if immutable:
+        etag = os.path.splitext(os.path.basename(filepath))[0]
+        max_age = 365 * 24 * 3600
+    else:
+        stat = os.stat(source_path)
+        etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        max_age = current_app.config['UPLOAD_CACHE_MAX_AGE']
+
+    size = request.args.get('size', type=int)
+    if size is not None:
+        if size not in current_app.config['THUMBNAIL_SIZES'] \
+                or not allowed_file(filepath, current_app.config['ALLOWED_EXTENSIONS']):
+            sizes = ', '.join(str(s) for s in sorted(current_app.config['THUMBNAIL_SIZES']))
+            return jsonify({'error': f'Thumbnails are available for images in sizes: {sizes}.'}), 400
+        etag = f'{etag}-{size}'
+        # Files outside objects/ can share a modification time and size, so their thumbnails are keyed by path too
+        thumbnail_key = etag if immutable else f'{content_digest(filepath.encode())[:16]}-{etag}'
+        # Revalidations are answered before the thumbnail is even looked up
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+        else:
+            try:
+                thumbnail_path = thumbnail_cache.get(source_path, size, thumbnail_key)
+            except (UnidentifiedImageError, OSError):
+                return jsonify({'error': 'The file is not a valid image.'}), 400
+            response = send_file(thumbnail_path, mimetype='image/jpeg', etag=etag, max_age=max_age)
+    else:
+        # as_attachment=False (the default) displays the image in the browser
+        response = send_file(source_path, etag=etag, max_age=max_age)
+
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    return response
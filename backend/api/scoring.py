@@ -0,0 +1,102 @@
+from functools import partial
+from PIL import Image, UnidentifiedImageError
+from .metrics import ERRORS
+from .model import load_image_array
+from .storage import content_digest
+from .utils import allowed_file
+
+
+def _decode_upload(item, target_size):
+    """Decode one (filename, bytes) upload at the model's input size, returning (array, error)."""
+    filename, data = item
+    if data is None:
+        return None, 'File is too large.'
+    try:
+        return load_image_array(data, target_size), None
+    except Image.DecompressionBombError:
+        return None, 'The uploaded image has too many pixels.'
+    except (UnidentifiedImageError, OSError):
+        return None, 'The uploaded file is not a valid image.'
+    except Exception as e:
+        # One undecodable file must not abort the rest of the batch
+        print(f"🚨 Could not decode uploaded file '{filename}': {e}")
+        return None, 'The uploaded file is not a valid image.'
+
+
+def score_uploads(items, allowed_extensions, model, cache, decode_pool, on_accepted=None, start_index=0,
+                  bulk=False):
+    """
+    Score many uploaded images, yielding one result dict per file in input order.
+
+    Files are decoded in parallel on `decode_pool`, looked up in the prediction
+    cache, and the cache misses of every chunk of `model.max_batch_size`
+    files are scored together. Results are yielded a chunk at a time.
+
+    Args:
+        items (list): (filename, bytes) pairs. Bytes may be None for files that were rejected as too large.
+        allowed_extensions (set): Accepted file extensions.
+        model (InferenceModel | ModelVersion): The model to score with; pin a version for consistent results.
+        cache (PredictionCache): Prediction cache to consult and fill.
+        decode_pool (concurrent.futures.Executor): Pool used to decode images.
+        on_accepted (callable, optional): Called with (filename, bytes) for every decodable image.
+        start_index (int): Index reported for the first item.
+        bulk (bool): Score as background work, which yields to interactive requests (e.g. for jobs).
+
+    Yields:
+        dict: {'index', 'filename'} plus either {'result', 'prediction_percentage', 'cached', 'model_version'}
+            or {'error'}.
+    """
+    # Invalid file types never reach the decoder; the rest are decoded in parallel in the background
+    valid = [allowed_file(filename, allowed_extensions) for filename, _ in items]
+    decoded = decode_pool.map(
+        partial(_decode_upload, target_size=model.input_size), [item for item, ok in zip(items, valid) if ok]
+    )
+    chunk_size = model.max_batch_size
+    pending = []
+
+    def flush():
+        # Score every cache miss in the chunk together, then emit the chunk in order
+        misses = [entry for entry in pending if 'img_array' in entry]
+        try:
+            scores = model.predict_arrays([entry.pop('img_array') for entry in misses], bulk=bulk)
+        except Exception as e:
+            ERRORS.labels(endpoint='batch_scoring').inc()
+            print(f"🚨 An unexpected error occurred during batch prediction: {e}")
+            scores = None
+        for i, entry in enumerate(misses):
+            # Keyed by the version that scored the chunk, which a model server may have swapped meanwhile
+            cache_key = cache.make_key(None, model.version, digest=entry.pop('digest'))
+            if scores is None:
+                entry['error'] = 'An internal server error occurred.'
+                continue
+            result_status, prediction_percentage = scores[i]
+            cache.put(cache_key, (result_status, prediction_percentage))
+            entry.update(result=result_status, prediction_percentage=prediction_percentage, cached=False,
+                         model_version=model.version)
+        chunk = list(pending)
+        pending.clear()
+        return chunk
+
+    for index, ((filename, data), ok) in enumerate(zip(items, valid), start=start_index):
+        entry = {'index': index, 'filename': filename}
+        if not ok:
+            entry['error'] = 'Invalid file type.'
+        else:
+            img_array, error = next(decoded)
+            if error:
+                entry['error'] = error
+            else:
+                digest = content_digest(data)
+                cached = cache.get(cache.make_key(data, model.version, digest=digest))
+                if cached is not None:
+                    entry.update(result=cached[0], prediction_percentage=cached[1], cached=True,
+                                 model_version=model.version)
+                else:
+                    entry.update(img_array=img_array, digest=digest)
+                if on_accepted is not None:
+                    on_accepted(filename, data)
+        pending.append(entry)
+        if len(pending) >= chunk_size:
+            yield from flush()
+    if pending:
+        yield from flush()
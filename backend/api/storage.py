@@ -0,0 +1,385 @@
+import atexit
+import hashlib
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .metrics import SAVE_SECONDS
+
+
+def content_digest(data):
+    """Return the SHA-256 hex digest that content-addressed uploads are stored under."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ContentStore:
+    """
+    Content-addressed storage for uploaded files.
+
+    Every file is stored once, under its SHA-256 digest, in sharded
+    subdirectories (objects/ab/cd/<digest>.<ext>), and written with a
+    temp-file-and-rename so readers never see a partial file. A SQLite index
+    records each upload as a reference to its object; an object is deleted
+    when its last reference is, e.g. by the retention sweeper.
+    """
+
+    def __init__(self, root, db_path):
+        """
+        Args:
+            root (str): The upload folder. Objects are stored under root/objects.
+            db_path (str): Path of the SQLite index shared by all workers.
+        """
+        self.root = root
+        self.db_path = db_path
+        self.objects_dir = os.path.join(root, 'objects')
+        self.temp_dir = os.path.join(self.objects_dir, '.tmp')
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._pid = None
+
+        os.makedirs(self.temp_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS objects ('
+            'digest TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, '
+            'refcount INTEGER NOT NULL, created REAL NOT NULL)'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS refs ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, digest TEXT NOT NULL, namespace TEXT NOT NULL, '
+            'filename TEXT NOT NULL, created REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS refs_namespace ON refs (namespace, created)')
+        conn.execute('CREATE INDEX IF NOT EXISTS refs_digest ON refs (digest)')
+
+    def _connection(self):
+        # SQLite connections cannot be shared across threads or forked processes.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def object_path(self, digest, filename):
+        """
+        Return the path (relative to the upload folder) an object is stored at.
+
+        Args:
+            digest (str): SHA-256 hex digest of the content.
+            filename (str): Original file name, whose extension is kept.
+        """
+        extension = os.path.splitext(filename)[1].lower()
+        if extension == '.jpeg':
+            extension = '.jpg'
+        return '/'.join(('objects', digest[:2], digest[2:4], digest + extension))
+
+    def lookup(self, digest):
+        """
+        Return the path (relative to the upload folder) an object is stored at, or None if it is not stored.
+
+        Args:
+            digest (str): SHA-256 hex digest of the content.
+        """
+        row = self._connection().execute('SELECT path FROM objects WHERE digest = ?', (digest,)).fetchone()
+        return row[0] if row else None
+
+    def _add_reference(self, digest, filename, namespace, size, write):
+        """
+        Record a reference to an object, calling `write(full_path)` if the object is not stored yet.
+
+        The object is written while the index is locked, so the sweeper can never
+        delete it between the existence check and the new reference.
+        """
+        relative_path = self.object_path(digest, filename)
+        full_path = os.path.join(self.root, relative_path)
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Identical content uploaded under another extension reuses the stored object
+            row = conn.execute('SELECT path FROM objects WHERE digest = ?', (digest,)).fetchone()
+            if row is not None:
+                relative_path = row[0]
+                full_path = os.path.join(self.root, relative_path)
+            if not os.path.exists(full_path):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                write(full_path)
+            conn.execute(
+                'INSERT INTO objects (digest, path, size, refcount, created) VALUES (?, ?, ?, 1, ?) '
+                'ON CONFLICT(digest) DO UPDATE SET refcount = refcount + 1',
+                (digest, relative_path, size, now)
+            )
+            conn.execute(
+                'INSERT INTO refs (digest, namespace, filename, created) VALUES (?, ?, ?, ?)',
+                (digest, namespace, filename, now)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return relative_path
+
+    def put(self, data, filename, namespace, digest=None):
+        """
+        Store an upload, writing its content only if no identical file is stored yet.
+
+        Args:
+            data (bytes): File contents.
+            filename (str): Original (secure) file name.
+            namespace (str): Owner of the upload, e.g. 'guest' or 'user'.
+            digest (str, optional): SHA-256 hex digest of `data`, if already computed.
+
+        Returns:
+            str: Path of the stored object, relative to the upload folder.
+        """
+        digest = digest or content_digest(data)
+
+        def write(full_path):
+            fd, temp_path = tempfile.mkstemp(dir=self.temp_dir)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, full_path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+        return self._add_reference(digest, filename, namespace, len(data), write)
+
+    def put_file(self, source_path, filename, namespace):
+        """
+        Store a file that was spooled to disk (in `temp_dir`), moving it into place instead of copying it.
+
+        The source file is consumed: it is renamed into the store, or deleted if the content is already stored.
+
+        Returns:
+            str: Path of the stored object, relative to the upload folder.
+        """
+        digest = hashlib.sha256()
+        with open(source_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        size = os.path.getsize(source_path)
+        try:
+            return self._add_reference(
+                digest.hexdigest(), filename, namespace, size, lambda full_path: os.replace(source_path, full_path)
+            )
+        finally:
+            if os.path.exists(source_path):
+                os.remove(source_path)
+
+    def _delete_references(self, conn, ref_ids):
+        """Delete references and any objects left without one. Must run inside a write transaction."""
+        for ref_id, digest in ref_ids:
+            conn.execute('DELETE FROM refs WHERE id = ?', (ref_id,))
+            conn.execute('UPDATE objects SET refcount = refcount - 1 WHERE digest = ?', (digest,))
+        orphans = conn.execute('SELECT digest, path, size FROM objects WHERE refcount <= 0').fetchall()
+        freed = 0
+        for digest, relative_path, size in orphans:
+            try:
+                os.remove(os.path.join(self.root, relative_path))
+                freed += size
+            except FileNotFoundError:
+                pass
+            conn.execute('DELETE FROM objects WHERE digest = ?', (digest,))
+        return len(orphans), freed
+
+    def _namespace_bytes(self, conn, namespace):
+        """Bytes stored only on behalf of a namespace, i.e. freed if all of its references were deleted."""
+        return conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM objects o WHERE NOT EXISTS '
+            '(SELECT 1 FROM refs r WHERE r.digest = o.digest AND r.namespace != ?)',
+            (namespace,)
+        ).fetchone()[0]
+
+    def sweep(self, namespace, max_bytes=None, max_age=None, chunk_size=500):
+        """
+        Enforce a retention budget on one namespace, deleting its oldest uploads first.
+
+        Args:
+            namespace (str): Namespace to sweep, e.g. 'guest'.
+            max_bytes (int, optional): Maximum bytes stored only for this namespace.
+            max_age (float, optional): Maximum age of an upload in seconds.
+            chunk_size (int): References deleted per transaction, so uploads are never blocked for long.
+
+        Returns:
+            dict: Number of references and objects deleted, and the bytes freed.
+        """
+        conn = self._connection()
+        stats = {'references': 0, 'objects': 0, 'bytes': 0}
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                ref_ids = []
+                if max_age:
+                    ref_ids = conn.execute(
+                        'SELECT id, digest FROM refs WHERE namespace = ? AND created < ? ORDER BY created LIMIT ?',
+                        (namespace, time.time() - max_age, chunk_size)
+                    ).fetchall()
+                excess = self._namespace_bytes(conn, namespace) - max_bytes if max_bytes and not ref_ids else 0
+                if excess > 0:
+                    # Oldest first, only as many as it takes to get back under the budget
+                    rows = conn.execute(
+                        'SELECT r.id, r.digest, o.size FROM refs r JOIN objects o ON o.digest = r.digest '
+                        'WHERE r.namespace = ? ORDER BY r.created LIMIT ?',
+                        (namespace, chunk_size)
+                    )
+                    for ref_id, digest, size in rows:
+                        ref_ids.append((ref_id, digest))
+                        excess -= size
+                        if excess <= 0:
+                            break
+                objects, freed = self._delete_references(conn, ref_ids)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            if not ref_ids:
+                return stats
+            stats['references'] += len(ref_ids)
+            stats['objects'] += objects
+            stats['bytes'] += freed
+
+    def start_sweeper(self, policies, interval=600.0):
+        """
+        Start a thread that sweeps every namespace with a retention policy every `interval` seconds.
+
+        Args:
+            policies (dict): Namespace -> {'max_bytes': ..., 'max_age': ...}.
+            interval (float): Seconds between sweeps.
+        """
+        if self._sweeper is not None and self._pid == os.getpid() and self._sweeper.is_alive():
+            return
+        with self._lock:
+            if self._sweeper is None or self._pid != os.getpid() or not self._sweeper.is_alive():
+                self._pid = os.getpid()
+                self._sweeper = threading.Thread(
+                    target=self._run_sweeper, args=(policies, interval), name='retention-sweeper', daemon=True
+                )
+                self._sweeper.start()
+
+    def _run_sweeper(self, policies, interval):
+        while True:
+            for namespace, policy in policies.items():
+                try:
+                    stats = self.sweep(namespace, **policy)
+                    if stats['references']:
+                        print(f"Retention sweep removed {stats['references']} '{namespace}' uploads "
+                              f"({stats['bytes']} bytes freed).")
+                except (sqlite3.Error, OSError) as e:
+                    print(f"🚨 Retention sweep of '{namespace}' uploads failed: {e}")
+            time.sleep(interval)
+
+
+class BackgroundWriter:
+    """
+    Writes uploaded files to the content store on a background thread so that
+    saving an upload never sits on the request's critical path. Queued uploads
+    are written before the process exits (for up to `drain_timeout` seconds),
+    since their URLs have already been handed out.
+    """
+
+    def __init__(self, store, max_pending=256, drain_timeout=30.0):
+        """
+        Args:
+            store (ContentStore): Where uploads are stored.
+            max_pending (int): Maximum number of queued writes before `save` blocks.
+            drain_timeout (float): Maximum seconds spent writing queued uploads at exit.
+        """
+        self.store = store
+        self.max_pending = max_pending
+        self.drain_timeout = drain_timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        # Digest -> [path, queued writes] of uploads that are queued but not stored yet
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Started lazily (and restarted after a fork) so gunicorn workers each get their own thread.
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue(maxsize=self.max_pending)
+                self._pending = {}
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='upload-writer', daemon=True)
+                self._thread.start()
+                # Store whatever is still queued when the worker shuts down
+                atexit.register(self.drain)
+
+    def save(self, data, filename, namespace, digest=None):
+        """
+        Queue an upload to be stored.
+
+        Args:
+            data (bytes): File contents.
+            filename (str): Original (secure) file name.
+            namespace (str): Owner of the upload, e.g. 'guest' or 'user'.
+            digest (str, optional): SHA-256 hex digest of `data`, if already computed.
+
+        Returns:
+            str: Path the upload will be stored at, relative to the upload folder.
+        """
+        digest = digest or content_digest(data)
+        self._ensure_started()
+        # Identical content is stored once, under the extension it was first uploaded with
+        with self._pending_lock:
+            pending = self._pending.get(digest)
+            if pending is None:
+                pending = self._pending[digest] = [
+                    self.store.lookup(digest) or self.store.object_path(digest, filename), 0
+                ]
+            pending[1] += 1
+        self._queue.put((data, filename, namespace, digest))
+        return pending[0]
+
+    def drain(self, timeout=None):
+        """
+        Wait until every queued upload is stored.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait. Defaults to `drain_timeout`.
+
+        Returns:
+            bool: True if the queue was drained, False if the timeout expired first.
+        """
+        deadline = time.monotonic() + (self.drain_timeout if timeout is None else timeout)
+        queue_ = self._queue
+        with queue_.all_tasks_done:
+            while queue_.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"🚨 {queue_.unfinished_tasks} queued uploads were not stored before exit.")
+                    return False
+                queue_.all_tasks_done.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            data, filename, namespace, digest = self._queue.get()
+            try:
+                with SAVE_SECONDS.time():
+                    path = self.store.put(data, filename, namespace, digest)
+                print(f"File saved permanently to {path}")
+            except (OSError, sqlite3.Error) as e:
+                print(f"🚨 Error saving upload '{filename}': {e}")
+            finally:
+                with self._pending_lock:
+                    pending = self._pending.get(digest)
+                    if pending is not None:
+                        pending[1] -= 1
+                        if pending[1] <= 0:
+                            del self._pending[digest]
+                self._queue.task_done()
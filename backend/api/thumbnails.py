@@ -0,0 +1,102 @@
+import os
+import tempfile
+import threading
+from PIL import Image
+
+from .metrics import THUMBNAIL_SECONDS
+
+
+class ThumbnailCache:
+    """
+    Small renditions of uploaded images, generated on first request and kept on disk.
+
+    Every worker shares the cache directory. When it grows beyond `max_bytes`,
+    the least recently used thumbnails are evicted (each hit refreshes a
+    thumbnail's modification time).
+    """
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024, quality=85):
+        """
+        Args:
+            cache_dir (str): Directory the thumbnails are stored in.
+            max_bytes (int): Size budget of the cache directory.
+            quality (int): JPEG quality of the thumbnails.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Estimate of the cache size; eviction rescans the directory for the real figure
+        self._bytes = sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        """Yield (path, size, mtime) for every cached thumbnail."""
+        for shard in os.scandir(self.cache_dir):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.is_file() and not entry.name.startswith('.'):
+                        stat = entry.stat()
+                        yield entry.path, stat.st_size, stat.st_mtime
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.jpg')
+
+    def get(self, source_path, size, key):
+        """
+        Return the path of a thumbnail of `source_path`, generating it if it is not cached.
+
+        Args:
+            source_path (str): Path of the original image.
+            size (int): Maximum width and height of the thumbnail.
+            key (str): Identifies this version of the source at this size, e.g. its ETag.
+
+        Returns:
+            str: Path of the JPEG thumbnail.
+
+        Raises:
+            PIL.UnidentifiedImageError: If the source is not a readable image.
+        """
+        path = self._path(key)
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        with THUMBNAIL_SECONDS.time(), Image.open(source_path) as img:
+            # JPEGs are decoded straight at a reduced scale, which is much cheaper than a full decode
+            img.draft('RGB', (size, size))
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            img.thumbnail((size, size))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    img.save(f, format='JPEG', quality=self.quality, optimize=True)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+        with self._lock:
+            self._bytes += os.path.getsize(path)
+            if self._bytes > self.max_bytes:
+                self._evict()
+        return path
+
+    def _evict(self):
+        """Delete the least recently used thumbnails until the cache is back to 80% of its budget."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.8
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._bytes = total
@@ -1,4 +1,43 @@
+import zipfile
+
+# Archive members larger than this are skipped rather than decompressed into memory
+MAX_ARCHIVE_MEMBER_BYTES = 32 * 1024 * 1024
+
+
 def allowed_file(filename, allowed_extensions):
     """Check if a file has an allowed extension."""
     return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in allowed_extensions
\ No newline at end of file
+           filename.rsplit('.', 1)[1].lower() in allowed_extensions
+
+
+def is_archive(filename):
+    """Check if a file is a zip archive of images."""
+    return filename.lower().endswith('.zip')
+
+
+def read_archive_members(stream, max_files):
+    """
+    Read the regular files of a zip archive into memory.
+
+    Args:
+        stream (file-like): Seekable binary stream holding the archive.
+        max_files (int): Maximum number of members to read.
+
+    Returns:
+        list: (member name, bytes) pairs. Members that are too large are returned with None bytes.
+
+    Raises:
+        zipfile.BadZipFile: If the stream is not a valid zip archive.
+    """
+    members = []
+    with zipfile.ZipFile(stream) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            if len(members) >= max_files:
+                break
+            if info.file_size > MAX_ARCHIVE_MEMBER_BYTES:
+                members.append((info.filename, None))
+                continue
+            members.append((info.filename, archive.read(info)))
+    return members
@@ -0,0 +1,111 @@
+import numpy as np
+
+from .metrics import DECODE_SECONDS
+
+
+class InvalidVideoError(ValueError):
+    """Raised when an uploaded file cannot be decoded as a video."""
+
+
+def _sampled_frames(capture, frame_step, max_frames):
+    """
+    Yield (frame index, BGR frame) for every `frame_step`-th frame, decoding only those.
+
+    Skipped frames are only grabbed (demuxed), never decoded into an image.
+    """
+    index = 0
+    sampled = 0
+    while sampled < max_frames:
+        if not capture.grab():
+            return
+        if index % frame_step == 0:
+            with DECODE_SECONDS.time():
+                ok, frame = capture.retrieve()
+            if not ok:
+                return
+            sampled += 1
+            yield index, frame
+        index += 1
+
+
+def score_video(path, model, sample_fps=2.0, max_frames=300, min_frames=16, early_stop_confidence=0.9):
+    """
+    Score a video clip by sampling frames and running them through the model in batches.
+
+    Frames are decoded as a stream and written into one reusable batch buffer,
+    so memory stays bounded however long the clip is. Once at least
+    `min_frames` frames are scored, scoring stops early if the running mean
+    score is already confidently Real or Fake.
+
+    Args:
+        path (str): Path of the video file.
+        model (InferenceModel): The loaded inference model.
+        sample_fps (float): Frames sampled per second of video. 0 scores every frame.
+        max_frames (int): Maximum number of frames to score.
+        min_frames (int): Minimum number of frames scored before stopping early.
+        early_stop_confidence (float): Stop once the mean score is at least this (Fake) or
+            at most 1 minus this (Real). 1 or more disables early stopping.
+
+    Returns:
+        dict: The clip verdict, its aggregate scores and the score of every sampled frame.
+
+    Raises:
+        InvalidVideoError: If the file cannot be opened as a video or has no readable frames.
+    """
+    # OpenCV is only needed (and only imported) when a video is actually scored
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise InvalidVideoError('The uploaded file is not a valid video.')
+    try:
+        native_fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_step = 1
+        if sample_fps and native_fps > 0:
+            frame_step = max(1, int(round(native_fps / sample_fps)))
+
+        height, width = model.input_size
+        batch = np.empty((model.max_batch_size, height, width, 3), dtype=np.uint8)
+        frames = []
+        filled = 0
+        early_stopped = False
+
+        def flush():
+            scores = model.score_arrays(list(batch[:filled]))
+            for frame, score in zip(frames[-filled:], scores):
+                frame['score'] = round(score, 4)
+
+        for index, frame in _sampled_frames(capture, frame_step, max_frames):
+            # Nearest-neighbour resize and RGB order, as for uploaded images
+            resized = cv2.resize(frame, (width, height), interpolation=cv2.INTER_NEAREST)
+            batch[filled] = resized[..., ::-1]
+            frames.append({'frame': index, 'time_s': round(index / native_fps, 3) if native_fps > 0 else None})
+            filled += 1
+            if filled < len(batch):
+                continue
+            flush()
+            filled = 0
+            mean_score = sum(f['score'] for f in frames) / len(frames)
+            if len(frames) >= min_frames and max(mean_score, 1 - mean_score) >= early_stop_confidence:
+                early_stopped = True
+                break
+        if filled:
+            flush()
+    finally:
+        capture.release()
+
+    if not frames:
+        raise InvalidVideoError('The uploaded video has no readable frames.')
+
+    scores = [f['score'] for f in frames]
+    mean_score = sum(scores) / len(scores)
+    result_status, prediction_percentage = model.format_prediction(mean_score)
+    return {
+        'result': result_status,
+        'prediction_percentage': prediction_percentage,
+        'max_frame_percentage': round(max(scores) * 100, 2),
+        'fake_frame_ratio': round(sum(score >= 0.5 for score in scores) / len(scores), 4),
+        'frames_scored': len(frames),
+        'early_stopped': early_stopped,
+        'frames': frames,
+    }
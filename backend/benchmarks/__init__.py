@@ -0,0 +1,8 @@
+"""
+Reproducible benchmarks for the serving and training hot paths.
+
+Run from the backend directory, for example:
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --suite inference --baseline results.json
+"""
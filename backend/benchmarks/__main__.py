@@ -0,0 +1,53 @@
+import argparse
+import json
+import sys
+
+from . import dataset, inference, upload
+from .common import environment, set_seed, tiny_model_path
+from .compare import compare
+
+SUITES = ('inference', 'upload', 'dataset')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the serving and training hot paths.')
+    parser.add_argument('--suite', choices=SUITES + ('all',), default='all', help='benchmark suite to run')
+    parser.add_argument('--model', help='model file to benchmark (default: a randomly initialized model)')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='compare the results against this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative regression (default 0.10)')
+    args = parser.parse_args(argv)
+
+    set_seed()
+    suites = SUITES if args.suite == 'all' else (args.suite,)
+    model_path = args.model
+    if model_path is None and ('inference' in suites or 'upload' in suites):
+        model_path = tiny_model_path()
+
+    results = {}
+    if 'inference' in suites:
+        results.update(inference.run(model_path))
+    if 'upload' in suites:
+        results.update(upload.run(model_path))
+    if 'dataset' in suites:
+        results.update(dataset.run())
+
+    report = {'environment': environment(), 'results': results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(report, baseline, args.tolerance)
+        print('\n'.join(lines))
+        if regressions:
+            print(f'{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
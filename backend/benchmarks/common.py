@@ -0,0 +1,97 @@
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import numpy as np
+
+# Every benchmark draws its synthetic data from this seed so runs are comparable
+SEED = 42
+
+
+def set_seed(seed=SEED):
+    """Seed NumPy and TensorFlow."""
+    import tensorflow as tf
+    np.random.seed(seed)
+    tf.random.set_seed(seed)
+
+
+def summarize_latencies(latencies_s, elapsed_s, count):
+    """
+    Summarize per-call latencies and overall throughput.
+
+    Args:
+        latencies_s (list): Latency of each call in seconds.
+        elapsed_s (float): Wall-clock duration of the whole run in seconds.
+        count (int): Number of images processed during the run.
+
+    Returns:
+        dict: Throughput in images per second and latency percentiles in milliseconds.
+    """
+    latencies_ms = np.asarray(latencies_s) * 1000.0
+    return {
+        'images_per_s': round(count / elapsed_s, 2),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p90_ms': round(float(np.percentile(latencies_ms, 90)), 3),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 3),
+    }
+
+
+def random_images(count, size=(128, 128), seed=SEED):
+    """Generate `count` random uint8 RGB images of the given (height, width)."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(count, size[0], size[1], 3), dtype=np.uint8)
+
+
+def encode_jpeg(img_array, quality=90):
+    """Encode a uint8 RGB array as JPEG bytes."""
+    import io
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.fromarray(img_array).save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def tiny_model_path(directory=None):
+    """
+    Save a randomly initialized DeepfakeDetectorModel so benchmarks need no trained weights.
+
+    Args:
+        directory (str, optional): Where to save the model. Defaults to a new temporary directory.
+
+    Returns:
+        str: Path to the saved .keras model.
+    """
+    from train import DeepfakeDetectorModel
+    set_seed()
+    directory = directory or tempfile.mkdtemp(prefix='df-bench-')
+    path = os.path.join(directory, 'bench_model.keras')
+    DeepfakeDetectorModel().save_model(path)
+    return path
+
+
+def timed(fn, *args, **kwargs):
+    """Call `fn` and return (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def environment():
+    """Describe the machine and software versions the benchmarks ran on."""
+    import tensorflow as tf
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'tensorflow': tf.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
@@ -0,0 +1,43 @@
+def _higher_is_better(metric):
+    return metric.endswith('_per_s')
+
+
+def _lower_is_better(metric):
+    return metric.endswith('_ms') or metric.endswith('_s')
+
+
+def compare(current, baseline, tolerance=0.10):
+    """
+    Compare benchmark results against a stored baseline.
+
+    Throughput metrics (`*_per_s`) regress when they drop, latency and timing
+    metrics (`*_ms`, `*_s`) regress when they grow, by more than `tolerance`.
+
+    Args:
+        current (dict): Results from this run, as written by `python -m benchmarks`.
+        baseline (dict): Results from the baseline run.
+        tolerance (float): Allowed relative change before a metric counts as a regression.
+
+    Returns:
+        tuple: (list of report lines, list of regressed 'benchmark.metric' names).
+    """
+    lines, regressions = [], []
+    for name, metrics in sorted(current['results'].items()):
+        base_metrics = baseline['results'].get(name)
+        if base_metrics is None:
+            lines.append(f'{name}: no baseline')
+            continue
+        for metric, value in sorted(metrics.items()):
+            base = base_metrics.get(metric)
+            if not isinstance(value, (int, float)) or not base:
+                continue
+            change = (value - base) / base
+            regressed = (
+                (_higher_is_better(metric) and change < -tolerance) or
+                (not _higher_is_better(metric) and _lower_is_better(metric) and change > tolerance)
+            )
+            if regressed:
+                regressions.append(f'{name}.{metric}')
+            marker = 'REGRESSION' if regressed else 'ok'
+            lines.append(f'{name}.{metric}: {base} -> {value} ({change:+.1%}) {marker}')
+    return lines, regressions
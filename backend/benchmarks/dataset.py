@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+
+from .common import encode_jpeg, random_images
+
+
+def make_synthetic_dataset(root, images_per_class=256, image_size=(256, 256)):
+    """
+    Write a Train/{Fake,Real} tree of random JPEGs, laid out like the Kaggle dataset.
+
+    Returns:
+        str: Path of the dataset directory.
+    """
+    dataset_dir = os.path.join(root, 'Dataset')
+    for label_index, label in enumerate(('Fake', 'Real')):
+        class_dir = os.path.join(dataset_dir, 'Train', label)
+        os.makedirs(class_dir, exist_ok=True)
+        images = random_images(images_per_class, size=image_size, seed=label_index)
+        for i, img in enumerate(images):
+            with open(os.path.join(class_dir, f'{i:05d}.jpg'), 'wb') as f:
+                f.write(encode_jpeg(img))
+    return dataset_dir
+
+
+def bench_dataset(dataset, epochs=3):
+    """
+    Iterate a dataset for a few epochs and report images per second for each.
+
+    Returns:
+        dict: Images per second for the first (cold) epoch and the best later epoch.
+    """
+    rates = []
+    for _ in range(epochs):
+        count = 0
+        start = time.perf_counter()
+        for images, _ in dataset:
+            count += int(images.shape[0])
+        rates.append(count / (time.perf_counter() - start))
+    return {
+        'first_epoch_images_per_s': round(rates[0], 2),
+        'images_per_s': round(max(rates[1:] or rates), 2),
+    }
+
+
+def run(images_per_class=256):
+    """
+    Run the training input pipeline benchmark on a synthetic dataset.
+
+    Returns:
+        dict: Results keyed by benchmark name.
+    """
+    from train import DatasetHandler
+    root = tempfile.mkdtemp(prefix='df-bench-dataset-')
+    dataset_dir = make_synthetic_dataset(root, images_per_class)
+    results = {}
+    for name, cache in (('dataset.train', None), ('dataset.train_cached', 'memory')):
+        handler = DatasetHandler(None, root, 'dataset.zip', dataset_dir, 'Train', 'Test', 'Validation', cache=cache)
+        results[name] = bench_dataset(handler.get_image_dataset_from_directory('Train'))
+    return results
@@ -0,0 +1,117 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import encode_jpeg, random_images, summarize_latencies
+
+
+def bench_single(model, iterations=200, warmup=20):
+    """
+    Measure sequential single-image prediction through InferenceModel.
+
+    Args:
+        model (InferenceModel): Loaded model.
+        iterations (int): Number of timed predictions.
+        warmup (int): Number of untimed predictions run first.
+
+    Returns:
+        dict: Throughput and latency percentiles.
+    """
+    images = random_images(iterations + warmup)
+    for img in images[:warmup]:
+        model.predict_array(img)
+    latencies = []
+    start = time.perf_counter()
+    for img in images[warmup:]:
+        call_start = time.perf_counter()
+        model.predict_array(img)
+        latencies.append(time.perf_counter() - call_start)
+    return summarize_latencies(latencies, time.perf_counter() - start, iterations)
+
+
+def bench_batched(model, batch_size, batches=50, warmup=5):
+    """
+    Measure prediction of whole batches submitted at once, as the batch endpoints do.
+
+    Returns:
+        dict: Throughput and per-batch latency percentiles.
+    """
+    images = random_images((batches + warmup) * batch_size)
+    chunks = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+    for chunk in chunks[:warmup]:
+        model.predict_arrays(list(chunk))
+    latencies = []
+    start = time.perf_counter()
+    for chunk in chunks[warmup:]:
+        call_start = time.perf_counter()
+        model.predict_arrays(list(chunk))
+        latencies.append(time.perf_counter() - call_start)
+    return summarize_latencies(latencies, time.perf_counter() - start, batches * batch_size)
+
+
+def bench_concurrent(model, concurrency, requests_per_client=50):
+    """
+    Measure single-image predictions issued from several threads, exercising the micro-batcher.
+
+    Returns:
+        dict: Throughput and per-request latency percentiles.
+    """
+    images = random_images(concurrency * requests_per_client)
+
+    def client(offset):
+        latencies = []
+        for img in images[offset:offset + requests_per_client]:
+            call_start = time.perf_counter()
+            model.predict_array(img)
+            latencies.append(time.perf_counter() - call_start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(client, range(0, len(images), requests_per_client)))
+    elapsed = time.perf_counter() - start
+    return summarize_latencies([l for r in results for l in r], elapsed, len(images))
+
+
+def bench_modes(model, iterations=50, warmup=5, size=(512, 512)):
+    """
+    Measure /upload-style prediction from encoded bytes in every prediction mode.
+
+    Returns:
+        dict: Throughput and latency percentiles per mode.
+    """
+    from api.model import PREDICTION_MODES
+    encoded = [encode_jpeg(img) for img in random_images(iterations + warmup, size=size)]
+    results = {}
+    for mode in PREDICTION_MODES:
+        for data in encoded[:warmup]:
+            model.predict_bytes(data, mode)
+        latencies = []
+        start = time.perf_counter()
+        for data in encoded[warmup:]:
+            call_start = time.perf_counter()
+            model.predict_bytes(data, mode)
+            latencies.append(time.perf_counter() - call_start)
+        results[mode] = summarize_latencies(latencies, time.perf_counter() - start, iterations)
+    return results
+
+
+def run(model_path, batch_sizes=(1, 8, 32), concurrency_levels=(1, 4, 16), max_batch_size=32):
+    """
+    Run the inference benchmarks against a model file.
+
+    Returns:
+        dict: Results keyed by benchmark name.
+    """
+    from api.model import InferenceModel
+    model = InferenceModel(model_path, max_batch_size=max_batch_size, max_wait_ms=2.0)
+    results = {
+        'inference.startup': dict(model.startup_timings),
+        'inference.single': bench_single(model),
+    }
+    for batch_size in batch_sizes:
+        results[f'inference.batch_{batch_size}'] = bench_batched(model, batch_size)
+    for concurrency in concurrency_levels:
+        results[f'inference.concurrent_{concurrency}'] = bench_concurrent(model, concurrency)
+    for mode, result in bench_modes(model).items():
+        results[f'inference.mode_{mode}'] = result
+    return results
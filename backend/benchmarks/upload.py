@@ -0,0 +1,90 @@
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import encode_jpeg, random_images, summarize_latencies
+
+
+def make_config(model_path, work_dir):
+    """
+    Build the benchmark configuration: the benchmark model, caching disabled and scratch storage.
+
+    Every setting naming a file or directory must point into `work_dir` (or be None), so a
+    run never touches the real tree; keep this in sync when such a setting is added.
+    """
+    from api.config import Config
+
+    class BenchmarkConfig(Config):
+        MODEL_PATH = model_path
+        MODEL_SERVER_SOCKET = None
+        MODEL_REGISTRY_DIR = None
+        MODEL_BACKGROUND_LOAD = False
+        PREDICTION_MODE = 'single'
+        UPLOAD_FOLDER = os.path.join(work_dir, 'uploads')
+        UPLOAD_INDEX_PATH = os.path.join(work_dir, 'storage', 'uploads.sqlite3')
+        THUMBNAIL_CACHE_DIR = os.path.join(work_dir, 'storage', 'thumbnails')
+        JOBS_DB_PATH = os.path.join(work_dir, 'jobs', 'jobs.sqlite3')
+        JOBS_SPOOL_DIR = os.path.join(work_dir, 'jobs', 'spool')
+        CACHE_MAX_ENTRIES = 0
+        CACHE_DB_PATH = None
+        RESULTS_LOCAL_PATH = None
+        SUPABASE_URL = None
+        SUPABASE_KEY = None
+
+    return BenchmarkConfig
+
+
+def make_app(model_path, work_dir):
+    """Create the Flask app against the benchmark model, with caching disabled and scratch storage."""
+    from api import create_app
+
+    return create_app(make_config(model_path, work_dir))
+
+
+def bench_upload(app, payloads, concurrency):
+    """
+    Post every payload to /upload from `concurrency` threads, each with its own test client.
+
+    Returns:
+        dict: Throughput and per-request latency percentiles.
+    """
+    per_client = len(payloads) // concurrency
+
+    def client(offset):
+        test_client = app.test_client()
+        latencies = []
+        for i, data in enumerate(payloads[offset:offset + per_client]):
+            call_start = time.perf_counter()
+            response = test_client.post(
+                '/upload',
+                data={'file': (io.BytesIO(data), f'bench-{offset + i}.jpg')},
+                content_type='multipart/form-data'
+            )
+            latencies.append(time.perf_counter() - call_start)
+            if response.status_code != 200:
+                raise RuntimeError(f'/upload returned {response.status_code}: {response.get_data(as_text=True)}')
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(client, range(0, per_client * concurrency, per_client)))
+    elapsed = time.perf_counter() - start
+    return summarize_latencies([l for r in results for l in r], elapsed, per_client * concurrency)
+
+
+def run(model_path, concurrency_levels=(1, 4, 16), requests=320, image_size=(256, 256)):
+    """
+    Run the end-to-end /upload benchmarks through the Flask test client.
+
+    Returns:
+        dict: Results keyed by benchmark name.
+    """
+    app = make_app(model_path, tempfile.mkdtemp(prefix='df-bench-upload-'))
+    payloads = [encode_jpeg(img) for img in random_images(requests, size=image_size)]
+    bench_upload(app, payloads[:16], 1)
+    return {
+        f'upload.concurrent_{concurrency}': bench_upload(app, payloads, concurrency)
+        for concurrency in concurrency_levels
+    }
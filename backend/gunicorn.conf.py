@@ -0,0 +1,48 @@
+# backend/gunicorn.conf.py
+# Gunicorn loads this file automatically from the working directory.
+import os
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Lets /metrics aggregate samples from every gunicorn worker and the model server. It is set
+# here rather than in the image so other processes (score.py, the benchmarks) keep their own
+# in-process metrics instead of writing into the server's.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'df-metrics'))
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+model_server = None
+
+
+def on_starting(server):
+    """Reset the metrics directory and start the shared model server before the workers are forked."""
+    global model_server
+    # Samples of a previous run would otherwise be added to this one's
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+    if os.getenv('DF_MODEL_SERVER_SOCKET'):
+        # The server and the workers (forked after this) share a key that no other process knows
+        if not os.getenv('DF_MODEL_SERVER_AUTHKEY'):
+            os.environ['DF_MODEL_SERVER_AUTHKEY'] = secrets.token_hex(32)
+        model_server = subprocess.Popen([sys.executable, '-m', 'api.model_server'])
+        server.log.info(f"Started model server (pid {model_server.pid})")
+
+
+def on_exit(server):
+    """Stop the shared model server together with gunicorn."""
+    if model_server is not None:
+        model_server.terminate()
+        model_server.wait(timeout=10)
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited from the aggregated metrics."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,297 @@
+"""
+Offline bulk scoring of image archives.
+
+Walks a directory (or reads a list of paths), decodes the images on a process
+pool and scores them in fixed-size batches with `InferenceModel`, writing the
+results incrementally to CSV or Parquet. A checkpoint file next to the output
+lets an interrupted run resume where it stopped:
+
+    python score.py uploads/guest --output guest_scores.csv
+    python score.py --file-list exports.txt --output exports.parquet --format parquet
+"""
+import os
+import sys
+import csv
+import json
+import hashlib
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from api.config import Config
+from api.model import InferenceModel, load_image_array
+from api.utils import allowed_file
+
+OUTPUT_COLUMNS = ('path', 'result', 'prediction_percentage', 'score', 'model_version', 'error')
+
+
+def list_images(root, allowed_extensions):
+    """
+    Recursively list the images under a directory, in a stable (sorted) order.
+
+    Args:
+        root (str): Directory to walk.
+        allowed_extensions (set): Accepted file extensions, without the dot.
+
+    Returns:
+        list: Image file paths.
+    """
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if allowed_file(filename, allowed_extensions):
+                paths.append(os.path.join(dirpath, filename))
+    return paths
+
+
+def read_file_list(path):
+    """Read one image path per line, skipping blank lines and '#' comments."""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def decode_chunk(paths, image_size):
+    """
+    Decode a chunk of images in a pool worker.
+
+    Args:
+        paths (list): Image file paths.
+        image_size (tuple): (height, width) the model expects.
+
+    Returns:
+        tuple: (uint8 array of the decoded images, list of per-path error messages or None).
+    """
+    arrays, errors = [], []
+    for path in paths:
+        try:
+            arrays.append(load_image_array(path, image_size))
+            errors.append(None)
+        except Exception as e:
+            errors.append(f'{type(e).__name__}: {e}')
+    if arrays:
+        return np.stack(arrays), errors
+    return np.empty((0,) + tuple(image_size) + (3,), dtype=np.uint8), errors
+
+
+class Checkpoint:
+    """
+    Records how far a run got, so it can resume without rescoring or duplicating rows.
+
+    The checkpoint is tied to the exact input list (by digest) and to the
+    output's state after the last committed chunk: the CSV byte offset, or the
+    number of Parquet part files.
+    """
+
+    def __init__(self, path, inputs_digest):
+        self.path = path
+        self.inputs_digest = inputs_digest
+        self.completed = 0
+        self.output_state = 0
+
+    def load(self):
+        """Load the saved progress. Returns False if there is none or it belongs to other inputs."""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            saved = json.load(f)
+        if saved.get('inputs_digest') != self.inputs_digest:
+            return False
+        self.completed = saved['completed']
+        self.output_state = saved['output_state']
+        return True
+
+    def save(self, completed, output_state):
+        """Atomically record the progress after a chunk has been flushed to the output."""
+        self.completed, self.output_state = completed, output_state
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'inputs_digest': self.inputs_digest, 'completed': completed, 'output_state': output_state}, f)
+        os.replace(temp_path, self.path)
+
+
+class CsvResultWriter:
+    """Appends result rows to a CSV file; the output state is the file's size in bytes."""
+
+    def __init__(self, path, resume_state=None):
+        """
+        Args:
+            path (str): Output CSV file.
+            resume_state (int, optional): Byte offset from the checkpoint. Rows after it are discarded.
+        """
+        exists = resume_state is not None and os.path.exists(path)
+        self.file = open(path, 'r+' if exists else 'w', newline='')
+        if exists:
+            # Drop any rows written after the last checkpoint
+            self.file.truncate(resume_state)
+            self.file.seek(resume_state)
+        self.writer = csv.DictWriter(self.file, fieldnames=OUTPUT_COLUMNS)
+        if not exists:
+            self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetResultWriter:
+    """
+    Writes result rows as a directory of Parquet part files, one per flush.
+
+    Parquet files cannot be appended to, so resuming only needs to drop the
+    part files written after the last checkpoint. The output state is the
+    number of committed part files.
+    """
+
+    def __init__(self, path, resume_state=None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError('Parquet output requires pyarrow (pip install pyarrow).') from e
+        self.pa, self.pq = pa, pq
+        # A fixed schema, so parts whose columns happen to be all empty still read back as one table
+        self.schema = pa.schema([
+            ('path', pa.string()),
+            ('result', pa.string()),
+            ('prediction_percentage', pa.float64()),
+            ('score', pa.float64()),
+            ('model_version', pa.string()),
+            ('error', pa.string()),
+        ])
+        self.path = path
+        self.parts = resume_state or 0
+        os.makedirs(path, exist_ok=True)
+        for filename in os.listdir(path):
+            if filename.startswith('part-') and int(filename[5:10]) >= self.parts:
+                os.remove(os.path.join(path, filename))
+
+    def write(self, rows):
+        table = self.pa.Table.from_pylist(
+            [{column: row.get(column) for column in OUTPUT_COLUMNS} for row in rows], schema=self.schema
+        )
+        part_path = os.path.join(self.path, f'part-{self.parts:05d}.parquet')
+        self.pq.write_table(table, part_path + '.tmp')
+        os.replace(part_path + '.tmp', part_path)
+        self.parts += 1
+        return self.parts
+
+    def close(self):
+        pass
+
+
+def score_paths(paths, model, writer, checkpoint, decode_workers=None, chunks_per_flush=8):
+    """
+    Score every path after the checkpoint in a decode -> predict -> write pipeline.
+
+    Decoding runs ahead on a process pool, a bounded number of chunks at a time,
+    while the main process keeps the model busy with whole batches.
+
+    Args:
+        paths (list): All image paths of the run, in order.
+        model (InferenceModel): The loaded inference model.
+        writer (CsvResultWriter | ParquetResultWriter): Output writer.
+        checkpoint (Checkpoint): Progress of the run. Updated after each flush.
+        decode_workers (int, optional): Number of decode processes (default: CPU count).
+        chunks_per_flush (int): Number of model batches written per output flush and checkpoint.
+
+    Returns:
+        dict: Counts of scored and failed images.
+    """
+    batch_size = model.max_batch_size
+    image_size = model.input_size
+    start = checkpoint.completed
+    chunks = [paths[i:i + batch_size] for i in range(start, len(paths), batch_size)]
+    decode_workers = decode_workers or os.cpu_count() or 1
+    counts = {'scored': 0, 'failed': 0}
+
+    # Workers are spawned so they never inherit the model runtime from this process
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=decode_workers, mp_context=context) as pool:
+        in_flight = deque()
+        next_chunk = 0
+        rows = []
+        completed = start
+        while next_chunk < len(chunks) or in_flight:
+            # Keep a couple of chunks per worker decoding ahead of the model
+            while next_chunk < len(chunks) and len(in_flight) < decode_workers * 2:
+                in_flight.append((chunks[next_chunk], pool.submit(decode_chunk, chunks[next_chunk], image_size)))
+                next_chunk += 1
+
+            chunk, future = in_flight.popleft()
+            images, errors = future.result()
+            scores = iter(model.score_arrays(list(images)) if len(images) else [])
+            for path, error in zip(chunk, errors):
+                row = {'path': path, 'model_version': model.version, 'error': error}
+                if error is None:
+                    score = next(scores)
+                    result_status, prediction_percentage = model.format_prediction(score)
+                    row.update(result=result_status, prediction_percentage=prediction_percentage, score=score)
+                    counts['scored'] += 1
+                else:
+                    counts['failed'] += 1
+                rows.append(row)
+            completed += len(chunk)
+
+            if len(rows) >= batch_size * chunks_per_flush or not (in_flight or next_chunk < len(chunks)):
+                checkpoint.save(completed, writer.write(rows))
+                rows = []
+                print(f"Scored {completed}/{len(paths)} images.")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a directory or list of images with the deepfake detector.')
+    parser.add_argument('directory', nargs='?', help='directory to score recursively')
+    parser.add_argument('--file-list', help='text file with one image path per line (instead of a directory)')
+    parser.add_argument('--output', required=True, help='CSV file, or Parquet directory, to write the results to')
+    parser.add_argument('--format', choices=('csv', 'parquet'), help='output format (default: from the output name)')
+    parser.add_argument('--model', default=Config.MODEL_PATH, help='model file (default: DF_MODEL_PATH)')
+    parser.add_argument('--backend', default=Config.MODEL_BACKEND, help="'keras', 'tflite' or 'auto'")
+    parser.add_argument('--batch-size', type=int, default=64, help='images per forward pass (default 64)')
+    parser.add_argument('--workers', type=int, help='decode processes (default: CPU count)')
+    parser.add_argument('--restart', action='store_true', help='ignore any checkpoint and start over')
+    args = parser.parse_args(argv)
+
+    if (args.directory is None) == (args.file_list is None):
+        parser.error('pass either a directory or --file-list')
+    output_format = args.format or ('parquet' if args.output.endswith('.parquet') else 'csv')
+
+    if args.directory is not None:
+        paths = list_images(args.directory, Config.ALLOWED_EXTENSIONS)
+    else:
+        paths = read_file_list(args.file_list)
+    inputs_digest = hashlib.sha256('\n'.join(paths).encode('utf-8')).hexdigest()
+
+    checkpoint = Checkpoint(args.output + '.checkpoint.json', inputs_digest)
+    resumed = not args.restart and checkpoint.load()
+    if resumed:
+        print(f"Resuming after {checkpoint.completed}/{len(paths)} images from '{checkpoint.path}'.")
+    elif os.path.exists(checkpoint.path) and not args.restart:
+        print(f"🚨 Checkpoint '{checkpoint.path}' belongs to a different set of inputs; starting over.")
+
+    model = InferenceModel(args.model, backend=args.backend, max_batch_size=args.batch_size,
+                           num_threads=Config.TFLITE_NUM_THREADS)
+    if not model.is_ready:
+        print("🚨 The model could not be loaded; nothing was scored.")
+        return 1
+
+    writer_class = ParquetResultWriter if output_format == 'parquet' else CsvResultWriter
+    writer = writer_class(args.output, checkpoint.output_state if resumed else None)
+    try:
+        counts = score_paths(paths, model, writer, checkpoint, decode_workers=args.workers)
+    finally:
+        writer.close()
+    print(f"✅ Scored {counts['scored']} images ({counts['failed']} failed) into '{args.output}'.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
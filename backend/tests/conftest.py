@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend is not an installed package; make `api`, `train` and `score` importable from any directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
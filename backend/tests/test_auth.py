@@ -0,0 +1,66 @@
+import time
+
+import jwt
+import pytest
+
+from api import auth
+from api.auth import TokenCache
+
+SECRET = 'test-secret-at-least-32-bytes-long'
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    calls = []
+    decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, 'decode', counting_decode)
+    return calls
+
+
+def _token(secret=SECRET, **claims):
+    return jwt.encode(dict({'sub': 'user-1'}, **claims), secret, algorithm='HS256')
+
+
+def test_valid_token_is_verified_once(decode_calls):
+    cache = TokenCache()
+    token = _token(exp=int(time.time()) + 600)
+
+    assert cache.verify(token, SECRET)['sub'] == 'user-1'
+    assert cache.verify(token, SECRET)['sub'] == 'user-1'
+    assert len(decode_calls) == 1
+
+
+def test_bad_signature_and_malformed_tokens_are_negative_cached(decode_calls):
+    cache = TokenCache()
+    forged = _token(secret='another-secret-at-least-32-bytes-long')
+
+    assert cache.verify(forged, SECRET) is None
+    assert cache.verify(forged, SECRET) is None
+    assert cache.verify('not-a-token', SECRET) is None
+    assert cache.verify('not-a-token', SECRET) is None
+    assert len(decode_calls) == 2
+
+
+def test_token_not_valid_yet_is_accepted_once_it_is(decode_calls):
+    cache = TokenCache()
+    # Issued by a server whose clock is slightly ahead
+    token = _token(nbf=time.time() + 1)
+
+    assert cache.verify(token, SECRET) is None
+    time.sleep(1.1)
+    assert cache.verify(token, SECRET)['sub'] == 'user-1'
+    assert len(decode_calls) == 2
+
+
+def test_cached_token_expires_at_its_exp():
+    cache = TokenCache(ttl=300)
+    token = _token(exp=time.time() + 1)
+
+    assert cache.verify(token, SECRET) is not None
+    time.sleep(1.1)
+    assert cache.verify(token, SECRET) is None
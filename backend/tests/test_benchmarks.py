@@ -0,0 +1,20 @@
+import os
+
+from api.config import Config
+from benchmarks.upload import make_config
+
+PATH_SUFFIXES = ('_PATH', '_DIR', '_FOLDER', '_SOCKET')
+
+
+def test_benchmark_config_keeps_every_path_in_the_work_dir(tmp_path):
+    work_dir = str(tmp_path)
+    config = make_config('bench.keras', work_dir)
+
+    path_settings = [name for name in dir(Config) if name.isupper() and name.endswith(PATH_SUFFIXES)]
+    assert 'UPLOAD_INDEX_PATH' in path_settings
+    for name in path_settings:
+        value = getattr(config, name)
+        if name == 'MODEL_PATH':
+            assert value == 'bench.keras'
+        else:
+            assert value is None or os.path.abspath(value).startswith(work_dir + os.sep), name
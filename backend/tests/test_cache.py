@@ -0,0 +1,70 @@
+from api.cache import PredictionCache
+
+
+def _key(data, version='v1', mode='single'):
+    return PredictionCache.make_key(data, version, mode)
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = PredictionCache(max_entries=2)
+    cache.put(_key(b'a'), ('Real', 10.0))
+    cache.put(_key(b'b'), ('Fake', 90.0))
+    assert cache.get(_key(b'a')) == ('Real', 10.0)  # 'b' is now the oldest
+
+    cache.put(_key(b'c'), ('Fake', 80.0))
+
+    assert cache.get(_key(b'b')) is None
+    assert cache.get(_key(b'a')) == ('Real', 10.0)
+    assert cache.get(_key(b'c')) == ('Fake', 80.0)
+    assert cache.stats() == {'hits': 3, 'disk_hits': 0, 'misses': 1, 'entries': 2}
+
+
+def test_zero_max_entries_disables_the_memory_tier():
+    cache = PredictionCache(max_entries=0)
+    cache.put(_key(b'a'), ('Real', 10.0))
+
+    assert cache.get(_key(b'a')) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_keys_depend_on_version_and_mode():
+    assert _key(b'a') == _key(b'a', mode='single')
+    assert len({_key(b'a'), _key(b'a', version='v2'), _key(b'a', mode='tta'), _key(b'b')}) == 4
+
+
+def test_discard_version_drops_every_mode_of_that_version_only():
+    cache = PredictionCache()
+    cache.put(_key(b'a'), ('Real', 10.0))
+    cache.put(_key(b'a', mode='tta'), ('Real', 12.0))
+    cache.put(_key(b'a', version='v10'), ('Fake', 70.0))
+    cache.put(_key(b'a', version='v2'), ('Fake', 60.0))
+
+    cache.discard_version('v1')
+
+    assert cache.get(_key(b'a')) is None
+    assert cache.get(_key(b'a', mode='tta')) is None
+    assert cache.get(_key(b'a', version='v10')) == ('Fake', 70.0)
+    assert cache.get(_key(b'a', version='v2')) == ('Fake', 60.0)
+
+
+def test_disk_tier_is_shared_and_refills_memory(tmp_path):
+    db_path = str(tmp_path / 'predictions.sqlite3')
+    PredictionCache(db_path=db_path).put(_key(b'a'), ('Fake', 75.0))
+
+    cache = PredictionCache(db_path=db_path)
+    assert cache.get(_key(b'a')) == ('Fake', 75.0)
+    assert cache.get(_key(b'a')) == ('Fake', 75.0)
+    assert cache.stats() == {'hits': 2, 'disk_hits': 1, 'misses': 0, 'entries': 1}
+
+
+def test_discard_version_clears_the_disk_tier(tmp_path):
+    db_path = str(tmp_path / 'predictions.sqlite3')
+    cache = PredictionCache(db_path=db_path)
+    cache.put(_key(b'a'), ('Fake', 75.0))
+    cache.put(_key(b'a', version='v2'), ('Real', 5.0))
+
+    cache.discard_version('v1')
+
+    fresh = PredictionCache(db_path=db_path)
+    assert fresh.get(_key(b'a')) is None
+    assert fresh.get(_key(b'a', version='v2')) == ('Real', 5.0)
@@ -0,0 +1,187 @@
+import hashlib
+import io
+import os
+import struct
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('tensorflow')
+import train  # noqa: E402
+from train import DatasetHandler, ZipStreamExtractor  # noqa: E402
+
+
+class FlakyServer:
+    """
+    Serves one payload over HTTP. The first response is cut off after `cut_at` bytes; later ones
+    honour Range requests, unless `ignore_range` is set, in which case they send the whole payload.
+    """
+
+    def __init__(self, payload, cut_at, ignore_range=False):
+        self.payload = payload
+        self.cut_at = cut_at
+        self.ignore_range = ignore_range
+        self.range_headers = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.range_headers.append(self.headers.get('Range'))
+                start = 0
+                if self.headers.get('Range') and not server.ignore_range:
+                    start = int(self.headers['Range'][len('bytes='):].rstrip('-'))
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{len(payload) - 1}/{len(payload)}')
+                else:
+                    self.send_response(200)
+                body = payload[start:]
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if len(server.range_headers) == 1:
+                    # Drop the connection mid-stream
+                    self.wfile.write(body[:server.cut_at])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/dataset.zip'
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _resumed_offset(server):
+    assert server.range_headers[0] is None and len(server.range_headers) == 2
+    return int(server.range_headers[1][len('bytes='):].rstrip('-'))
+
+
+def _zip_payload():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('Dataset/', '')
+        for i in range(4):
+            archive.writestr(f'Dataset/Train/Real/{i}.bin', os.urandom(20000))
+    return buffer.getvalue()
+
+
+def _handler(tmp_path, url, **kwargs):
+    return DatasetHandler(
+        dataset_url=url, dataset_download_dir=str(tmp_path), dataset_file='dataset.zip',
+        dataset_dir=str(tmp_path / 'Dataset'), train_dir='Train', test_dir='Test', val_dir='Validation',
+        download_chunk_size=4096, max_retries=2, **kwargs
+    )
+
+
+def test_download_resumes_after_a_disconnect(tmp_path):
+    payload = _zip_payload()
+    with FlakyServer(payload, cut_at=30000) as server:
+        handler = _handler(tmp_path, server.url, dataset_sha256=hashlib.sha256(payload).hexdigest())
+        assert handler.download_dataset()
+
+    assert (tmp_path / 'dataset.zip').read_bytes() == payload
+    # Resumed after the bytes written before the disconnect
+    assert 0 < _resumed_offset(server) <= 30000
+
+
+def test_download_starts_over_when_the_server_ignores_range(tmp_path):
+    payload = _zip_payload()
+    with FlakyServer(payload, cut_at=30000, ignore_range=True) as server:
+        handler = _handler(tmp_path, server.url, dataset_sha256=hashlib.sha256(payload).hexdigest())
+        assert handler.download_dataset()
+
+    # The partial file is truncated rather than appended to
+    assert _resumed_offset(server) > 0
+    assert (tmp_path / 'dataset.zip').read_bytes() == payload
+
+
+def test_download_with_a_checksum_mismatch_is_discarded(tmp_path):
+    payload = _zip_payload()
+    with FlakyServer(payload, cut_at=30000) as server:
+        handler = _handler(tmp_path, server.url, dataset_sha256='0' * 64)
+        assert not handler.download_dataset()
+
+    assert not os.path.exists(tmp_path / 'dataset.zip')
+    assert not os.path.exists(tmp_path / 'dataset.zip.part')
+
+
+def test_stream_extraction_resumes_from_the_last_complete_member(tmp_path):
+    payload = _zip_payload()
+    with FlakyServer(payload, cut_at=30000) as server:
+        handler = _handler(tmp_path, server.url, stream_extract=True)
+        assert handler.download_dataset()
+
+    # The member cut off mid-stream is fetched again from its local header
+    assert 0 < _resumed_offset(server) <= 30000
+    with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+        for member in archive.infolist():
+            path = tmp_path / member.filename
+            if member.is_dir():
+                assert path.is_dir()
+            else:
+                assert path.read_bytes() == archive.read(member)
+                assert not os.path.exists(str(path) + '.part')
+
+
+def _assert_extracted(tmp_path, payload):
+    with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+        for member in archive.infolist():
+            if not member.is_dir():
+                assert (tmp_path / member.filename).read_bytes() == archive.read(member)
+
+
+def test_stream_extraction_restarts_an_incomplete_earlier_extraction(tmp_path):
+    payload = _zip_payload()
+    # Left behind by a run that was killed mid-extraction
+    os.makedirs(tmp_path / 'Dataset' / 'Train' / 'Real')
+    (tmp_path / 'Dataset' / 'Train' / 'Real' / '0.bin').write_bytes(b'truncated')
+
+    with FlakyServer(payload, cut_at=len(payload)) as server:
+        handler = _handler(tmp_path, server.url, stream_extract=True)
+        assert handler.download_dataset()
+        assert handler.unzip_dataset()
+    _assert_extracted(tmp_path, payload)
+
+    # Once complete, later runs do not touch the network
+    assert _handler(tmp_path, 'http://127.0.0.1:1/dataset.zip', stream_extract=True).download_dataset()
+
+
+def test_unzip_restarts_an_incomplete_earlier_extraction(tmp_path):
+    payload = _zip_payload()
+    (tmp_path / 'dataset.zip').write_bytes(payload)
+    os.makedirs(tmp_path / 'Dataset' / 'Train' / 'Real')
+    (tmp_path / 'Dataset' / 'Train' / 'Real' / '0.bin').write_bytes(b'truncated')
+
+    handler = _handler(tmp_path, 'http://127.0.0.1:1/dataset.zip', keep_archive=False)
+    assert handler.download_dataset() and handler.unzip_dataset()
+    _assert_extracted(tmp_path, payload)
+    assert not os.path.exists(tmp_path / 'dataset.zip')
+
+    # The archive is gone, but the extraction is known to be complete
+    assert handler.download_dataset() and handler.unzip_dataset()
+
+
+def test_resume_leaves_directory_entries_alone(tmp_path, monkeypatch):
+    removed = []
+    monkeypatch.setattr(train.os, 'remove', removed.append)
+    name = b'Dataset/'
+    # A directory whose (empty) sizes are deferred to a data descriptor that has not arrived yet
+    header = struct.pack('<4sHHHHHIIIHH', b'PK\x03\x04', 20, 0x8, zipfile.ZIP_DEFLATED, 0, 0, 0, 0, 0, len(name), 0)
+    extractor = ZipStreamExtractor(str(tmp_path))
+    extractor.feed(header + name)
+
+    extractor.resume()
+
+    assert removed == []
+    assert (tmp_path / 'Dataset').is_dir()
+    assert extractor.offset == 0 and extractor.members == 0
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+tf = pytest.importorskip('tensorflow')
+
+from api.model import TFLiteBackend  # noqa: E402
+from train import ModelExporter  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def exported(tmp_path_factory):
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.Input((8, 8, 3)),
+        tf.keras.layers.Conv2D(2, 3, activation='relu'),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(1, activation='sigmoid'),
+    ])
+    exporter = ModelExporter(model, image_size=(8, 8))
+    path = str(tmp_path_factory.mktemp('export') / 'model.tflite')
+    exporter.export_tflite(path, quantization=None)
+    return exporter, path
+
+
+def test_tflite_backend_matches_keras_for_every_batch_size(exported):
+    exporter, path = exported
+    backend = TFLiteBackend(path)
+    rng = np.random.default_rng(0)
+
+    assert backend.input_size == (8, 8)
+    for size in (3, 1, 5, 3, 8):
+        batch = rng.uniform(0, 255, (size, 8, 8, 3)).astype(np.float32)
+        scores = backend.predict(batch)
+        assert scores.shape == (size,)
+        np.testing.assert_allclose(scores, exporter.model.predict_on_batch(batch).reshape(-1), atol=1e-5)
+
+
+def test_tflite_backend_allocates_one_interpreter_per_bucket(exported):
+    _, path = exported
+    backend = TFLiteBackend(path)
+    for size in (3, 4, 1, 5, 2, 3):
+        backend.predict(np.zeros((size, 8, 8, 3), dtype=np.float32))
+
+    assert sorted(backend._interpreters) == [1, 2, 4, 8]
+    assert [TFLiteBackend.bucket_size(n) for n in range(1, 10)] == [1, 2, 4, 4, 8, 8, 8, 8, 16]
+
+
+def test_check_parity_passes_for_a_float_export(exported, tmp_path):
+    exporter, path = exported
+    for i, color in enumerate(['red', 'green']):
+        Image.new('RGB', (20, 20), color).save(tmp_path / f'{i}.png')
+
+    assert exporter.check_parity(path, str(tmp_path))
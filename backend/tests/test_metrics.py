@@ -0,0 +1,17 @@
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_metrics_import_creates_a_missing_multiprocess_directory(tmp_path):
+    metrics_dir = tmp_path / 'missing' / 'metrics'
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(metrics_dir))
+    # A fresh interpreter, since the metrics are created when api.metrics is first imported
+    subprocess.run(
+        [sys.executable, '-c', 'import api.metrics; api.metrics.REQUESTS.labels(endpoint="x", status="200").inc()'],
+        cwd=BACKEND_DIR, env=env, check=True
+    )
+    assert metrics_dir.is_dir()
+    assert os.listdir(metrics_dir)
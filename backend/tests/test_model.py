@@ -0,0 +1,174 @@
+import io
+import threading
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from api.model import MicroBatcher, ModelVersion, _grid_crops, load_image_array, load_image_views
+
+
+class GatedBackend:
+    """Records the first pixel of every batch it scores; the first forward pass waits for `release`."""
+
+    input_size = (2, 2)
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.batches = []
+
+    def predict(self, batch):
+        self.started.set()
+        self.release.wait(5)
+        self.batches.append(int(batch[0, 0, 0, 0]))
+        return np.zeros(len(batch))
+
+
+def _images(value, count):
+    return [np.full((2, 2, 3), value, dtype=np.uint8) for _ in range(count)]
+
+
+def test_interactive_batches_run_before_queued_bulk_batches():
+    backend = GatedBackend()
+    version = ModelVersion(backend, 'test', 'model.keras', max_batch_size=2, max_wait_ms=1)
+    bulk = threading.Thread(target=version.score_arrays, args=(_images(1, 6),), kwargs={'bulk': True})
+    bulk.start()
+    assert backend.started.wait(5)
+
+    # The first bulk batch is in the model; an interactive request arrives behind two more bulk batches
+    interactive = threading.Thread(target=version.score_arrays, args=(_images(2, 1),))
+    interactive.start()
+    time.sleep(0.05)
+    backend.release.set()
+    bulk.join(5)
+    interactive.join(5)
+    version.retire()
+
+    assert backend.batches == [1, 2, 1, 1]
+
+
+class RecordingPredict:
+    """A predict_fn that records the size of every batch and scores each image by its first pixel."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batch_sizes = []
+
+    def __call__(self, batch):
+        self.batch_sizes.append(len(batch))
+        time.sleep(self.delay)
+        return batch[:, 0, 0, 0]
+
+
+def test_concurrent_submits_share_one_forward_pass():
+    predict = RecordingPredict()
+    batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=200)
+
+    futures = [batcher.submit(image) for image in _images(51, 5)]
+    assert [future.result(5) for future in futures] == [51.0] * 5
+    assert predict.batch_sizes == [5]
+    batcher.close()
+
+
+def test_full_batches_are_dispatched_without_waiting():
+    predict = RecordingPredict()
+    batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=10000)
+
+    start = time.monotonic()
+    futures = [batcher.submit(np.full((2, 2, 3), i, dtype=np.uint8)) for i in range(8)]
+    scores = [future.result(5) for future in futures]
+
+    assert time.monotonic() - start < 5
+    assert predict.batch_sizes == [4, 4]
+    assert scores == [float(i) for i in range(8)]
+    batcher.close()
+
+
+def test_a_partial_batch_is_dispatched_after_the_max_wait():
+    predict = RecordingPredict()
+    batcher = MicroBatcher(predict, max_batch_size=16, max_wait_ms=50)
+
+    start = time.monotonic()
+    batcher.submit(_images(1, 1)[0]).result(5)
+    elapsed = time.monotonic() - start
+
+    assert predict.batch_sizes == [1]
+    assert 0.04 <= elapsed < 2
+    batcher.close()
+
+
+def test_a_failed_forward_pass_fails_every_future_in_the_batch():
+    def predict(batch):
+        raise ValueError('boom')
+
+    batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(image) for image in _images(0, 3)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(5)
+    batcher.close()
+
+
+def test_closed_batcher_scores_late_submits_inline():
+    predict = RecordingPredict()
+    batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=1)
+    batcher.submit(_images(0, 1)[0]).result(5)
+    batcher.close()
+
+    assert batcher.submit(_images(255, 1)[0]).result(5) == 255.0
+    assert predict.batch_sizes == [1, 1]
+
+
+def _gradient_png(height, width):
+    """An image whose red channel is the row and green channel the column of each pixel."""
+    rows, cols = np.mgrid[:height, :width]
+    array = np.stack([rows, cols, np.zeros_like(rows)], axis=-1).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format='PNG')
+    return array, buffer.getvalue()
+
+
+def test_grid_crops_are_evenly_spaced_in_row_major_order():
+    image, _ = _gradient_png(30, 50)
+
+    crops = _grid_crops(image, (10, 20), 3)
+
+    assert crops.shape == (9, 10, 20, 3)
+    # Top-left corners: rows 0, 10, 20 and columns 0, 15, 30
+    corners = [(int(crop[0, 0, 0]), int(crop[0, 0, 1])) for crop in crops]
+    assert corners == [(y, x) for y in (0, 10, 20) for x in (0, 15, 30)]
+    for crop, (y, x) in zip(crops, corners):
+        np.testing.assert_array_equal(crop, image[y:y + 10, x:x + 20])
+
+
+def test_grid_crops_of_an_image_smaller_than_a_crop_are_empty():
+    image, _ = _gradient_png(8, 50)
+
+    assert _grid_crops(image, (10, 20), 3).shape == (0, 10, 20, 3)
+
+
+@pytest.mark.parametrize('mode, count', [('single', 1), ('flip', 2), ('multicrop', 11)])
+def test_image_views_start_with_the_center_resize(mode, count):
+    image, data = _gradient_png(40, 60)
+
+    views = load_image_views(data, (16, 24), mode)
+
+    assert views.shape == (count, 16, 24, 3) and views.dtype == np.uint8
+    np.testing.assert_array_equal(views[0], load_image_array(data, (16, 24)))
+    if count > 1:
+        np.testing.assert_array_equal(views[1], views[0][:, ::-1])
+    if mode == 'multicrop':
+        np.testing.assert_array_equal(views[2:], _grid_crops(image, (16, 24), 3))
+
+
+def test_multicrop_of_a_small_image_scores_the_center_and_mirror_only():
+    _, data = _gradient_png(10, 10)
+
+    assert load_image_views(data, (16, 24), 'multicrop').shape == (2, 16, 24, 3)
+
+
+def test_unknown_prediction_mode_is_rejected():
+    with pytest.raises(ValueError):
+        load_image_views(b'', (16, 24), 'mosaic')
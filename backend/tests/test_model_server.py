@@ -0,0 +1,82 @@
+import os
+import stat
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import numpy as np
+import pytest
+
+from api.model_server import ModelServer, RemoteInferenceModel
+
+
+class FakeInferenceModel:
+    state = 'ready'
+    version = 'test'
+    startup_timings = {}
+    max_batch_size = 4
+    input_size = (2, 2)
+    model_path = 'model.keras'
+    reloading = False
+
+    def pin(self):
+        return self
+
+    def score_arrays(self, img_arrays, bulk=False):
+        return [float(array.mean()) / 255 for array in img_arrays]
+
+
+def _start_server(socket_path, model=None):
+    server = ModelServer(model or FakeInferenceModel(), socket_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            return
+        time.sleep(0.01)
+    raise AssertionError('The model server did not start.')
+
+
+def test_model_server_refuses_to_run_without_an_authkey(tmp_path, monkeypatch):
+    monkeypatch.delenv('DF_MODEL_SERVER_AUTHKEY', raising=False)
+    with pytest.raises(RuntimeError):
+        ModelServer(FakeInferenceModel(), str(tmp_path / 'model.sock')).serve_forever()
+    with pytest.raises(RuntimeError):
+        RemoteInferenceModel(str(tmp_path / 'model.sock'))
+
+
+def test_model_server_only_serves_clients_with_the_authkey(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / 'model.sock')
+    monkeypatch.setenv('DF_MODEL_SERVER_AUTHKEY', 'secret')
+    _start_server(socket_path)
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+
+    with pytest.raises(AuthenticationError):
+        Client(socket_path, family='AF_UNIX', authkey=b'wrong')
+
+    remote = RemoteInferenceModel(socket_path)
+    images = [np.full((2, 2, 3), 255, dtype=np.uint8), np.zeros((2, 2, 3), dtype=np.uint8)]
+    assert remote.score_arrays(images) == [1.0, 0.0]
+    assert remote.score_arrays(images, bulk=True) == [1.0, 0.0]
+    assert remote.input_size == (2, 2)
+
+
+def test_pinned_remote_version_is_the_one_that_scored(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / 'model.sock')
+    monkeypatch.setenv('DF_MODEL_SERVER_AUTHKEY', 'secret')
+    server_model = FakeInferenceModel()
+    _start_server(socket_path, server_model)
+    swaps = []
+    remote = RemoteInferenceModel(socket_path, status_ttl=0, on_swap=lambda old, new: swaps.append((old, new)))
+    image = [np.zeros((2, 2, 3), dtype=np.uint8)]
+
+    served = remote.pin()
+    assert served.version == 'test'
+    # The server swaps in another version before the request is scored
+    server_model.version = 'next'
+    assert served.predict_arrays(image) == [('Real', 0.0)]
+    assert served.version == 'next'
+
+    # Workers also see the swap in the server's status, and drop the old version's results
+    assert remote.version == 'next'
+    assert swaps == [('test', 'next')]
@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from api.persistence import LocalTableClient, ResultRecorder
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class BatchRecordingClient(LocalTableClient):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def _insert(self, table, rows):
+        self.batches.append(len(rows))
+        super()._insert(table, rows)
+
+
+def test_rows_are_inserted_in_batches():
+    client = BatchRecordingClient()
+    recorder = ResultRecorder(client, table='predictions', batch_size=3, flush_interval=0.05)
+    for i in range(7):
+        recorder.record({'index': i})
+
+    deadline = time.monotonic() + 5
+    while len(client.tables.get('predictions', [])) < 7:
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+    assert [row['index'] for row in client.tables['predictions']] == list(range(7))
+    assert all('created_at' in row for row in client.tables['predictions'])
+    assert max(client.batches) <= 3
+
+
+def test_rows_beyond_max_pending_are_dropped():
+    client = LocalTableClient()
+    recorder = ResultRecorder(client, batch_size=10, flush_interval=60, max_pending=2)
+    for i in range(3):
+        recorder.record({'index': i})
+    recorder.flush()
+
+    assert [row['index'] for row in client.tables['predictions']] == [0, 1]
+
+
+def test_pending_rows_are_inserted_when_the_process_exits(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    # A partial batch is still waiting for flush_interval when the interpreter exits
+    script = (
+        'import sys, time\n'
+        'from api.persistence import LocalTableClient, ResultRecorder\n'
+        'recorder = ResultRecorder(LocalTableClient(sys.argv[1]), batch_size=2, flush_interval=60)\n'
+        'for i in range(5):\n'
+        '    recorder.record({"index": i})\n'
+        'time.sleep(0.2)\n'
+    )
+    subprocess.run([sys.executable, '-c', script, str(path)], cwd=BACKEND_DIR, check=True)
+
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert sorted(row['index'] for row in rows) == list(range(5))
+    assert {row['_table'] for row in rows} == {'predictions'}
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+
+from api.model import InferenceModel
+from api.registry import ModelRegistry
+
+
+class FakeVersion:
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self.version = model_path
+        self.retired = False
+
+    def retire(self):
+        self.retired = True
+
+
+class SlowLoader:
+    """Stands in for InferenceModel._load_version; every load waits for `release`."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.loaded = []
+
+    def __call__(self, model_path):
+        self.release.wait(5)
+        self.loaded.append(model_path)
+        return FakeVersion(model_path), {}
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def _model(tmp_path, loader):
+    # A missing model file leaves the model in fallback mode without loading anything
+    model = InferenceModel(str(tmp_path / 'missing.keras'))
+    model._load_version = loader
+    return model
+
+
+def test_reload_requested_during_a_reload_is_applied_after_it(tmp_path):
+    loader = SlowLoader()
+    model = _model(tmp_path, loader)
+
+    assert model.reload('b.keras') == 'reloading'
+    assert model.reload('c.keras') == 'queued'
+    assert model.reload('d.keras') == 'queued'
+    loader.release.set()
+    _wait_until(lambda: not model.reloading)
+
+    # Only the latest queued version is loaded after the one in progress
+    assert loader.loaded == ['b.keras', 'd.keras']
+    assert model.model_path == 'd.keras'
+    assert model.state == 'ready'
+
+
+def test_reload_of_the_serving_loading_or_queued_path_is_ignored(tmp_path):
+    loader = SlowLoader()
+    model = _model(tmp_path, loader)
+
+    assert model.reload('b.keras') == 'reloading'
+    assert model.reload('b.keras') == 'unchanged'
+    assert model.reload('c.keras') == 'queued'
+    assert model.reload('c.keras') == 'unchanged'
+    loader.release.set()
+    _wait_until(lambda: not model.reloading)
+    assert model.reload('c.keras') == 'unchanged'
+
+    assert loader.loaded == ['b.keras', 'c.keras']
+
+
+def test_activation_and_watcher_load_the_version_once(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'), poll_interval=0.02)
+    for name in ('a.keras', 'b.keras'):
+        (tmp_path / 'registry' / name).write_bytes(name.encode())
+    loader = SlowLoader()
+    loader.release.set()
+    model = _model(tmp_path, loader)
+    registry.watch(model.reload, current_path=registry.activate('a.keras'))
+
+    # As the admin endpoint does: activate, then reload this worker right away
+    assert model.reload(registry.activate('b.keras')) == 'reloading'
+    time.sleep(0.2)
+
+    assert [os.path.basename(path) for path in loader.loaded] == ['b.keras']
+
+
+def test_registry_watcher_ends_on_the_last_activated_version(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'), poll_interval=0.02)
+    for name in ('a.keras', 'b.keras', 'c.keras'):
+        (tmp_path / 'registry' / name).write_bytes(name.encode())
+    loader = SlowLoader()
+    model = _model(tmp_path, loader)
+    registry.watch(model.reload, current_path=registry.activate('a.keras'))
+
+    registry.activate('b.keras')
+    _wait_until(lambda: model.reloading)
+    registry.activate('c.keras')
+    time.sleep(0.1)
+    loader.release.set()
+    _wait_until(lambda: model.model_path == registry.current() and not model.reloading)
+
+    assert model.model_path.endswith('c.keras')
@@ -0,0 +1,95 @@
+import csv
+import os
+
+import pytest
+from PIL import Image
+
+from api.model import Predictor
+from score import Checkpoint, CsvResultWriter, ParquetResultWriter, list_images, score_paths
+
+
+class FakeModel(Predictor):
+    """Scores each image by its red channel; fails on the forward pass number `fail_on`."""
+
+    version = 'test'
+    max_batch_size = 2
+    input_size = (8, 8)
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.scored = 0
+        self.calls = 0
+
+    def score_arrays(self, img_arrays, bulk=False):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise RuntimeError('worker killed')
+        self.scored += len(img_arrays)
+        return [float(array[0, 0, 0]) / 255 for array in img_arrays]
+
+
+@pytest.fixture
+def paths(tmp_path):
+    os.makedirs(tmp_path / 'images')
+    for i in range(6):
+        Image.new('RGB', (10, 10), (i * 40, 0, 0)).save(tmp_path / 'images' / f'{i}.png')
+    (tmp_path / 'images' / '6.png').write_bytes(b'not an image')
+    return list_images(str(tmp_path / 'images'), {'png'})
+
+
+def _interrupted_run(paths, writer, checkpoint):
+    # Two chunks are committed, the third forward pass dies
+    with pytest.raises(RuntimeError):
+        score_paths(paths, FakeModel(fail_on=3), writer, checkpoint, decode_workers=1, chunks_per_flush=1)
+    writer.close()
+    assert checkpoint.completed == 4
+
+
+def test_csv_output_resumes_after_the_last_checkpoint(tmp_path, paths):
+    output = str(tmp_path / 'scores.csv')
+    checkpoint = Checkpoint(output + '.checkpoint.json', 'digest')
+    _interrupted_run(paths, CsvResultWriter(output), checkpoint)
+    # A row written after the checkpoint, cut off by the crash
+    with open(output, 'a') as f:
+        f.write('/images/4.png,Fa')
+
+    resumed = Checkpoint(output + '.checkpoint.json', 'digest')
+    assert resumed.load()
+    model = FakeModel()
+    writer = CsvResultWriter(output, resumed.output_state)
+    counts = score_paths(paths, model, writer, resumed, decode_workers=1, chunks_per_flush=1)
+    writer.close()
+
+    assert counts == {'scored': 2, 'failed': 1} and model.scored == 2
+    with open(output, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['path'] for row in rows] == paths
+    assert [row['score'] for row in rows[:6]] == [str(i * 40 / 255) for i in range(6)]
+    assert rows[6]['error'].startswith('UnidentifiedImageError')
+    assert resumed.completed == 7
+
+
+def test_checkpoint_of_other_inputs_is_ignored(tmp_path):
+    path = str(tmp_path / 'scores.csv.checkpoint.json')
+    Checkpoint(path, 'digest').save(4, 123)
+
+    assert not Checkpoint(path, 'other digest').load()
+
+
+def test_parquet_output_resumes_after_the_last_checkpoint(tmp_path, paths):
+    pd = pytest.importorskip('pandas')
+    pytest.importorskip('pyarrow')
+    output = str(tmp_path / 'scores.parquet')
+    checkpoint = Checkpoint(output + '.checkpoint.json', 'digest')
+    _interrupted_run(paths, ParquetResultWriter(output), checkpoint)
+    # A part written after the checkpoint
+    pd.DataFrame([{'path': 'stale'}]).to_parquet(os.path.join(output, 'part-00002.parquet'), index=False)
+
+    resumed = Checkpoint(output + '.checkpoint.json', 'digest')
+    assert resumed.load()
+    writer = ParquetResultWriter(output, resumed.output_state)
+    score_paths(paths, FakeModel(), writer, resumed, decode_workers=1, chunks_per_flush=1)
+
+    frame = pd.read_parquet(output)
+    assert sorted(os.listdir(output)) == [f'part-{i:05d}.parquet' for i in range(4)]
+    assert sorted(frame['path']) == paths
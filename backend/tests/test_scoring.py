@@ -0,0 +1,54 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from api.cache import PredictionCache
+from api.scoring import score_uploads
+
+
+class FakeModel:
+    """Scores every image 0.25 and records the shape of each array it is given."""
+
+    version = 'test'
+    max_batch_size = 4
+
+    def __init__(self, input_size):
+        self.input_size = input_size
+        self.shapes = []
+
+    def predict_arrays(self, img_arrays, bulk=False):
+        self.shapes.extend(array.shape for array in img_arrays)
+        return [('Real', 25.0) for _ in img_arrays]
+
+
+def _png(width, height, color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def test_uploads_are_decoded_at_the_model_input_size():
+    model = FakeModel(input_size=(96, 160))
+    items = [('a.png', _png(300, 200, 'red')), ('b.png', _png(50, 70, 'blue')), ('c.txt', b'text')]
+    with ThreadPoolExecutor(2) as pool:
+        results = list(score_uploads(items, {'png'}, model, PredictionCache(max_entries=0), pool))
+
+    assert model.shapes == [(96, 160, 3), (96, 160, 3)]
+    assert [r.get('result') for r in results] == ['Real', 'Real', None]
+    assert results[2]['error'] == 'Invalid file type.'
+
+
+def test_undecodable_files_become_per_file_errors(monkeypatch):
+    # Anything above twice this many pixels raises DecompressionBombError
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+    model = FakeModel(input_size=(32, 32))
+    items = [('bomb.png', _png(100, 100, 'red')), ('bad.png', b'not an image'), ('ok.png', _png(20, 20, 'blue'))]
+    with ThreadPoolExecutor(2) as pool:
+        results = list(score_uploads(items, {'png'}, model, PredictionCache(max_entries=0), pool))
+
+    assert [r['filename'] for r in results] == ['bomb.png', 'bad.png', 'ok.png']
+    assert results[0]['error'] == 'The uploaded image has too many pixels.'
+    assert results[1]['error'] == 'The uploaded file is not a valid image.'
+    assert results[2]['result'] == 'Real'
+    assert model.shapes == [(32, 32, 3)]
@@ -0,0 +1,138 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from api.storage import BackgroundWriter, ContentStore, content_digest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentStore(str(tmp_path / 'uploads'), str(tmp_path / 'uploads.sqlite3'))
+
+
+def _exists(store, relative_path):
+    return os.path.isfile(os.path.join(store.root, relative_path))
+
+
+def test_same_content_under_another_extension_is_served_from_the_stored_object(store):
+    writer = BackgroundWriter(store)
+    data = b'\x89PNG same bytes'
+
+    first = writer.save(data, 'x.jpg', 'guest')
+    # Queued behind the first write, and again once that one is stored
+    second = writer.save(data, 'x.png', 'guest')
+    writer._queue.join()
+    third = writer.save(data, 'y.png', 'user')
+    writer._queue.join()
+
+    assert first == second == third == store.lookup(content_digest(data))
+    assert first.endswith('.jpg')
+    assert _exists(store, first)
+    assert writer._pending == {}
+
+
+def _refcount(store, digest):
+    row = store._connection().execute('SELECT refcount FROM objects WHERE digest = ?', (digest,)).fetchone()
+    return row[0] if row else None
+
+
+def _put_in_order(store, contents, namespace='guest'):
+    """Store each content with increasing creation times, oldest first."""
+    paths = []
+    for i, data in enumerate(contents):
+        paths.append(store.put(data, f'{i}.png', namespace))
+        store._connection().execute('UPDATE refs SET created = ? WHERE id = last_insert_rowid()', (1000.0 + i,))
+    return paths
+
+
+def test_identical_uploads_share_one_object_until_the_last_reference_is_deleted(store):
+    data = b'shared content'
+    digest = content_digest(data)
+    guest_path = store.put(data, 'a.png', 'guest')
+    user_path = store.put(data, 'b.jpeg', 'user')
+
+    assert guest_path == user_path and _exists(store, guest_path)
+    assert _refcount(store, digest) == 2
+
+    assert store.sweep('guest', max_age=-1) == {'references': 1, 'objects': 0, 'bytes': 0}
+    assert _refcount(store, digest) == 1 and _exists(store, guest_path)
+
+    assert store.sweep('user', max_age=-1) == {'references': 1, 'objects': 1, 'bytes': len(data)}
+    assert _refcount(store, digest) is None and not _exists(store, guest_path)
+
+
+def test_byte_budget_deletes_only_the_oldest_uploads_needed(store):
+    paths = _put_in_order(store, [bytes([i]) * 100 for i in range(4)])
+
+    stats = store.sweep('guest', max_bytes=250)
+
+    assert stats == {'references': 2, 'objects': 2, 'bytes': 200}
+    assert [_exists(store, path) for path in paths] == [False, False, True, True]
+
+
+def test_age_limit_keeps_recent_uploads(store):
+    old, recent = _put_in_order(store, [b'old', b'recent'])
+    store._connection().execute('UPDATE refs SET created = ? WHERE digest = ?', (1e12, content_digest(b'recent')))
+
+    assert store.sweep('guest', max_age=3600)['references'] == 1
+    assert not _exists(store, old) and _exists(store, recent)
+
+
+def test_objects_shared_with_another_namespace_do_not_count_against_the_budget(store):
+    store.put(b'x' * 1000, 'big.png', 'user')
+    shared = store.put(b'x' * 1000, 'big.png', 'guest')
+    own = store.put(b'y' * 10, 'small.png', 'guest')
+
+    assert store.sweep('guest', max_bytes=100)['references'] == 0
+    assert _exists(store, shared) and _exists(store, own)
+
+
+def test_sweep_deletes_in_chunks(store):
+    paths = _put_in_order(store, [bytes([i]) * 10 for i in range(7)])
+
+    assert store.sweep('guest', max_age=-1, chunk_size=3)['references'] == 7
+    assert not any(_exists(store, path) for path in paths)
+
+
+def test_put_file_moves_new_content_and_drops_duplicates(store):
+    first = os.path.join(store.temp_dir, 'first')
+    second = os.path.join(store.temp_dir, 'second')
+    for path in (first, second):
+        with open(path, 'wb') as f:
+            f.write(b'video bytes')
+
+    stored = store.put_file(first, 'clip.mp4', 'guest')
+    assert store.put_file(second, 'clip.mp4', 'guest') == stored
+
+    assert _exists(store, stored)
+    assert not os.path.exists(first) and not os.path.exists(second)
+    assert _refcount(store, content_digest(b'video bytes')) == 2
+
+
+def test_queued_uploads_are_stored_before_the_process_exits(tmp_path):
+    script = (
+        'import sys\n'
+        'from api.storage import BackgroundWriter, ContentStore\n'
+        'writer = BackgroundWriter(ContentStore(sys.argv[1], sys.argv[1] + "/index.sqlite3"))\n'
+        'paths = [writer.save(b"upload %d" % i * 1000, "%d.png" % i, "guest") for i in range(50)]\n'
+        'with open(sys.argv[2], "w") as f:\n'
+        '    f.write("\\n".join(paths))\n'
+    )
+    root, listing = tmp_path / 'uploads', tmp_path / 'paths.txt'
+    subprocess.run([sys.executable, '-c', script, str(root), str(listing)], cwd=BACKEND_DIR, check=True,
+                   capture_output=True)
+    paths = listing.read_text().splitlines()
+
+    assert len(paths) == 50
+    assert all(os.path.isfile(root / path) for path in paths)
+
+
+def test_drain_gives_up_after_the_timeout(store):
+    writer = BackgroundWriter(store)
+    writer._queue.put(None)  # A task the (not started) writer thread never completes
+
+    assert writer.drain(timeout=0.05) is False
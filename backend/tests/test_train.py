@@ -0,0 +1,130 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+tf = pytest.importorskip('tensorflow')
+from train import DatasetHandler  # noqa: E402
+
+
+def _handler(dataset_dir, **kwargs):
+    return DatasetHandler(
+        dataset_url=None, dataset_download_dir=str(dataset_dir), dataset_file='dataset.zip',
+        dataset_dir=str(dataset_dir), train_dir='Train', test_dir='Test', val_dir='Validation', **kwargs
+    )
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    for label, color in (('Fake', (255, 0, 0)), ('Real', (0, 0, 255))):
+        os.makedirs(tmp_path / 'Train' / label)
+        for i in range(3):
+            Image.new('RGB', (40, 30), color).save(tmp_path / 'Train' / label / f'{i}.png')
+    return tmp_path
+
+
+def test_disk_cache_is_rebuilt_when_the_image_size_changes(dataset_dir, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    for image_size in ((16, 16), (24, 20)):
+        handler = _handler(dataset_dir, cache=str(cache_dir), image_size=image_size, batch_size=4)
+        dataset = handler.get_image_dataset_from_directory('Train', shuffle=False)
+        shapes = {tuple(images.shape[1:]) for images, _ in dataset}
+        assert shapes == {image_size + (3,)}
+
+    # Only the cache of the current image size is kept
+    names = {name.split('.')[0] for name in os.listdir(cache_dir)}
+    assert len(names) == 1 and names.pop().startswith('Train-24x20-')
+
+
+def test_disk_cache_is_reused_for_the_same_settings(dataset_dir, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    first = _handler(dataset_dir, cache=str(cache_dir), image_size=(16, 16))
+    labels = np.concatenate([l.numpy() for _, l in first.get_image_dataset_from_directory('Train', shuffle=False)])
+    files = sorted(os.listdir(cache_dir))
+
+    second = _handler(dataset_dir, cache=str(cache_dir), image_size=(16, 16), batch_size=2)
+    again = np.concatenate([l.numpy() for _, l in second.get_image_dataset_from_directory('Train', shuffle=False)])
+    assert sorted(os.listdir(cache_dir)) == files
+    assert list(again) == list(labels) == [0, 0, 0, 1, 1, 1]
+
+
+@pytest.mark.parametrize('cache', ['memory', 'disk'])
+def test_cached_split_mixes_classes_within_batches(tmp_path, cache):
+    for label, color in (('Fake', (255, 0, 0)), ('Real', (0, 0, 255))):
+        os.makedirs(tmp_path / 'Train' / label)
+        for i in range(16):
+            Image.new('RGB', (8, 8), color).save(tmp_path / 'Train' / label / f'{i}.png')
+    cache_dir = 'memory' if cache == 'memory' else str(tmp_path / 'cache')
+    # A one-image buffer leaves only the order the split was decoded (and cached) in
+    handler = _handler(tmp_path, cache=cache_dir, image_size=(8, 8), batch_size=8, shuffle_buffer=1)
+    dataset = handler.get_image_dataset_from_directory('Train')
+
+    batches = [labels.numpy() for _, labels in dataset]
+    assert sorted(np.concatenate(batches)) == [0] * 16 + [1] * 16
+    assert all(0 < batch.sum() < len(batch) for batch in batches)
+
+
+@pytest.mark.parametrize('shard_format', ['tfrecord', 'npy'])
+def test_shards_are_rewritten_when_the_settings_change(dataset_dir, tmp_path, shard_format):
+    for split in ('Test', 'Validation'):
+        os.makedirs(dataset_dir / split)
+        os.symlink(dataset_dir / 'Train' / 'Fake', dataset_dir / split / 'Fake')
+        os.symlink(dataset_dir / 'Train' / 'Real', dataset_dir / split / 'Real')
+    shard_root = str(tmp_path / 'shards')
+
+    index_path = os.path.join(shard_root, 'Test', 'index.json')
+    written = []
+    for image_size in ((16, 16), (16, 16), (24, 20)):
+        handler = _handler(dataset_dir, image_size=image_size, batch_size=4)
+        _, test, _ = handler.load_split_shards(shard_root, shard_format)
+        assert {tuple(images.shape[1:]) for images, _ in test} == {image_size + (3,)}
+        written.append(os.stat(index_path).st_mtime_ns)
+    # Shards written with the same settings are reused
+    assert written[0] == written[1] != written[2]
+
+    # A class added to the split is picked up too
+    os.makedirs(dataset_dir / 'Test' / 'Unsure')
+    Image.new('RGB', (40, 30), (0, 255, 0)).save(dataset_dir / 'Test' / 'Unsure' / '0.png')
+    _, test, _ = _handler(dataset_dir, image_size=(24, 20)).load_split_shards(shard_root, shard_format)
+    assert test.class_names == ['Fake', 'Real', 'Unsure']
+    assert sorted(np.concatenate([labels.numpy() for _, labels in test])) == [0, 0, 0, 1, 1, 1, 2]
+
+
+def test_profiler_writes_comparable_records(tmp_path):
+    from train import TrainingProfiler
+
+    model = tf.keras.Sequential([
+        tf.keras.Input((8, 8, 3)),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(1, activation='sigmoid'),
+    ])
+    model.compile(optimizer=tf.keras.optimizers.Adam(0.01), loss='binary_crossentropy')
+    images = np.random.default_rng(0).random((40, 8, 8, 3), dtype=np.float32)
+    labels = (images.mean(axis=(1, 2, 3)) > 0.5).astype(np.float32)
+    dataset = tf.data.Dataset.from_tensor_slices((images, labels)).batch(8)
+
+    log_path = tmp_path / 'profile' / 'profile.jsonl'
+    profiler = TrainingProfiler(str(log_path), batch_size=8, log_steps=True)
+    profiler.measure_compute(model, steps=2)
+    model.fit(dataset, epochs=2, callbacks=[profiler], verbose=0)
+
+    records = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert [r['type'] for r in records] == ['run'] + ['step'] * 5 + ['epoch'] + ['step'] * 5 + ['epoch', 'summary']
+    epochs = [r for r in records if r['type'] == 'epoch']
+    assert [e['steps'] for e in epochs] == [5, 5]
+    for epoch in epochs:
+        assert epoch['train_images_per_s'] > 0
+        assert 0 <= epoch['input_wait_fraction'] <= 1
+        assert 'loss' in epoch
+    assert records[-1]['epochs'] == 2
+    assert records[0]['compute_step_s'] > 0
+
+
+def test_profiler_works_without_the_resource_module(monkeypatch):
+    from train import TrainingProfiler
+
+    monkeypatch.setitem(sys.modules, 'resource', None)
+    assert TrainingProfiler.peak_rss_mb() is None
@@ -0,0 +1,120 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from api.storage import content_digest
+from benchmarks.upload import make_app
+
+
+def _png(width, height, color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def app(tmp_path):
+    # A missing model file leaves the model in fallback mode; uploads are still served
+    return make_app(str(tmp_path / 'missing.keras'), str(tmp_path))
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def stored(app):
+    data = _png(300, 200, 'red')
+    digest = content_digest(data)
+    relative_path = f'objects/{digest[:2]}/{digest[2:4]}/{digest}.png'
+    path = os.path.join(app.config['UPLOAD_FOLDER'], relative_path)
+    os.makedirs(os.path.dirname(path))
+    with open(path, 'wb') as f:
+        f.write(data)
+    return f'/uploads/{relative_path}', data, digest
+
+
+def _write_upload(app, relative_path, data, mtime_ns):
+    path = os.path.join(app.config['UPLOAD_FOLDER'], relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_content_addressed_upload_is_cached_for_good(client, stored):
+    url, data, digest = stored
+
+    response = client.get(url)
+
+    assert response.status_code == 200 and response.data == data
+    assert response.headers['ETag'] == f'"{digest}"'
+    assert response.cache_control.immutable and response.cache_control.max_age == 365 * 24 * 3600
+
+
+def test_revalidation_is_answered_with_304(client, stored):
+    url, _, digest = stored
+
+    response = client.get(url, headers={'If-None-Match': f'"{digest}"'})
+
+    assert response.status_code == 304 and response.data == b''
+    assert response.headers['ETag'] == f'"{digest}"'
+
+
+def test_range_request_is_answered_with_206(client, stored):
+    url, data, _ = stored
+
+    response = client.get(url, headers={'Range': 'bytes=10-19'})
+
+    assert response.status_code == 206
+    assert response.data == data[10:20]
+    assert response.headers['Content-Range'] == f'bytes 10-19/{len(data)}'
+
+
+def test_thumbnail_is_a_bounded_jpeg_with_its_own_etag(app, client, stored):
+    url, _, digest = stored
+    size = min(app.config['THUMBNAIL_SIZES'])
+
+    response = client.get(f'{url}?size={size}')
+
+    assert response.status_code == 200 and response.mimetype == 'image/jpeg'
+    assert response.headers['ETag'] == f'"{digest}-{size}"'
+    with Image.open(io.BytesIO(response.data)) as thumbnail:
+        assert thumbnail.format == 'JPEG' and max(thumbnail.size) == size
+    revalidated = client.get(f'{url}?size={size}', headers={'If-None-Match': f'"{digest}-{size}"'})
+    assert revalidated.status_code == 304
+
+
+def test_thumbnail_size_must_be_configured(client, stored):
+    url, _, _ = stored
+
+    assert client.get(f'{url}?size=7').status_code == 400
+
+
+def test_thumbnails_of_files_with_the_same_mtime_and_size_differ(app, client):
+    size = min(app.config['THUMBNAIL_SIZES'])
+    red, blue = _png(64, 64, 'red'), _png(64, 64, 'blue')
+    # Trailing bytes after the PNG's end are ignored; they make the two files the same size
+    red, blue = red.ljust(max(len(red), len(blue)), b'\0'), blue.ljust(max(len(red), len(blue)), b'\0')
+    _write_upload(app, 'legacy/a.png', red, 1_000_000_000)
+    _write_upload(app, 'legacy/b.png', blue, 1_000_000_000)
+
+    colors = []
+    for name in ('a.png', 'b.png'):
+        response = client.get(f'/uploads/legacy/{name}?size={size}')
+        assert response.status_code == 200
+        with Image.open(io.BytesIO(response.data)) as thumbnail:
+            colors.append(thumbnail.convert('RGB').getpixel((0, 0)))
+
+    assert colors[0][0] > 200 and colors[1][2] > 200
+
+
+def test_hidden_and_missing_files_are_not_served(app, client):
+    _write_upload(app, 'legacy/.a.png.tmp', b'partial', 1_000_000_000)
+
+    assert client.get('/uploads/legacy/.a.png.tmp').status_code == 404
+    assert client.get('/uploads/legacy/missing.png').status_code == 404
+    assert client.get('/uploads/../app.py').status_code == 404
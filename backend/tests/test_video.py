@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from api.model import Predictor  # noqa: E402
+from api.video import InvalidVideoError, score_video  # noqa: E402
+
+
+class FakeModel(Predictor):
+    """Scores each frame by the red channel of its first pixel and records the batch sizes."""
+
+    max_batch_size = 4
+    input_size = (6, 8)
+
+    def __init__(self):
+        self.batches = []
+
+    def score_arrays(self, img_arrays, bulk=False):
+        self.batches.append(len(img_arrays))
+        assert all(array.shape == (6, 8, 3) for array in img_arrays)
+        return [float(array[0, 0, 0]) / 255 for array in img_arrays]
+
+
+def _write_video(path, reds, fps=10.0):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), fps, (32, 24))
+    assert writer.isOpened()
+    for red in reds:
+        frame = np.zeros((24, 32, 3), dtype=np.uint8)
+        frame[..., 2] = red  # BGR
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+def test_frames_are_sampled_at_the_requested_rate(tmp_path):
+    reds = [i * 6 for i in range(40)]
+    path = _write_video(tmp_path / 'clip.avi', reds)
+    model = FakeModel()
+
+    result = score_video(path, model, sample_fps=2.0, early_stop_confidence=1.0)
+
+    # 10 fps sampled at 2 fps is every 5th frame, scored in batches of up to 4
+    assert [f['frame'] for f in result['frames']] == list(range(0, 40, 5))
+    assert [f['time_s'] for f in result['frames']] == [i / 10 for i in range(0, 40, 5)]
+    assert model.batches == [4, 4]
+    # Frames reach the model in RGB order
+    scores = [f['score'] for f in result['frames']]
+    assert scores == pytest.approx([reds[i] / 255 for i in range(0, 40, 5)], abs=0.03)
+    assert result['frames_scored'] == 8 and not result['early_stopped']
+
+
+def test_scoring_stops_early_once_confident(tmp_path):
+    path = _write_video(tmp_path / 'clip.avi', [255] * 40)
+    model = FakeModel()
+
+    result = score_video(path, model, sample_fps=0, min_frames=8, early_stop_confidence=0.9)
+
+    assert result['early_stopped'] and result['frames_scored'] == 8
+    assert result['result'] == 'Fake' and result['fake_frame_ratio'] == 1.0
+    assert model.batches == [4, 4]
+
+
+def test_max_frames_bounds_the_work(tmp_path):
+    path = _write_video(tmp_path / 'clip.avi', [0] * 40)
+    model = FakeModel()
+
+    result = score_video(path, model, sample_fps=0, max_frames=6, early_stop_confidence=1.0)
+
+    assert result['frames_scored'] == 6 and model.batches == [4, 2]
+    assert result['result'] == 'Real'
+
+
+def test_undecodable_file_is_rejected(tmp_path):
+    path = tmp_path / 'clip.avi'
+    path.write_bytes(b'not a video')
+
+    with pytest.raises(InvalidVideoError):
+        score_video(str(path), FakeModel())
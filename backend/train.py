@@ -1,12 +1,233 @@
 import os
+import json
+import time
+import shutil
+import zlib
+import struct
+import hashlib
 import zipfile
 import urllib3
 import requests
+import numpy as np
 from tqdm import tqdm
 import tensorflow as tf
 from tensorflow.keras import layers, models  # type: ignore
 from tensorflow.keras.layers import LeakyReLU  # type: ignore
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint  # type: ignore
+from tensorflow.keras.callbacks import Callback, EarlyStopping, ReduceLROnPlateau, ModelCheckpoint  # type: ignore
+from concurrent.futures import ThreadPoolExecutor
+
+
+def safe_member_path(output_dir, name):
+    """
+    Map a zip member name to a path inside `output_dir`, dropping absolute and '..' components like ZipFile.extract.
+    """
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.', '..')]
+    return os.path.join(output_dir, *parts)
+
+
+class ZipStreamExtractor:
+    """
+    A class to extract a zip archive from a forward-only byte stream, as the bytes arrive.
+
+    Members are parsed from their local file headers, decompressed incrementally
+    and verified against their CRC-32, so the archive never has to exist on disk.
+    `offset` is the stream position right after the last fully extracted member;
+    an interrupted download can resume from there with an HTTP Range request.
+    """
+
+    _LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+    _LOCAL_SIGNATURE = b'PK\x03\x04'
+    _DESCRIPTOR_SIGNATURE = b'PK\x07\x08'
+    # Central directory, zip64 end of central directory and end of central directory records
+    _END_SIGNATURES = (b'PK\x01\x02', b'PK\x06\x06', b'PK\x05\x06')
+
+    def __init__(self, output_dir):
+        """
+        Initialize the ZipStreamExtractor.
+
+        Args:
+            output_dir (str): Directory to extract the members into.
+        """
+        self.output_dir = output_dir
+        self.offset = 0
+        self.members = 0
+        self.done = False
+        self._entry = None
+        self._buffer = bytearray()
+        self._position = 0
+
+    def resume(self):
+        """
+        Discard the partially extracted member; the stream must continue from `offset`.
+        """
+        if self._entry is not None:
+            self._entry['file'].close()
+            # Directory entries write to os.devnull and have no temporary file
+            if self._entry['tmp_path'] is not None:
+                os.remove(self._entry['tmp_path'])
+            self._entry = None
+        self._buffer = bytearray()
+        self._position = self.offset
+
+    def feed(self, data):
+        """
+        Extract as much of the archive as the bytes received so far allow.
+
+        Args:
+            data (bytes): The next bytes of the archive.
+        """
+        if self.done:
+            return
+        self._buffer += data
+        while not self.done and self._step():
+            pass
+
+    def _take(self, size):
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self._position += size
+        return chunk
+
+    def _step(self):
+        """Advance the parser by one step, returning False when more bytes are needed."""
+        if self._entry is None:
+            return self._read_header()
+        if self._entry['state'] == 'data':
+            return self._read_data()
+        return self._read_descriptor()
+
+    def _read_header(self):
+        if len(self._buffer) < 4:
+            return False
+        signature = bytes(self._buffer[:4])
+        if signature in self._END_SIGNATURES:
+            self.done = True
+            self.offset = self._position
+            return False
+        if signature != self._LOCAL_SIGNATURE:
+            raise zipfile.BadZipFile(f'unexpected signature {signature!r} at offset {self._position}')
+        if len(self._buffer) < self._LOCAL_HEADER.size:
+            return False
+        (_, _, flags, method, _, _, crc, compressed_size, size,
+         name_length, extra_length) = self._LOCAL_HEADER.unpack_from(self._buffer)
+        header_length = self._LOCAL_HEADER.size + name_length + extra_length
+        if len(self._buffer) < header_length:
+            return False
+        header = self._take(header_length)
+        raw_name = header[self._LOCAL_HEADER.size:self._LOCAL_HEADER.size + name_length]
+        name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437')
+        extra = header[self._LOCAL_HEADER.size + name_length:]
+
+        # Zip64 members keep their real sizes in the extra field
+        zip64 = False
+        while len(extra) >= 4:
+            field_id, field_length = struct.unpack_from('<HH', extra)
+            if field_id == 0x0001:
+                zip64 = True
+                values = list(struct.unpack_from(f'<{field_length // 8}Q', extra, 4))
+                if size == 0xFFFFFFFF:
+                    size = values.pop(0)
+                if compressed_size == 0xFFFFFFFF:
+                    compressed_size = values.pop(0)
+            extra = extra[4 + field_length:]
+
+        if flags & 0x1:
+            raise zipfile.BadZipFile(f'encrypted member {name} is not supported')
+        if method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            raise zipfile.BadZipFile(f'compression method {method} of {name} is not supported')
+        has_descriptor = bool(flags & 0x8)
+        # Directories carry no data, even when their sizes are deferred to a data descriptor
+        size_known = name.endswith('/') or not (has_descriptor and compressed_size == 0)
+        if method == zipfile.ZIP_STORED and not size_known:
+            raise zipfile.BadZipFile(f'stored member {name} has no size and cannot be streamed')
+
+        path = safe_member_path(self.output_dir, name)
+        if name.endswith('/'):
+            os.makedirs(path, exist_ok=True)
+            file, tmp_path = open(os.devnull, 'wb'), None
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.part'
+            file = open(tmp_path, 'wb')
+        self._entry = {
+            'name': name,
+            'path': path,
+            'tmp_path': tmp_path,
+            'file': file,
+            'state': 'data',
+            'remaining': compressed_size if size_known else None,
+            'decompressor': zlib.decompressobj(-15) if method == zipfile.ZIP_DEFLATED else None,
+            'expected_crc': crc,
+            'crc': 0,
+            'has_descriptor': has_descriptor,
+            'zip64': zip64,
+        }
+        return True
+
+    def _write(self, data):
+        if data:
+            self._entry['crc'] = zlib.crc32(data, self._entry['crc'])
+            self._entry['file'].write(data)
+
+    def _read_data(self):
+        entry = self._entry
+        decompressor = entry['decompressor']
+        if entry['remaining'] is not None:
+            size = min(len(self._buffer), entry['remaining'])
+            if size == 0 and entry['remaining'] > 0:
+                return False
+            chunk = self._take(size)
+            entry['remaining'] -= size
+            self._write(decompressor.decompress(chunk) if decompressor else chunk)
+            if entry['remaining'] > 0:
+                return False
+            if decompressor:
+                self._write(decompressor.flush())
+        else:
+            # The compressed size is unknown, so decompress until the deflate stream ends
+            if not self._buffer:
+                return False
+            chunk = self._take(len(self._buffer))
+            self._write(decompressor.decompress(chunk))
+            if not decompressor.eof:
+                return False
+            unused = decompressor.unused_data
+            self._buffer[:0] = unused
+            self._position -= len(unused)
+        if entry['has_descriptor']:
+            entry['state'] = 'descriptor'
+            return True
+        self._finish_member(entry['expected_crc'])
+        return True
+
+    def _read_descriptor(self):
+        sizes_length = 16 if self._entry['zip64'] else 8
+        if len(self._buffer) < 4:
+            return False
+        signed = bytes(self._buffer[:4]) == self._DESCRIPTOR_SIGNATURE
+        length = (4 if signed else 0) + 4 + sizes_length
+        if len(self._buffer) < length:
+            return False
+        descriptor = self._take(length)
+        crc, = struct.unpack_from('<I', descriptor, 4 if signed else 0)
+        self._finish_member(crc)
+        return True
+
+    def _finish_member(self, expected_crc):
+        entry = self._entry
+        entry['file'].close()
+        if entry['crc'] != expected_crc and not entry['name'].endswith('/'):
+            os.remove(entry['tmp_path'])
+            raise zipfile.BadZipFile(f'CRC-32 mismatch for {entry["name"]}')
+        if not entry['name'].endswith('/'):
+            os.replace(entry['tmp_path'], entry['path'])
+        self._entry = None
+        self.members += 1
+        self.offset = self._position
+
+
+# Image formats picked up from the dataset directories, as in tf.keras.utils.image_dataset_from_directory
+IMAGE_EXTENSIONS = ('.bmp', '.gif', '.jpeg', '.jpg', '.png')
 
 
 class DatasetHandler:
@@ -14,7 +235,11 @@ class DatasetHandler:
     A class to handle dataset downloading, unzipping, loading, and processing.
     """
 
-    def __init__(self, dataset_url, dataset_download_dir, dataset_file, dataset_dir, train_dir, test_dir, val_dir):
+    def __init__(self, dataset_url, dataset_download_dir, dataset_file, dataset_dir, train_dir, test_dir, val_dir,
+                 batch_size=64, image_size=(128, 128), cache=None, shuffle_buffer=1024,
+                 num_parallel_calls=tf.data.AUTOTUNE, augment=False, seed=42,
+                 dataset_sha256=None, stream_extract=False, download_chunk_size=8 * 1024 * 1024,
+                 max_retries=5, extract_workers=8, keep_archive=True):
         """
         Initialize the DatasetHandler with the specified parameters.
 
@@ -26,6 +251,22 @@ class DatasetHandler:
             train_dir (str): Directory containing the training data.
             test_dir (str): Directory containing the test data.
             val_dir (str): Directory containing the validation data.
+            batch_size (int): Number of images per batch.
+            image_size (tuple): (height, width) to resize the images to.
+            cache (str, optional): 'memory' to cache decoded images in RAM, a directory to cache them on
+                disk, or None to decode every epoch. Cached images are stored as uint8; a disk cache of the
+                full dataset takes several GB. Caches built for another image size or file list are replaced.
+            shuffle_buffer (int): Shuffle buffer size used when the decoded images are cached.
+            num_parallel_calls (int): Parallelism of decoding and augmentation (tf.data.AUTOTUNE by default).
+            augment (bool): Whether to apply random horizontal flips to the training data.
+            seed (int): Random seed for shuffling and augmentation.
+            dataset_sha256 (str, optional): Expected SHA-256 of the dataset file, verified after download.
+            stream_extract (bool): Extract the archive while it downloads instead of saving the zip first.
+                Every member is checked against its CRC-32 instead of `dataset_sha256`.
+            download_chunk_size (int): Size of the chunks read from the download.
+            max_retries (int): Number of times an interrupted download is resumed.
+            extract_workers (int): Number of threads extracting the downloaded archive.
+            keep_archive (bool): Whether to keep the dataset file after it has been extracted.
         """
         self.dataset_url = dataset_url
         self.dataset_download_dir = dataset_download_dir
@@ -34,68 +275,481 @@ class DatasetHandler:
         self.train_dir = train_dir
         self.test_dir = test_dir
         self.val_dir = val_dir
+        self.batch_size = batch_size
+        self.image_size = tuple(image_size)
+        self.cache = cache
+        self.shuffle_buffer = shuffle_buffer
+        self.num_parallel_calls = num_parallel_calls
+        self.augment = augment
+        self.seed = seed
+        self.dataset_sha256 = dataset_sha256
+        self.stream_extract = stream_extract
+        self.download_chunk_size = download_chunk_size
+        self.max_retries = max_retries
+        self.extract_workers = extract_workers
+        self.keep_archive = keep_archive
+
+    def _stream_download(self, consume, offset_fn, on_restart):
+        """
+        Stream the dataset URL into `consume`, resuming with HTTP Range requests after failures.
+
+        Args:
+            consume (callable): Called with every chunk of downloaded bytes.
+            offset_fn (callable): Returns the byte offset to resume the download from.
+            on_restart (callable): Called before every retry; receives True if the server ignored
+                the Range request and the download starts over from the first byte.
+
+        Returns:
+            bool: True if the whole file was received, False otherwise.
+        """
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        for attempt in range(self.max_retries + 1):
+            offset = offset_fn()
+            headers = {'Range': f'bytes={offset}-'} if offset else {}
+            try:
+                with requests.get(self.dataset_url, stream=True, verify=False, headers=headers, timeout=60) as response:
+                    if offset and response.status_code == 416:
+                        # Everything was already received
+                        return True
+                    response.raise_for_status()
+                    if offset and response.status_code != 206:
+                        print('server ignored the range request, downloading from the start')
+                        on_restart(True)
+                        offset = 0
+                    content_length = int(response.headers.get('content-length', 0))
+                    total_size = offset + content_length if content_length else None
+                    received = offset
+                    with tqdm(desc=self.dataset_file, total=total_size, initial=offset, unit='iB', unit_scale=True, unit_divisor=1024) as bar:
+                        for data in response.iter_content(chunk_size=self.download_chunk_size):
+                            consume(data)
+                            received += len(data)
+                            bar.update(len(data))
+                    if total_size is not None and received < total_size:
+                        raise requests.ConnectionError(f'connection closed after {received} of {total_size} bytes')
+                return True
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    print(f'download failed: {e}')
+                    return False
+                wait = min(2 ** attempt, 30)
+                print(f'download interrupted ({e}), resuming in {wait}s ({attempt + 1}/{self.max_retries})')
+                on_restart(False)
+                time.sleep(wait)
+        return False
+
+    def _extracted_marker(self):
+        """Path of the file written once the archive has been fully extracted."""
+        return os.path.join(self.dataset_download_dir, f'{self.dataset_file}.extracted')
+
+    def _is_extracted(self):
+        """
+        Check whether the dataset was fully extracted by an earlier run.
+
+        The dataset directory alone is not enough: an interrupted extraction
+        leaves it behind with only some of the members.
+        """
+        if os.path.exists(self._extracted_marker()) and os.path.exists(self.dataset_dir):
+            print(f'dataset is already downloaded and extracted at {self.dataset_dir}')
+            return True
+        if os.path.exists(self.dataset_dir):
+            print(f'dataset at {self.dataset_dir} was not completely extracted, extracting it again')
+        return False
+
+    def _mark_extracted(self):
+        with open(self._extracted_marker(), 'w') as f:
+            f.write(f'{self.dataset_url}\n')
 
     def download_dataset(self):
         """
         Download the dataset from the specified URL.
-        
+
+        Downloads go to a '.part' file and resume from where they stopped if the
+        connection drops. With `stream_extract`, the archive is extracted while
+        it downloads and never written to disk.
+
         Returns:
             bool: True if the dataset was successfully downloaded, False otherwise.
         """
         if not os.path.exists(self.dataset_download_dir):
             os.makedirs(self.dataset_download_dir)
+        if self._is_extracted():
+            return True
+        if self.stream_extract:
+            return self._download_and_extract()
         file_path = os.path.join(self.dataset_download_dir, self.dataset_file)
         if os.path.exists(file_path):
             print(f'dataset file {self.dataset_file} already exists at {file_path}')
             return True
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        response = requests.get(self.dataset_url, stream=True, verify=False)
-        total_size = int(response.headers.get('content-length', 0))
-        with open(file_path, 'wb') as file, tqdm(desc=self.dataset_file, total=total_size, unit='iB', unit_scale=True, unit_divisor=1024) as bar:
-            for data in response.iter_content(chunk_size=1024):
-                size = file.write(data)
-                bar.update(size)
+
+        partial_path = file_path + '.part'
+        digest = hashlib.sha256()
+        if os.path.exists(partial_path):
+            with open(partial_path, 'rb') as file:
+                for chunk in iter(lambda: file.read(self.download_chunk_size), b''):
+                    digest.update(chunk)
+        with open(partial_path, 'ab') as file:
+            def consume(data):
+                file.write(data)
+                digest.update(data)
+
+            def on_restart(from_scratch):
+                nonlocal digest
+                file.flush()
+                if from_scratch:
+                    file.truncate(0)
+                    file.seek(0)
+                    digest = hashlib.sha256()
+
+            # The file is opened for appending, so its position is the number of bytes received so far
+            if not self._stream_download(consume, file.tell, on_restart):
+                return False
+
+        if self.dataset_sha256 and digest.hexdigest() != self.dataset_sha256.lower():
+            print(f'checksum mismatch for {partial_path}: expected {self.dataset_sha256}, got {digest.hexdigest()}')
+            os.remove(partial_path)
+            return False
+        os.replace(partial_path, file_path)
         print(f'dataset downloaded and saved to {file_path}')
         return True
 
+    def _download_and_extract(self):
+        """
+        Extract the dataset while it downloads, resuming from the last complete member after failures.
+
+        Returns:
+            bool: True if the dataset was successfully extracted, False otherwise.
+        """
+        extractor = ZipStreamExtractor(self.dataset_download_dir)
+
+        def on_restart(from_scratch):
+            nonlocal extractor
+            extractor.resume()
+            if from_scratch:
+                extractor = ZipStreamExtractor(self.dataset_download_dir)
+
+        try:
+            if not self._stream_download(lambda data: extractor.feed(data), lambda: extractor.offset, on_restart):
+                return False
+        except zipfile.BadZipFile as e:
+            print(f'failed to extract the dataset stream: {e}')
+            return False
+        if not extractor.done:
+            print('dataset stream ended before the end of the archive')
+            return False
+        self._mark_extracted()
+        print(f'{extractor.members} members extracted to {self.dataset_download_dir}')
+        return True
+
     def unzip_dataset(self):
         """
-        Unzip the downloaded dataset file.
+        Unzip the downloaded dataset file, extracting members on several threads.
         
         Returns:
             bool: True if the dataset was successfully unzipped, False otherwise.
         """
         file_path = os.path.join(self.dataset_download_dir, self.dataset_file)
-        if os.path.exists(self.dataset_dir):
-            print(f'dataset is already downloaded and extracted at {self.dataset_dir}')
+        if self._is_extracted():
             return True
         if not os.path.exists(file_path):
             print(f'dataset file {file_path} not found after download')
             return False
         with zipfile.ZipFile(file_path, 'r') as zip_ref:
-            zip_ref.extractall(self.dataset_download_dir)
+            members = zip_ref.infolist()
+
+        def extract(chunk):
+            # zlib releases the GIL, so every thread decompresses through its own handle in parallel
+            with zipfile.ZipFile(file_path, 'r') as zip_ref:
+                for member in chunk:
+                    zip_ref.extract(member, self.dataset_download_dir)
+            return len(chunk)
+
+        # Create the directories up front so the worker threads never race on them
+        files = [member for member in members if not member.is_dir()]
+        for member in members:
+            path = safe_member_path(self.dataset_download_dir, member.filename)
+            os.makedirs(path if member.is_dir() else os.path.dirname(path), exist_ok=True)
+        chunks = [files[i:i + 256] for i in range(0, len(files), 256)]
+        with ThreadPoolExecutor(max_workers=self.extract_workers) as pool, tqdm(desc='extracting', total=len(files), unit='file') as bar:
+            for count in pool.map(extract, chunks):
+                bar.update(count)
+        self._mark_extracted()
+        if not self.keep_archive:
+            os.remove(file_path)
         print(f'dataset extracted to {self.dataset_dir}')
         return True
 
-    def get_image_dataset_from_directory(self, dir_name):
+    def _list_image_files(self, dir_path):
+        """
+        List the image files of a directory with one subdirectory per class.
+
+        Returns:
+            tuple: (file paths, integer labels, class names), with classes in alphabetical order.
+        """
+        class_names = sorted(d for d in os.listdir(dir_path) if os.path.isdir(os.path.join(dir_path, d)))
+        paths, labels = [], []
+        for label, class_name in enumerate(class_names):
+            for root, _, files in sorted(os.walk(os.path.join(dir_path, class_name))):
+                for file_name in sorted(files):
+                    if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                        paths.append(os.path.join(root, file_name))
+                        labels.append(label)
+        return paths, labels, class_names
+
+    def _decode_image(self, path, label):
+        """Read, decode and resize one image (bilinear, like image_dataset_from_directory)."""
+        img = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+        img = tf.image.resize(img, self.image_size, method='bilinear')
+        img.set_shape(self.image_size + (3,))
+        return img, label
+
+    def _cache_path(self, dir_name, paths, labels):
+        """
+        Return the file cache prefix of a split, deleting caches of the split built with other settings.
+
+        tf.data silently reuses whatever cache exists at a prefix, so the prefix
+        covers everything the cached images depend on: the image size and the file list.
+        """
+        digest = hashlib.sha256(json.dumps([self.image_size, paths, labels]).encode('utf-8')).hexdigest()[:12]
+        name = f'{dir_name}-{self.image_size[0]}x{self.image_size[1]}-{digest}'
+        os.makedirs(self.cache, exist_ok=True)
+        for entry in os.scandir(self.cache):
+            # Also removes the unversioned caches of older runs ('<split>.index', ...)
+            if entry.is_file() and entry.name.startswith((f'{dir_name}-', f'{dir_name}.')) \
+                    and not entry.name.startswith(name + '.'):
+                print(f'Removing stale dataset cache {entry.path}')
+                os.remove(entry.path)
+        return os.path.join(self.cache, name)
+
+    def _augment_batch(self, images, labels):
+        """Apply random horizontal flips to a batch of images."""
+        return tf.image.random_flip_left_right(images, seed=self.seed), labels
+
+    def get_image_dataset_from_directory(self, dir_name, shuffle=True, augment=None):
         """
         Load image dataset from the specified directory.
 
+        Decoding runs in parallel, decoded images are optionally cached (so JPEG
+        decoding happens only in the first epoch) and batches are prefetched so
+        the model never waits on the input pipeline.
+
         Args:
             dir_name (str): Name of the directory containing the dataset.
+            shuffle (bool): Whether to shuffle the images every epoch.
+            augment (bool, optional): Whether to augment the images. Defaults to the handler's setting.
 
         Returns:
             tf.data.Dataset: Loaded image dataset.
         """
         dir_path = os.path.join(self.dataset_dir, dir_name)
-        return tf.keras.utils.image_dataset_from_directory(
-            dir_path,
-            labels='inferred',
-            color_mode='rgb',
-            seed=42,
-            batch_size=64,
-            image_size=(128, 128)
+        paths, labels, class_names = self._list_image_files(dir_path)
+        print(f'Found {len(paths)} files belonging to {len(class_names)} classes.')
+        if shuffle and self.cache:
+            # The files are listed class by class and the shuffle buffer after the cache only
+            # mixes nearby images, so decode and cache them in a (fixed) shuffled order
+            order = np.random.default_rng(self.seed).permutation(len(paths))
+            paths = [paths[i] for i in order]
+            labels = [labels[i] for i in order]
+        dataset = tf.data.Dataset.from_tensor_slices((paths, tf.constant(labels, dtype=tf.int32)))
+
+        # Without a cache, shuffling the file names before decoding is free and covers the whole split
+        if shuffle and not self.cache:
+            dataset = dataset.shuffle(len(paths), seed=self.seed, reshuffle_each_iteration=True)
+        dataset = dataset.map(self._decode_image, num_parallel_calls=self.num_parallel_calls)
+
+        if self.cache:
+            # Cache as uint8 to need a quarter of the memory or disk space of float32
+            dataset = dataset.map(lambda img, label: (tf.cast(tf.round(img), tf.uint8), label))
+            if self.cache == 'memory':
+                dataset = dataset.cache()
+            else:
+                dataset = dataset.cache(self._cache_path(dir_name, paths, labels))
+            if shuffle:
+                dataset = dataset.shuffle(self.shuffle_buffer, seed=self.seed, reshuffle_each_iteration=True)
+            dataset = dataset.map(lambda img, label: (tf.cast(img, tf.float32), label))
+
+        dataset = dataset.batch(self.batch_size)
+        if self.augment if augment is None else augment:
+            dataset = dataset.map(self._augment_batch, num_parallel_calls=self.num_parallel_calls)
+        dataset = dataset.prefetch(tf.data.AUTOTUNE)
+        dataset.class_names = class_names
+        return dataset
+
+    def write_shards(self, dir_name, output_dir, images_per_shard=4096, shard_format='tfrecord'):
+        """
+        Decode and resize a split once and write it as compact uint8 shards with an index.
+
+        The images are shuffled before they are written so every shard mixes both
+        classes, which lets readers shuffle across shards with a small buffer.
+
+        Args:
+            dir_name (str): Name of the directory containing the split.
+            output_dir (str): Directory to write the shards and 'index.json' to.
+            images_per_shard (int): Number of images per shard.
+            shard_format (str): 'tfrecord' or 'npy' (memory-mapped at training time).
+
+        Returns:
+            dict: The shard index.
+        """
+        if shard_format not in ('tfrecord', 'npy'):
+            raise ValueError(f'unknown shard format {shard_format}')
+        paths, labels, class_names = self._list_image_files(os.path.join(self.dataset_dir, dir_name))
+        order = np.random.default_rng(self.seed).permutation(len(paths))
+        dataset = tf.data.Dataset.from_tensor_slices(
+            ([paths[i] for i in order], tf.constant([labels[i] for i in order], dtype=tf.int32))
         )
+        dataset = dataset.map(self._decode_image, num_parallel_calls=self.num_parallel_calls)
+        dataset = dataset.map(lambda img, label: (tf.cast(tf.round(img), tf.uint8), label))
+        dataset = dataset.batch(images_per_shard).prefetch(1)
+
+        os.makedirs(output_dir, exist_ok=True)
+        shards = []
+        for shard_index, (images, shard_labels) in enumerate(tqdm(dataset.as_numpy_iterator(), desc=dir_name, unit='shard')):
+            name = f'shard-{shard_index:05d}'
+            if shard_format == 'tfrecord':
+                name += '.tfrecord'
+                with tf.io.TFRecordWriter(os.path.join(output_dir, name)) as writer:
+                    for img, label in zip(images, shard_labels):
+                        example = tf.train.Example(features=tf.train.Features(feature={
+                            'image': tf.train.Feature(bytes_list=tf.train.BytesList(value=[img.tobytes()])),
+                            'label': tf.train.Feature(int64_list=tf.train.Int64List(value=[int(label)])),
+                        }))
+                        writer.write(example.SerializeToString())
+            else:
+                np.save(os.path.join(output_dir, f'{name}.images.npy'), images)
+                np.save(os.path.join(output_dir, f'{name}.labels.npy'), shard_labels.astype(np.int32))
+            shards.append({'name': name, 'count': int(len(images))})
+
+        index = {
+            'format': shard_format,
+            'image_size': list(self.image_size),
+            'class_names': class_names,
+            'count': sum(shard['count'] for shard in shards),
+            'shards': shards,
+        }
+        # The index is written last, so its presence marks a complete conversion
+        with open(os.path.join(output_dir, 'index.json'), 'w') as f:
+            json.dump(index, f, indent=2)
+        print(f'{index["count"]} images from {dir_name} written to {len(shards)} {shard_format} shards in {output_dir}')
+        return index
+
+    def get_sharded_dataset(self, shard_dir, shuffle=True, augment=None):
+        """
+        Load a split written by `write_shards`, without decoding any images.
+
+        Args:
+            shard_dir (str): Directory containing the shards and 'index.json'.
+            shuffle (bool): Whether to shuffle the images every epoch.
+            augment (bool, optional): Whether to augment the images. Defaults to the handler's setting.
+
+        Returns:
+            tf.data.Dataset: Batched (float32 images, int32 labels) dataset.
+        """
+        with open(os.path.join(shard_dir, 'index.json')) as f:
+            index = json.load(f)
+        height, width = index['image_size']
+
+        if index['format'] == 'tfrecord':
+            files = [os.path.join(shard_dir, shard['name']) for shard in index['shards']]
+            dataset = tf.data.Dataset.from_tensor_slices(files)
+            if shuffle:
+                dataset = dataset.shuffle(len(files), seed=self.seed, reshuffle_each_iteration=True)
+            # Read several shards at once, interleaving their records
+            dataset = dataset.interleave(
+                tf.data.TFRecordDataset,
+                cycle_length=min(len(files), 8),
+                num_parallel_calls=self.num_parallel_calls,
+                deterministic=not shuffle
+            )
+            if shuffle:
+                dataset = dataset.shuffle(self.shuffle_buffer, seed=self.seed, reshuffle_each_iteration=True)
+            features = {
+                'image': tf.io.FixedLenFeature([], tf.string),
+                'label': tf.io.FixedLenFeature([], tf.int64),
+            }
+
+            def parse_batch(records):
+                parsed = tf.io.parse_example(records, features)
+                images = tf.reshape(tf.io.decode_raw(parsed['image'], tf.uint8), [-1, height, width, 3])
+                return tf.cast(images, tf.float32), tf.cast(parsed['label'], tf.int32)
+
+            dataset = dataset.batch(self.batch_size).map(parse_batch, num_parallel_calls=self.num_parallel_calls)
+        else:
+            # Memory-map every shard and gather batches by global index, so shuffling spans all shards
+            images = [np.load(os.path.join(shard_dir, f'{s["name"]}.images.npy'), mmap_mode='r') for s in index['shards']]
+            labels = np.concatenate([np.load(os.path.join(shard_dir, f'{s["name"]}.labels.npy')) for s in index['shards']])
+            offsets = np.cumsum([0] + [shard['count'] for shard in index['shards']])
+
+            def gather(indices):
+                indices = np.sort(indices)
+                shard_ids = np.searchsorted(offsets, indices, side='right') - 1
+                batch = np.concatenate([
+                    images[shard_id][indices[shard_ids == shard_id] - offsets[shard_id]]
+                    for shard_id in np.unique(shard_ids)
+                ])
+                return batch.astype(np.float32), labels[indices]
+
+            def load_batch(indices):
+                batch_images, batch_labels = tf.numpy_function(gather, [indices], [tf.float32, tf.int32])
+                batch_images.set_shape([None, height, width, 3])
+                batch_labels.set_shape([None])
+                return batch_images, batch_labels
+
+            dataset = tf.data.Dataset.range(index['count'])
+            if shuffle:
+                dataset = dataset.shuffle(index['count'], seed=self.seed, reshuffle_each_iteration=True)
+            dataset = dataset.batch(self.batch_size).map(load_batch, num_parallel_calls=self.num_parallel_calls)
+
+        if self.augment if augment is None else augment:
+            dataset = dataset.map(self._augment_batch, num_parallel_calls=self.num_parallel_calls)
+        dataset = dataset.prefetch(tf.data.AUTOTUNE)
+        dataset.class_names = index['class_names']
+        return dataset
+
+    def _shards_match(self, dir_name, shard_dir):
+        """
+        Check that a split's shards were written with the current settings, removing them if not.
+
+        Args:
+            dir_name (str): Name of the split's directory in the dataset.
+            shard_dir (str): Directory holding the split's shards and 'index.json'.
+
+        Returns:
+            bool: True if the shards can be used, False if the split has to be (re)converted.
+        """
+        try:
+            with open(os.path.join(shard_dir, 'index.json')) as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return False
+        paths, _, class_names = self._list_image_files(os.path.join(self.dataset_dir, dir_name))
+        if index['image_size'] == list(self.image_size) and index['class_names'] == class_names \
+                and index['count'] == len(paths):
+            return True
+        print(f'Shards in {shard_dir} were written with different settings '
+              f'({index["count"]} images of {index["image_size"]}, classes {index["class_names"]}); rewriting them')
+        shutil.rmtree(shard_dir)
+        return False
+
+    def load_split_shards(self, shard_root, shard_format='tfrecord'):
+        """
+        Load the training, validation and test datasets from shards, converting each split once if needed.
+
+        Args:
+            shard_root (str): Directory holding one shard directory per split.
+            shard_format (str): Format used when a split still has to be converted.
+
+        Returns:
+            tuple: Training, test, and validation datasets, in the same order as `load_split_data`.
+        """
+        split_dirs = {}
+        for dir_name in (self.train_dir, self.test_dir, self.val_dir):
+            split_dirs[dir_name] = os.path.join(shard_root, dir_name)
+            if not self._shards_match(dir_name, split_dirs[dir_name]):
+                self.write_shards(dir_name, split_dirs[dir_name], shard_format=shard_format)
+        train_data = self.get_sharded_dataset(split_dirs[self.train_dir])
+        test_data = self.get_sharded_dataset(split_dirs[self.test_dir], shuffle=False, augment=False)
+        val_data = self.get_sharded_dataset(split_dirs[self.val_dir], shuffle=False, augment=False)
+        return train_data, test_data, val_data
 
     def load_split_data(self):
         """
@@ -105,20 +759,194 @@ class DatasetHandler:
             tuple: Training, validation, and test datasets.
         """
         train_data = self.get_image_dataset_from_directory(self.train_dir)
-        test_data = self.get_image_dataset_from_directory(self.test_dir)
-        val_data = self.get_image_dataset_from_directory(self.val_dir)
+        test_data = self.get_image_dataset_from_directory(self.test_dir, shuffle=False, augment=False)
+        val_data = self.get_image_dataset_from_directory(self.val_dir, shuffle=False, augment=False)
         return train_data, test_data, val_data
 
 
+class TrainingProfiler(Callback):
+    """
+    A callback to profile training throughput, written as JSON lines to `log_path`.
+
+    Keras fetches each batch inside the compiled train step, so a step's wall
+    time includes any wait for the input pipeline. `measure_compute` times the
+    same train step on a batch already in memory; the difference is the time
+    the model waited on input. Each record is one JSON object with a 'type'
+    ('run', 'step', 'epoch' or 'summary'), so logs of different runs can be
+    compared line by line.
+    """
+
+    def __init__(self, log_path, batch_size, log_steps=False, trace_dir=None, trace_steps=(10, 20)):
+        """
+        Initialize the TrainingProfiler.
+
+        Args:
+            log_path (str): JSON lines file the profile is written to.
+            batch_size (int): Images per training batch, used for the images per second figures.
+            log_steps (bool): Also write a record for every step.
+            trace_dir (str, optional): Capture a TensorFlow profiler trace into this directory.
+            trace_steps (tuple): (first, last) global step of the traced window.
+        """
+        super().__init__()
+        self.log_path = log_path
+        self.batch_size = batch_size
+        self.log_steps = log_steps
+        self.trace_dir = trace_dir
+        self.trace_steps = trace_steps
+        self.compute_step_s = None
+        self.global_step = 0
+        self.epochs = []
+        self._tracing = False
+        self._file = None
+
+    @staticmethod
+    def peak_rss_mb():
+        """Peak resident memory of this process in MiB (ru_maxrss is in KiB on Linux), or None where unavailable."""
+        try:
+            # Unix only; imported here so importing train.py works everywhere
+            import resource
+        except ImportError:
+            return None
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    def _write(self, record_type, **fields):
+        self._file.write(json.dumps({'type': record_type, 'time': round(time.time(), 3), **fields}) + '\n')
+        self._file.flush()
+
+    def measure_compute(self, model, steps=10):
+        """
+        Time the train step on a synthetic batch held in memory, without touching `model`'s weights.
+
+        A clone of the model, compiled with the same optimizer settings and loss, runs
+        `steps` timed train steps after one untimed step for tracing.
+
+        Args:
+            model (tf.keras.Model): The compiled model to be trained.
+            steps (int): Number of timed steps.
+
+        Returns:
+            float: Median seconds per train step.
+        """
+        probe = tf.keras.models.clone_model(model)
+        optimizer = model.optimizer.__class__.from_config(model.optimizer.get_config())
+        probe.compile(optimizer=optimizer, loss=model.loss)
+        rng = np.random.default_rng(0)
+        images = rng.integers(0, 256, size=(self.batch_size,) + tuple(model.input_shape[1:]), dtype=np.uint8)
+        labels = rng.integers(0, 2, size=(self.batch_size, 1)).astype(np.float32)
+        images = images.astype(np.float32)
+        probe.train_on_batch(images, labels)
+        timings = []
+        for _ in range(steps):
+            start = time.perf_counter()
+            probe.train_on_batch(images, labels)
+            timings.append(time.perf_counter() - start)
+        self.compute_step_s = float(np.median(timings))
+        return self.compute_step_s
+
+    def on_train_begin(self, logs=None):
+        os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+        self._file = open(self.log_path, 'a')
+        self.global_step = 0
+        self.epochs = []
+        self._write(
+            'run',
+            tensorflow=tf.__version__,
+            devices=[device.name for device in tf.config.list_logical_devices()],
+            batch_size=self.batch_size,
+            compute_step_s=self.compute_step_s,
+            peak_rss_mb=self.peak_rss_mb()
+        )
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch_start = time.perf_counter()
+        self._step_times = []
+        self._gaps = []
+        self._last_step_end = None
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.trace_dir and self.global_step == self.trace_steps[0]:
+            tf.profiler.experimental.start(self.trace_dir)
+            self._tracing = True
+        self._step_start = time.perf_counter()
+        if self._last_step_end is not None:
+            # Time spent outside the train step, in Keras and the other callbacks
+            self._gaps.append(self._step_start - self._last_step_end)
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._last_step_end = time.perf_counter()
+        step_s = self._last_step_end - self._step_start
+        self._step_times.append(step_s)
+        if self.log_steps:
+            self._write('step', step=self.global_step, epoch=len(self.epochs), step_s=round(step_s, 5))
+        if self._tracing and self.global_step >= self.trace_steps[1]:
+            tf.profiler.experimental.stop()
+            self._tracing = False
+        self.global_step += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        if not self._step_times:
+            return
+        epoch_s = time.perf_counter() - self._epoch_start
+        # The first step of the first epoch also traces the train function; keep it out of the averages
+        step_times = np.array(self._step_times[1:] if epoch == 0 and len(self._step_times) > 1 else self._step_times)
+        train_s = float(step_times.sum())
+        record = {
+            'epoch': epoch,
+            'epoch_s': round(epoch_s, 3),
+            'steps': len(self._step_times),
+            'train_images_per_s': round(len(step_times) * self.batch_size / train_s, 1) if train_s else None,
+            'step_s_mean': round(float(step_times.mean()), 5),
+            'step_s_p50': round(float(np.percentile(step_times, 50)), 5),
+            'step_s_p95': round(float(np.percentile(step_times, 95)), 5),
+            'step_s_max': round(float(step_times.max()), 5),
+            'first_step_s': round(self._step_times[0], 3),
+            'overhead_s': round(float(sum(self._gaps)), 3),
+            # Everything outside the train steps, mostly validation and checkpointing
+            'other_s': round(epoch_s - sum(self._step_times) - sum(self._gaps), 3),
+            'peak_rss_mb': self.peak_rss_mb(),
+        }
+        if self.compute_step_s is not None:
+            input_wait = np.clip(step_times - self.compute_step_s, 0, None)
+            record['input_wait_s'] = round(float(input_wait.sum()), 3)
+            record['input_wait_fraction'] = round(float(input_wait.sum()) / train_s, 3) if train_s else None
+        record.update({key: float(value) for key, value in (logs or {}).items()})
+        self.epochs.append(record)
+        self._write('epoch', **record)
+        wait = f", {record['input_wait_fraction']:.0%} waiting on input" if 'input_wait_fraction' in record else ''
+        print(f"profile: epoch {epoch} {record['train_images_per_s']} images/s, "
+              f"step p50 {record['step_s_p50'] * 1000:.1f} ms{wait}, peak RSS {record['peak_rss_mb'] or '?'} MiB")
+
+    def on_train_end(self, logs=None):
+        if self._tracing:
+            tf.profiler.experimental.stop()
+            self._tracing = False
+        throughputs = [e['train_images_per_s'] for e in self.epochs if e['train_images_per_s']]
+        self._write(
+            'summary',
+            epochs=len(self.epochs),
+            total_s=round(sum(e['epoch_s'] for e in self.epochs), 3),
+            train_images_per_s_mean=round(float(np.mean(throughputs)), 1) if throughputs else None,
+            input_wait_fraction_mean=round(float(np.mean([e['input_wait_fraction'] for e in self.epochs])), 3)
+            if self.epochs and 'input_wait_fraction' in self.epochs[0] else None,
+            peak_rss_mb=self.peak_rss_mb()
+        )
+        self._file.close()
+        self._file = None
+
+
 class DeepfakeDetectorModel:
     """
     A class to create and train a deepfake detection model.
     """
 
-    def __init__(self):
+    def __init__(self, image_size=(128, 128)):
         """
         Initialize the DeepfakeDetectorModel by building the model.
+
+        Args:
+            image_size (tuple): (height, width) of the input images.
         """
+        self.image_size = tuple(image_size)
         self.model = self._build_model()
 
     def _build_model(self):
@@ -129,7 +957,7 @@ class DeepfakeDetectorModel:
             tf.keras.Model: Built model.
         """
         model = models.Sequential()
-        model.add(layers.Input(shape=(128, 128, 3)))
+        model.add(layers.Input(shape=self.image_size + (3,)))
         model.add(layers.Rescaling(1./127, name='rescaling'))
         model.add(layers.Conv2D(32, (3, 3), strides=1, padding='same', activation='relu'))
         model.add(layers.BatchNormalization())
@@ -166,7 +994,7 @@ class DeepfakeDetectorModel:
             metrics=['accuracy', tf.keras.metrics.Precision(), tf.keras.metrics.Recall()],
         )
 
-    def train_model(self, train_data, val_data, epochs):
+    def train_model(self, train_data, val_data, epochs, profiler=None):
         """
         Train the deepfake detection model.
 
@@ -174,6 +1002,7 @@ class DeepfakeDetectorModel:
             train_data (tf.data.Dataset): Training dataset.
             val_data (tf.data.Dataset): Validation dataset.
             epochs (int): Number of epochs to train the model.
+            profiler (TrainingProfiler, optional): Profile the training throughput.
 
         Returns:
             tf.keras.callbacks.History: History object containing training details.
@@ -181,11 +1010,16 @@ class DeepfakeDetectorModel:
         early_stopping_callback = EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)
         reduce_lr_callback = ReduceLROnPlateau(monitor='val_loss', factor=0.1, patience=5, min_lr=1e-7, verbose=1)
         model_checkpoint_callback = ModelCheckpoint('deepfake_detector_model_best.keras', monitor='val_loss', save_best_only=True, verbose=1)
+        callbacks = [early_stopping_callback, reduce_lr_callback, model_checkpoint_callback]
+        if profiler is not None:
+            profiler.measure_compute(self.model)
+            # First, so its step timings include as little of the other callbacks' work as possible
+            callbacks.insert(0, profiler)
         return self.model.fit(
             train_data,
             validation_data=val_data,
             epochs=epochs,
-            callbacks=[early_stopping_callback, reduce_lr_callback, model_checkpoint_callback]
+            callbacks=callbacks
         )
 
     def evaluate_model(self, test_data):
@@ -210,12 +1044,96 @@ class DeepfakeDetectorModel:
         self.model.save(path)
 
 
+class ModelExporter:
+    """
+    A class to export a trained model to an optimized CPU inference artifact (TFLite).
+    """
+
+    def __init__(self, model, image_size=(128, 128)):
+        """
+        Initialize the ModelExporter with a trained Keras model.
+
+        Args:
+            model (tf.keras.Model): Trained model to export.
+            image_size (tuple): (height, width) of the model's input images.
+        """
+        self.model = model
+        self.image_size = image_size
+
+    def export_tflite(self, path, quantization='dynamic', representative_data=None, num_calibration_batches=50):
+        """
+        Export the model as a TFLite flatbuffer.
+
+        Args:
+            path (str): Path to save the .tflite file to.
+            quantization (str): None, 'dynamic' (int8 weights), 'float16', or 'int8' (weights and activations).
+            representative_data (tf.data.Dataset, optional): Batched (images, labels) dataset used to
+                calibrate 'int8' quantization, e.g. the validation split.
+            num_calibration_batches (int): Number of batches drawn from `representative_data`.
+        """
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+        if quantization in ('dynamic', 'float16', 'int8'):
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if quantization == 'float16':
+            converter.target_spec.supported_types = [tf.float16]
+        elif quantization == 'int8':
+            if representative_data is None:
+                raise ValueError('int8 quantization requires representative_data for calibration')
+
+            def representative_dataset():
+                for images, _ in representative_data.take(num_calibration_batches):
+                    for img in images:
+                        yield [tf.expand_dims(tf.cast(img, tf.float32), 0)]
+
+            # Inputs and outputs stay float32 so the serving code is unchanged
+            converter.representative_dataset = representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        elif quantization is not None and quantization != 'dynamic':
+            raise ValueError(f'unknown quantization mode {quantization}')
+        with open(path, 'wb') as f:
+            f.write(converter.convert())
+        print(f'tflite model ({quantization or "float32"}) exported to {path}')
+
+    def check_parity(self, tflite_path, samples_dir, tolerance=0.05):
+        """
+        Compare the TFLite model's scores with the Keras model's on the images in `samples_dir`.
+
+        Args:
+            tflite_path (str): Path to the exported .tflite file.
+            samples_dir (str): Directory of sample images.
+            tolerance (float): Maximum allowed absolute difference between the two scores.
+
+        Returns:
+            bool: True if every sample is within tolerance and gets the same Real/Fake verdict.
+        """
+        height, width = self.image_size
+        interpreter = tf.lite.Interpreter(model_path=tflite_path)
+        input_index = interpreter.get_input_details()[0]['index']
+        output_index = interpreter.get_output_details()[0]['index']
+        interpreter.resize_tensor_input(input_index, [1, height, width, 3])
+        interpreter.allocate_tensors()
+
+        passed = True
+        for name in sorted(os.listdir(samples_dir)):
+            img = tf.keras.utils.load_img(os.path.join(samples_dir, name), target_size=(height, width))
+            batch = np.expand_dims(tf.keras.utils.img_to_array(img), axis=0).astype(np.float32)
+            keras_score = float(self.model.predict_on_batch(batch).reshape(-1)[0])
+            interpreter.set_tensor(input_index, batch)
+            interpreter.invoke()
+            tflite_score = float(interpreter.get_tensor(output_index).reshape(-1)[0])
+            ok = abs(keras_score - tflite_score) <= tolerance and (keras_score >= 0.5) == (tflite_score >= 0.5)
+            passed = passed and ok
+            print(f'parity {"ok" if ok else "FAILED"}: {name} keras={keras_score:.4f} tflite={tflite_score:.4f}')
+        return passed
+
+
 class TrainModel:
     """
     A class to manage training of a deepfake detection model.
     """
 
-    def __init__(self, dataset_url, dataset_download_dir, dataset_file, dataset_dir, train_dir, test_dir, val_dir):
+    def __init__(self, dataset_url, dataset_download_dir, dataset_file, dataset_dir, train_dir, test_dir, val_dir,
+                 **dataset_options):
         """
         Initialize the TrainModel class with the specified parameters.
 
@@ -227,16 +1145,27 @@ class TrainModel:
             train_dir (str): Directory containing the training data.
             test_dir (str): Directory containing the test data.
             val_dir (str): Directory containing the validation data.
+            **dataset_options: Download and input pipeline options passed to DatasetHandler
+                (see its constructor).
         """
-        self.dataset_handler = DatasetHandler(dataset_url, dataset_download_dir, dataset_file, dataset_dir, train_dir, test_dir, val_dir)
+        self.dataset_handler = DatasetHandler(dataset_url, dataset_download_dir, dataset_file, dataset_dir, train_dir, test_dir, val_dir, **dataset_options)
 
-    def run_training(self, learning_rate=0.0001, epochs=50):
+    def run_training(self, learning_rate=0.0001, epochs=50, quantization='dynamic', samples_dir='samples',
+                     shard_dir=None, shard_format='tfrecord', profile_dir=None, profile_trace=False):
         """
         Run the training process for the deepfake detection model.
 
         Args:
             learning_rate (float): Learning rate for the optimizer.
             epochs (int): Number of epochs to train the model.
+            quantization (str): TFLite quantization mode for the exported inference artifact
+                (see `ModelExporter.export_tflite`), or 'none' to skip the export.
+            samples_dir (str): Directory of sample images used for the export parity check.
+            shard_dir (str, optional): Train from pre-decoded shards in this directory, writing them
+                on the first run. None trains straight from the image files.
+            shard_format (str): 'tfrecord' or 'npy', used when the shards are written.
+            profile_dir (str, optional): Write a training throughput profile (profile.jsonl) to this directory.
+            profile_trace (bool): Also capture a TensorFlow profiler trace of steps 10-20 into profile_dir/trace.
 
         Returns:
             tuple: History object and evaluation metrics.
@@ -247,12 +1176,27 @@ class TrainModel:
         if not self.dataset_handler.unzip_dataset():
             print('failed to unzip dataset')
             return
-        train_data, test_data, val_data = self.dataset_handler.load_split_data()
-        model = DeepfakeDetectorModel()
+        if shard_dir:
+            train_data, test_data, val_data = self.dataset_handler.load_split_shards(shard_dir, shard_format)
+        else:
+            train_data, test_data, val_data = self.dataset_handler.load_split_data()
+        model = DeepfakeDetectorModel(self.dataset_handler.image_size)
         model.compile_model(learning_rate)
-        history = model.train_model(train_data, val_data, epochs)
+        profiler = None
+        if profile_dir:
+            profiler = TrainingProfiler(
+                os.path.join(profile_dir, 'profile.jsonl'),
+                self.dataset_handler.batch_size,
+                trace_dir=os.path.join(profile_dir, 'trace') if profile_trace else None
+            )
+        history = model.train_model(train_data, val_data, epochs, profiler=profiler)
         evaluation_metrics = model.evaluate_model(test_data)
         model.save_model('deepfake_detector_model.keras')
+        if quantization != 'none':
+            exporter = ModelExporter(model.model, self.dataset_handler.image_size)
+            exporter.export_tflite('deepfake_detector_model.tflite', quantization, representative_data=val_data)
+            if os.path.isdir(samples_dir) and not exporter.check_parity('deepfake_detector_model.tflite', samples_dir):
+                print('warning: the tflite model does not match the keras model on the samples')
         return history, evaluation_metrics
 
 
@@ -265,6 +1209,12 @@ if __name__ == '__main__':
     train_dir = 'Train'
     test_dir = 'Test'
     val_dir = 'Validation'
+    batch_size = 64
+    image_size = (128, 128)
+    # 'memory', a directory (e.g. './data/cache', several GB for the full dataset) or None to decode every epoch
+    cache = None
+    shard_dir = None  # e.g. './data/shards' to decode the dataset once into TFRecord shards
+    profile_dir = None  # e.g. './data/profile' to log step timings, input wait and memory per epoch
  
     # instantiate the TrainModel class with the specified configuration
     trainer = TrainModel(
@@ -274,11 +1224,14 @@ if __name__ == '__main__':
         dataset_dir=dataset_dir,
         train_dir=train_dir,
         test_dir=test_dir,
-        val_dir=val_dir
+        val_dir=val_dir,
+        batch_size=batch_size,
+        image_size=image_size,
+        cache=cache
     )
 
     # train
-    history, evaluation_metrics = trainer.run_training(learning_rate=0.0001, epochs=50)
+    history, evaluation_metrics = trainer.run_training(learning_rate=0.0001, epochs=50, quantization='dynamic', shard_dir=shard_dir, profile_dir=profile_dir)
 
     # metrics
     print('evaluation metrics:', evaluation_metrics)